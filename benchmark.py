@@ -0,0 +1,422 @@
+"""
+Banco de pruebas de rendimiento con datos sintéticos.
+
+Genera en una carpeta temporal una hoja COBERTURA de N filas, un modelo Word con
+M párrafos y T tablas (con parte de los marcadores partidos en varios runs, como
+los deja Word al editar), un libro "MAPAS SMA-QoS-9" con imágenes PNG por
+parroquia y las imágenes de encabezado, pie y corrección de mapa. Con esos datos
+mide las funciones de generador.py y la generación completa de informes (informes
+por segundo y memoria máxima).
+
+Cada ejecución se agrega al historial (JSON Lines) y se compara con la última
+ejecución con los mismos parámetros, para que las regresiones se noten.
+
+Uso:
+    python benchmark.py --filas 200 --parrafos 300 --tablas 10 --informes 20
+    python benchmark.py --procesos 4          # mide también el modo lote
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+
+import pandas as pd
+from docx import Document
+from PIL import Image
+import openpyxl
+from openpyxl.drawing.image import Image as ImagenExcel
+
+HISTORIAL = os.path.join(".benchmarks", "historial.jsonl")
+HOJA_GRAFICOS = "MAPAS SMA-QoS-9"
+UMBRAL_REGRESION = 0.10   # 10 % más lento que la ejecución anterior
+
+# Textos de los párrafos del modelo sintético; se repiten hasta llegar a M párrafos
+TEXTOS_PARRAFOS = [
+    "La parroquia «PARROQUIA» del cantón «CANTÓN», provincia de «PROVINCIA», fue medida.",
+    "El valor medido fue «VALOR_MEDIDO» con «NUMERO_VALIDAS_ARCOTEL» muestras válidas de «NUMERO_TOTAL_DE_MUESTRAS_ARCOTEL».",
+    "Cobertura de la operadora: «COBERTURA_OPERADORA» (alcanza el objetivo: «ALCANZA_VALOR_OBJETIVO_OPERADORA»).",
+    "Texto fijo del informe sin marcadores, como la mayoría de los párrafos de un modelo real.",
+    "«Parroquia», «Cantón» y «Provincia» en mayúsculas iniciales.",
+    "Porcentaje de muestras válidas: «PORCENTAJE_DE_MUESTRAS_VALIDAS_OPERADORA».",
+]
+
+# ----------------- Generadores de datos sintéticos -----------------
+
+def nombre_parroquia(i):
+    return f"PARROQUIA {i:04d}"
+
+def png(ancho, alto, semilla=0):
+    """PNG de ruido (no se comprime), el peor caso para el tamaño de las imágenes."""
+    aleatorio = random.Random(semilla)
+    imagen = Image.frombytes("RGB", (ancho, alto), aleatorio.randbytes(ancho * alto * 3))
+    salida = io.BytesIO()
+    imagen.save(salida, "PNG")
+    return salida.getvalue()
+
+def generar_consolidado(filas):
+    """Consolidado .xlsx con una hoja COBERTURA de `filas` filas; devuelve los bytes."""
+    registros = []
+    for i in range(filas):
+        registros.append({
+            "Nro.": i + 1,
+            "PROVINCIA": "AZUAY",
+            "CANTÓN": "CUENCA",
+            "PARROQUIA": nombre_parroquia(i // 4),
+            "OPERADORA": "CONECEL S.A." if i % 2 == 0 else "OTECEL S.A.",
+            "TECNOLOGÍA\n(2G/3G/4G)": "3G" if (i // 2) % 2 == 0 else "4G",
+            "FECHA CRONOGRAMA DE MEDICION 2024": datetime.datetime(2024, 1 + i % 12, 1 + i % 28),
+            "NUMERO TOTAL DE MUESTRAS ARCOTEL": 1000 + i,
+            "NUMERO VALIDAS ARCOTEL": 900 + i,
+            "MUESTRAS VALIDAS VELOCIDAD ARCOTEL": 100,
+            "VALOR MEDIDO": 95.5,
+            "ALCANZA VALOR OBJETIVO ARCOTEL": "SI",
+            "REQUIERE MODIFICAR MAPA DE COBERTURA ARCOTEL": "NO",
+            "NÚMERO  DE INFORME": f"SMA-{i:05d}",
+            "FECHA DE INFORME": datetime.datetime(2024, 6, 1),
+            "PORCENTAJE DE MUESTRAS VALIDAS OPERADORA": 36.3,
+            "ALCANZA VALOR OBJETIVO OPERADORA": "NO",
+            "REQUIERE MODIFICAR MAPA DE COBERTURA OPERADORA": "SI" if i % 3 == 0 else "NO",
+            "COBERTURA OPERADORA": 93.0,
+        })
+    salida = io.BytesIO()
+    with pd.ExcelWriter(salida) as escritor:
+        pd.DataFrame(registros).to_excel(escritor, sheet_name="COBERTURA", index=False)
+    return salida.getvalue()
+
+def _parrafo(doc, texto, partido):
+    """Agrega un párrafo; si `partido`, cada marcador queda repartido en dos runs."""
+    parrafo = doc.add_paragraph()
+    if not partido:
+        parrafo.add_run(texto)
+        return parrafo
+    for i, trozo in enumerate(texto.split("«")):
+        if i == 0:
+            parrafo.add_run(trozo)
+            continue
+        corte = max(1, len(trozo.split("»")[0]) // 2)
+        parrafo.add_run("«" + trozo[:corte])
+        parrafo.add_run(trozo[corte:])
+    return parrafo
+
+def generar_plantilla(parrafos, tablas, fraccion_partidos=0.5, semilla=0):
+    """
+    Modelo Word con `parrafos` párrafos y `tablas` tablas de 4x3 con marcadores,
+    más las anclas, la sección RECOMENDACIONES y la tabla de firmas de los modelos
+    reales. Devuelve los bytes del .docx.
+    """
+    aleatorio = random.Random(semilla)
+    doc = Document()
+    seccion = doc.sections[0]
+    seccion.header.paragraphs[0].text = "«NÚMERO__DE_INFORME»"
+    seccion.header.add_paragraph("«FECHA_DE_INFORME»")
+    seccion.footer.paragraphs[0].text = "Informe de «PARROQUIA»"
+
+    _parrafo(doc, "ANTECEDENTES: medición de «FECHA_CRONOGRAMA_DE_MEDICION_2024».", True)
+    _parrafo(doc, "PRUEBAS REALIZADAS el «FECHA_CRONOGRAMA_DE_MEDICION_2024».", False)
+    tablas_restantes = tablas
+    cada = max(1, parrafos // (tablas + 1))
+    for i in range(parrafos):
+        _parrafo(doc, TEXTOS_PARRAFOS[i % len(TEXTOS_PARRAFOS)], aleatorio.random() < fraccion_partidos)
+        if tablas_restantes and (i + 1) % cada == 0:
+            tabla = doc.add_table(rows=4, cols=3)
+            for f, fila in enumerate(tabla.rows):
+                for c, celda in enumerate(fila.cells):
+                    celda.text = TEXTOS_PARRAFOS[(f + c) % len(TEXTOS_PARRAFOS)]
+            tablas_restantes -= 1
+    doc.add_paragraph("RESULTADOS CONECEL S.A.")
+    doc.add_paragraph("Imagen 3.- Porcentaje de Cobertura WCDMA (3G), parámetro RSCP.")
+    _parrafo(doc, "CONCLUSIONES al «FECHA_CRONOGRAMA_DE_MEDICION_2024».", True)
+    doc.add_paragraph("RECOMENDACIONES")
+    doc.add_paragraph("Recomendación del modelo 1")
+    doc.add_paragraph("Recomendación del modelo 2")
+    doc.add_paragraph("Informe realizado por:")
+    firmas = doc.add_table(rows=2, cols=2)
+    firmas.cell(0, 0).text = "Ing. Mauricio Sánchez Pinos"
+    firmas.cell(0, 1).text = "PROFESIONAL TÉCNICO 1"
+    salida = io.BytesIO()
+    doc.save(salida)
+    return salida.getvalue()
+
+def generar_libro_graficos(ruta, lado_grafico, semilla=0):
+    """Libro con la hoja MAPAS SMA-QoS-9 y dos imágenes; la segunda es el gráfico del informe."""
+    libro = openpyxl.Workbook()
+    libro.active.title = "DATOS"
+    hoja = libro.create_sheet(HOJA_GRAFICOS)
+    hoja.add_image(ImagenExcel(io.BytesIO(png(64, 64, semilla))), "A1")
+    hoja.add_image(ImagenExcel(io.BytesIO(png(lado_grafico, lado_grafico * 2 // 3, semilla + 1))), "H1")
+    libro.save(ruta)
+
+def generar_datos(carpeta, filas, parrafos, tablas, lado_grafico, fraccion_partidos):
+    """Crea todos los datos sintéticos en `carpeta` y devuelve sus rutas y contenidos."""
+    carpeta_graficos = os.path.join(carpeta, "graficos")
+    carpeta_imagenes = os.path.join(carpeta, "imagenes")
+    os.makedirs(carpeta_graficos)
+    os.makedirs(carpeta_imagenes)
+    parroquias = sorted({nombre_parroquia(i // 4) for i in range(filas)})
+    for i, parroquia in enumerate(parroquias):
+        generar_libro_graficos(os.path.join(carpeta_graficos, f"MEDICION {parroquia} 2024.xlsx"), lado_grafico, i)
+        with open(os.path.join(carpeta_graficos, f"CORRECCION {parroquia}.png"), "wb") as f:
+            f.write(png(lado_grafico // 2, lado_grafico // 3, i))
+    with open(os.path.join(carpeta_imagenes, "encabezado.png"), "wb") as f:
+        f.write(png(1600, 200, 1))
+    with open(os.path.join(carpeta_imagenes, "pie de pagina.png"), "wb") as f:
+        f.write(png(1600, 150, 2))
+    return {
+        "consolidado": generar_consolidado(filas),
+        "plantilla": generar_plantilla(parrafos, tablas, fraccion_partidos),
+        "carpeta_graficos": carpeta_graficos,
+        "carpeta_imagenes": carpeta_imagenes,
+        "parroquias": parroquias,
+    }
+
+# ----------------- Mediciones -----------------
+
+def cronometrar(preparar, ejecutar, repeticiones):
+    """
+    Ejecuta `ejecutar(preparar())` `repeticiones` veces midiendo solo `ejecutar`.
+    Devuelve la mediana y el mínimo en segundos.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        argumento = preparar()
+        inicio = time.perf_counter()
+        ejecutar(argumento)
+        tiempos.append(time.perf_counter() - inicio)
+    return {"mediana_s": statistics.median(tiempos), "minimo_s": min(tiempos)}
+
+def medir_funciones(datos, generador, repeticiones):
+    """Mide por separado las funciones de generador.py sobre el modelo y datos sintéticos."""
+    import cache_excel
+    import cache_imagenes
+    from marcadores import construir_tabla_marcadores
+    from plantillas import obtener_plantilla, nuevo_documento, parrafo_en
+    from indice_cobertura import buscar_fila
+
+    df = cache_excel.leer_cobertura(datos["consolidado"])
+    _, _, indice, _ = generador.leer_consolidado(datos["consolidado"])
+    fila = buscar_fila(indice, datos["parroquias"][0], "CONECEL S.A.", "3G")
+    placeholders = generador.construir_placeholders(fila)
+    plantilla = obtener_plantilla(datos["plantilla"])
+    supervisor = generador.SUPERVISORES[1]
+    resultados = {}
+
+    def documento():
+        return nuevo_documento(plantilla)
+
+    resultados["carga_consolidado"] = cronometrar(
+        lambda: None, lambda _: cache_excel.leer_cobertura(datos["consolidado"]), repeticiones)
+    resultados["construir_indice"] = cronometrar(
+        lambda: None, lambda _: generador.construir_indice(df.join(construir_tabla_marcadores(df))),
+        repeticiones)
+
+    def reemplazar_todo(doc):
+        counter = [0]
+        for ruta, en_tabla in plantilla["ubicaciones"]["marcadores"]:
+            generador.replace_texts(parrafo_en(doc, ruta), placeholders, counter)
+    resultados["replace_texts"] = cronometrar(documento, reemplazar_todo, repeticiones)
+    resultados["replace_texts"]["llamadas"] = len(plantilla["ubicaciones"]["marcadores"])
+
+    resultados["process_doc_elements"] = cronometrar(
+        documento, lambda doc: generador.process_doc_elements(doc, placeholders, supervisor, "Recomendación"),
+        repeticiones)
+    resultados["process_doc_elements (modelo compilado)"] = cronometrar(
+        documento, lambda doc: generador.process_doc_elements(doc, placeholders, supervisor, "Recomendación",
+                                                            None, plantilla["ubicaciones"]),
+        repeticiones)
+    resultados["process_headers_and_footers"] = cronometrar(
+        documento, lambda doc: generador.process_headers_and_footers(doc, placeholders), repeticiones)
+
+    # Sin caché de imágenes: cada repetición lee el zip de otra parroquia
+    limite_memoria, carpeta_cache = cache_imagenes.LIMITE_MEMORIA_BYTES, cache_imagenes.CARPETA_CACHE
+    cache_imagenes.configurar(limite_memoria_bytes=0, carpeta_cache="")
+    parroquias = iter(datos["parroquias"] * repeticiones)
+    resultados["buscar_grafico (sin caché)"] = cronometrar(
+        lambda: next(parroquias),
+        lambda parroquia: generador.buscar_grafico(parroquia, datos["carpeta_graficos"], datos["parroquias"]),
+        repeticiones)
+    cache_imagenes.configurar(limite_memoria_bytes=limite_memoria, carpeta_cache=carpeta_cache)
+    generador.buscar_grafico(datos["parroquias"][0], datos["carpeta_graficos"], datos["parroquias"])
+    resultados["buscar_grafico (en caché)"] = cronometrar(
+        lambda: None,
+        lambda _: generador.buscar_grafico(datos["parroquias"][0], datos["carpeta_graficos"], datos["parroquias"]),
+        repeticiones)
+
+    imagen, ruta_excel = generador.buscar_grafico(datos["parroquias"][0], datos["carpeta_graficos"], datos["parroquias"])
+    ruta_ancla = plantilla["ubicaciones"]["anclas"]["resultados"]
+    resultados["insertar_grafico_en_word"] = cronometrar(
+        documento, lambda doc: generador.insertar_grafico_en_word(doc, imagen, ruta_excel, parrafo_en(doc, ruta_ancla)),
+        repeticiones)
+    return resultados
+
+def trabajos_de_prueba(datos, generador, informes):
+    """Las primeras `informes` filas del consolidado como (parroquia, marcadores)."""
+    df, tabla, _, _ = generador.leer_consolidado(datos["consolidado"])
+    trabajos = []
+    for fila, placeholders in zip(df.to_dict("records"), tabla.to_dict("records")):
+        trabajos.append((fila["PARROQUIA"], placeholders))
+        if len(trabajos) == informes:
+            break
+    return trabajos
+
+def generar_informes(datos, generador, trabajos):
+    """Generación completa en este proceso: modelo, marcadores, imágenes y guardado en memoria."""
+    from plantillas import obtener_plantilla, nuevo_documento
+    for parroquia, placeholders in trabajos:
+        plantilla = obtener_plantilla(datos["plantilla"])
+        doc = nuevo_documento(plantilla)
+        generador.generar_informe(doc, placeholders, parroquia, generador.SUPERVISORES[0], "Recomendación",
+                                datos["carpeta_graficos"], datos["carpeta_imagenes"],
+                                plantilla["ubicaciones"], datos["parroquias"])
+        generador.documento_a_bytes(doc)
+
+def medir_generacion(datos, generador, informes):
+    """Informes por segundo (sin trazar memoria) y memoria máxima (con tracemalloc) de la generación completa."""
+    trabajos = trabajos_de_prueba(datos, generador, informes)
+    generar_informes(datos, generador, trabajos[:1])   # calienta la caché de modelos e imágenes
+    inicio = time.perf_counter()
+    generar_informes(datos, generador, trabajos)
+    segundos = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    generar_informes(datos, generador, trabajos)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"informes": len(trabajos), "segundos": segundos,
+            "informes_por_segundo": len(trabajos) / segundos, "memoria_pico_mb": pico / 1024 / 1024}
+
+def medir_lote(datos, carpeta, informes, procesos):
+    """Informes por segundo del modo lote (procesos, modelos desde carpeta y guardado en disco)."""
+    import lote
+    import generador
+    carpeta_plantillas = os.path.join(carpeta, "plantillas")
+    os.makedirs(carpeta_plantillas, exist_ok=True)
+    with open(os.path.join(carpeta_plantillas, "MODELO_3G_CONECEL_COBERTURA.docx"), "wb") as f:
+        f.write(datos["plantilla"])
+    df, tabla, indice, _ = generador.leer_consolidado(datos["consolidado"])
+    trabajos, _ = lote.emparejar_plantillas(df, tabla, carpeta_plantillas, os.path.join(carpeta, "salida"))
+    trabajos = trabajos[:informes]
+    inicio = time.perf_counter()
+    resultados = lote.generar_lote(trabajos, generador.SUPERVISORES[0], "Recomendación", datos["carpeta_graficos"],
+                                   datos["carpeta_imagenes"], generador.parroquias_de(indice), procesos=procesos)
+    segundos = time.perf_counter() - inicio
+    return {"informes": len(resultados), "procesos": procesos, "segundos": segundos,
+            "informes_por_segundo": len(resultados) / segundos,
+            "errores": sum(1 for r in resultados if r["estado"] != "OK")}
+
+# ----------------- Historial -----------------
+
+def version_actual():
+    """Commit de git del código medido, si está disponible."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def ultima_ejecucion(historial, parametros):
+    """Última ejecución del historial con los mismos parámetros, o None."""
+    if not os.path.exists(historial):
+        return None
+    anterior = None
+    with open(historial, encoding="utf-8") as f:
+        for linea in f:
+            if linea.strip():
+                registro = json.loads(linea)
+                if registro["parametros"] == parametros:
+                    anterior = registro
+    return anterior
+
+def guardar_ejecucion(historial, registro):
+    os.makedirs(os.path.dirname(historial) or ".", exist_ok=True)
+    with open(historial, "a", encoding="utf-8") as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+def comparar(actual, anterior, umbral):
+    """Líneas de informe con la variación de cada medición respecto de la ejecución anterior."""
+    lineas = []
+    regresiones = 0
+    for nombre, medicion in actual["funciones"].items():
+        cambio = ""
+        previa = (anterior or {}).get("funciones", {}).get(nombre)
+        if previa and previa["mediana_s"] > 0:
+            variacion = medicion["mediana_s"] / previa["mediana_s"] - 1
+            cambio = f"{variacion:+.1%}"
+            if variacion > umbral:
+                cambio += "  REGRESIÓN"
+                regresiones += 1
+        lineas.append(f"  {nombre:<45} {medicion['mediana_s'] * 1000:10.2f} ms  {cambio}")
+    for clave in ("generacion", "lote"):
+        medicion = actual.get(clave)
+        if not medicion:
+            continue
+        cambio = ""
+        previa = (anterior or {}).get(clave)
+        if previa:
+            variacion = medicion["informes_por_segundo"] / previa["informes_por_segundo"] - 1
+            cambio = f"{variacion:+.1%}"
+            if variacion < -umbral:
+                cambio += "  REGRESIÓN"
+                regresiones += 1
+        extra = f", memoria máxima {medicion['memoria_pico_mb']:.1f} MB" if "memoria_pico_mb" in medicion else ""
+        lineas.append(f"  {clave:<45} {medicion['informes_por_segundo']:10.2f} informes/s{extra}  {cambio}")
+    return lineas, regresiones
+
+def main():
+    parser = argparse.ArgumentParser(description="Banco de pruebas de rendimiento con datos sintéticos.")
+    parser.add_argument("--filas", type=int, default=200, help="Filas de la hoja COBERTURA.")
+    parser.add_argument("--parrafos", type=int, default=300, help="Párrafos del modelo Word.")
+    parser.add_argument("--tablas", type=int, default=10, help="Tablas del modelo Word.")
+    parser.add_argument("--partidos", type=float, default=0.5,
+                        help="Fracción de párrafos con los marcadores partidos en varios runs.")
+    parser.add_argument("--lado-grafico", type=int, default=1200, help="Ancho en píxeles de los gráficos.")
+    parser.add_argument("--informes", type=int, default=20, help="Informes de la generación completa.")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Repeticiones por función.")
+    parser.add_argument("--procesos", type=int, default=0, help="Procesos del modo lote (0 = no medirlo).")
+    parser.add_argument("--historial", default=HISTORIAL, help="Archivo JSON Lines con las ejecuciones.")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION,
+                        help="Variación a partir de la cual se marca una regresión (0.10 = 10 %%).")
+    args = parser.parse_args()
+
+    parametros = {"filas": args.filas, "parrafos": args.parrafos, "tablas": args.tablas,
+                  "partidos": args.partidos, "lado_grafico": args.lado_grafico, "informes": args.informes,
+                  "repeticiones": args.repeticiones, "procesos": args.procesos}
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_informes_") as carpeta:
+        os.environ["CACHE_COBERTURA_DIR"] = os.path.join(carpeta, "cache_cobertura")
+        os.environ["CACHE_IMAGENES_DIR"] = os.path.join(carpeta, "cache_imagenes")
+        os.environ["CACHE_INFORMES_DIR"] = os.path.join(carpeta, "cache_informes")
+        print("Generando datos sintéticos...", file=sys.stderr)
+        datos = generar_datos(carpeta, args.filas, args.parrafos, args.tablas, args.lado_grafico, args.partidos)
+        import generador
+        print("Midiendo funciones...", file=sys.stderr)
+        registro = {
+            "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+            "version": version_actual(),
+            "python": sys.version.split()[0],
+            "parametros": parametros,
+            "funciones": medir_funciones(datos, generador, args.repeticiones),
+        }
+        print("Midiendo la generación completa...", file=sys.stderr)
+        registro["generacion"] = medir_generacion(datos, generador, args.informes)
+        if args.procesos:
+            print("Midiendo el modo lote...", file=sys.stderr)
+            registro["lote"] = medir_lote(datos, carpeta, args.informes, args.procesos)
+
+    anterior = ultima_ejecucion(args.historial, parametros)
+    lineas, regresiones = comparar(registro, anterior, args.umbral)
+    guardar_ejecucion(args.historial, registro)
+    print(f"Resultados ({registro['version'] or 'sin versión'}; comparado con "
+          f"{anterior['fecha'] + ' ' + anterior['version'] if anterior else 'nada: primera ejecución'}):")
+    print("\n".join(lineas))
+    return 1 if regresiones else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
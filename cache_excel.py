@@ -0,0 +1,123 @@
+"""
+Carga de la hoja COBERTURA del consolidado con caché en disco.
+
+La hoja se lee una sola vez por contenido del archivo: se calcula el SHA-256 de los
+bytes subidos y el resultado se guarda en formato Parquet en la carpeta de caché.
+Mientras el archivo no cambie, las recargas de Streamlit y los reinicios de la
+aplicación leen el Parquet en lugar de volver a interpretar el .xls/.xlsx.
+"""
+import os
+import hashlib
+from io import BytesIO
+
+import pandas as pd
+
+CARPETA_CACHE = os.environ.get("CACHE_COBERTURA_DIR", ".cache_cobertura")
+LIMITE_CACHE_BYTES = 200 * 1024 * 1024
+
+# Cambiar este número cuando cambien las columnas leídas, para invalidar la caché anterior
+VERSION_CACHE = 1
+
+# Columnas de la hoja COBERTURA que usan los marcadores y la búsqueda de filas
+COLUMNAS_COBERTURA = [
+    "PROVINCIA",
+    "CANTÓN",
+    "PARROQUIA",
+    "OPERADORA",
+    "FECHA CRONOGRAMA DE MEDICION 2024",
+    "NÚMERO  DE INFORME",
+    "FECHA DE INFORME",
+    "NUMERO TOTAL DE MUESTRAS ARCOTEL",
+    "NUMERO VALIDAS ARCOTEL",
+    "MUESTRAS VALIDAS VELOCIDAD ARCOTEL",
+    "REQUIERE MODIFICAR MAPA DE COBERTURA ARCOTEL",
+    "VALOR MEDIDO",
+    "COBERTURA OPERADORA",
+    "ALCANZA VALOR OBJETIVO ARCOTEL",
+    "PORCENTAJE DE MUESTRAS VALIDAS OPERADORA",
+    "ALCANZA VALOR OBJETIVO OPERADORA",
+    "REQUIERE MODIFICAR MAPA DE COBERTURA OPERADORA",
+]
+
+def _columna_usada(columna):
+    """Indica si una columna de la hoja se debe leer (la de tecnología incluida)."""
+    nombre = str(columna).strip()
+    return nombre in COLUMNAS_COBERTURA or nombre.upper().startswith("TECNOLOG")
+
+def _preparar_para_parquet(df):
+    """
+    Parquet exige un solo tipo por columna. Las columnas de texto que mezclan números
+    o fechas (por ejemplo, un número de informe aún vacío) se guardan como texto;
+    str() de esos valores da lo mismo que antes de la conversión.
+    """
+    df = df.copy()
+    for columna in df.columns:
+        if df[columna].dtype == object:
+            df[columna] = df[columna].map(lambda v: v if pd.isna(v) or isinstance(v, str) else str(v))
+    return df
+
+def _restaurar_nulos(df):
+    """Parquet devuelve None en las columnas de texto; la hoja original daba NaN."""
+    for columna in df.columns:
+        if df[columna].dtype == object:
+            df[columna] = df[columna].where(df[columna].notna(), float("nan"))
+    return df
+
+def leer_cobertura(contenido):
+    """Interpreta la hoja COBERTURA de un consolidado dado como bytes."""
+    df = pd.read_excel(BytesIO(contenido), sheet_name="COBERTURA", usecols=_columna_usada)
+    # Algunos consolidados tienen espacios sobrantes al final de los encabezados
+    df.columns = [str(columna).strip() for columna in df.columns]
+    return df
+
+def limpiar_cache(carpeta_cache=CARPETA_CACHE, limite_bytes=LIMITE_CACHE_BYTES, conservar=None):
+    """
+    Elimina los archivos menos usados de la caché hasta que su tamaño total
+    quede por debajo del límite. `conservar` nunca se elimina.
+    """
+    archivos = []
+    for archivo in os.listdir(carpeta_cache):
+        if archivo.endswith(".parquet"):
+            ruta = os.path.join(carpeta_cache, archivo)
+            estado = os.stat(ruta)
+            archivos.append((estado.st_mtime, estado.st_size, ruta))
+    total = sum(tamano for _, tamano, _ in archivos)
+    for _, tamano, ruta in sorted(archivos):
+        if total <= limite_bytes:
+            break
+        if ruta == conservar:
+            continue
+        try:
+            os.remove(ruta)
+            total -= tamano
+        except OSError:
+            pass  # Otro proceso pudo haberlo eliminado ya
+
+def cargar_cobertura(contenido, carpeta_cache=CARPETA_CACHE, limite_bytes=LIMITE_CACHE_BYTES):
+    """
+    Devuelve la hoja COBERTURA del consolidado, usando la caché en disco cuando
+    el contenido del archivo ya se leyó antes.
+    """
+    clave = hashlib.sha256(contenido).hexdigest()
+    ruta = os.path.join(carpeta_cache, f"cobertura_v{VERSION_CACHE}_{clave}.parquet")
+
+    if os.path.exists(ruta):
+        try:
+            df = pd.read_parquet(ruta)
+            os.utime(ruta)  # Marca el archivo como usado recientemente
+            return _restaurar_nulos(df)
+        except Exception:
+            pass  # Caché dañada: se vuelve a leer el Excel
+
+    df = leer_cobertura(contenido)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(carpeta_cache, exist_ok=True)
+        _preparar_para_parquet(df).to_parquet(temporal, index=False)
+        os.replace(temporal, ruta)
+        limpiar_cache(carpeta_cache, limite_bytes, conservar=ruta)
+    except Exception:
+        # Sin caché en disco se sigue trabajando con el Excel leído
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return df
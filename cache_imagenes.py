@@ -0,0 +1,195 @@
+"""
+Caché de las imágenes extraídas de los Excel de mediciones.
+
+Un mismo Excel sirve a varios informes (CONECEL y OTECEL, 3G y 4G de una parroquia).
+La imagen extraída se guarda una vez por contenido (SHA-256) y se localiza con la
+clave (ruta, tamaño, fecha de modificación, hoja, posición): si el Excel cambia, la
+clave cambia y la imagen se vuelve a extraer. Las imágenes normalizadas para el
+informe (normalizacion_imagenes) se guardan igual, con la huella de la imagen
+original o la ruta, tamaño y fecha del archivo como clave.
+
+Hay dos niveles, ambos con expulsión de lo menos usado recientemente:
+- memoria, hasta LIMITE_MEMORIA_BYTES;
+- disco, en CARPETA_CACHE (variable de entorno CACHE_IMAGENES_DIR), hasta
+  LIMITE_DISCO_BYTES, para que los reinicios de la aplicación también la aprovechen.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import normalizacion_imagenes
+from imagenes_excel import extraer_imagen
+
+CARPETA_CACHE = os.environ.get("CACHE_IMAGENES_DIR", ".cache_imagenes")
+LIMITE_MEMORIA_BYTES = 64 * 1024 * 1024
+LIMITE_DISCO_BYTES = 500 * 1024 * 1024
+
+_imagenes = OrderedDict()   # SHA-256 -> bytes
+_claves = OrderedDict()     # clave del Excel -> SHA-256, o None si la hoja no tiene esa imagen
+_bytes_en_memoria = 0
+_candado = threading.Lock()
+
+def configurar(limite_memoria_bytes=None, carpeta_cache=None, limite_disco_bytes=None):
+    """Cambia los límites o la carpeta de la caché. `carpeta_cache=""` desactiva el disco."""
+    global LIMITE_MEMORIA_BYTES, CARPETA_CACHE, LIMITE_DISCO_BYTES
+    if limite_memoria_bytes is not None:
+        LIMITE_MEMORIA_BYTES = limite_memoria_bytes
+    if carpeta_cache is not None:
+        CARPETA_CACHE = carpeta_cache
+    if limite_disco_bytes is not None:
+        LIMITE_DISCO_BYTES = limite_disco_bytes
+    with _candado:
+        _expulsar_memoria()
+
+def clave_imagen(ruta_excel, hoja, posicion):
+    """Clave de caché de una imagen: cambia si el Excel se modifica."""
+    estado = os.stat(ruta_excel)
+    return (os.path.abspath(ruta_excel), estado.st_size, estado.st_mtime_ns, hoja, posicion)
+
+def _expulsar_memoria():
+    global _bytes_en_memoria
+    while _bytes_en_memoria > LIMITE_MEMORIA_BYTES and _imagenes:
+        _, datos = _imagenes.popitem(last=False)
+        _bytes_en_memoria -= len(datos)
+    # Las claves son pequeñas; se limita solo su número
+    while len(_claves) > 10000:
+        _claves.popitem(last=False)
+
+def _guardar_en_memoria(huella, datos):
+    global _bytes_en_memoria
+    if huella in _imagenes:
+        _imagenes.move_to_end(huella)
+        return
+    _imagenes[huella] = datos
+    _bytes_en_memoria += len(datos)
+    _expulsar_memoria()
+
+def _ruta_clave(clave):
+    id_clave = hashlib.sha256(repr(clave).encode("utf-8")).hexdigest()
+    return os.path.join(CARPETA_CACHE, "claves", id_clave)
+
+def _leer_disco(clave):
+    """Devuelve (huella, bytes) de la caché en disco, o (None, None)."""
+    if not CARPETA_CACHE:
+        return None, None
+    try:
+        with open(_ruta_clave(clave), encoding="utf-8") as f:
+            huella = f.read().strip()
+        ruta_imagen = os.path.join(CARPETA_CACHE, "imagenes", huella)
+        with open(ruta_imagen, "rb") as f:
+            datos = f.read()
+        os.utime(ruta_imagen)  # Marca la imagen como usada recientemente
+        return huella, datos
+    except OSError:
+        return None, None
+
+def _escribir_disco(clave, huella, datos):
+    if not CARPETA_CACHE:
+        return
+    try:
+        carpeta_imagenes = os.path.join(CARPETA_CACHE, "imagenes")
+        os.makedirs(carpeta_imagenes, exist_ok=True)
+        os.makedirs(os.path.join(CARPETA_CACHE, "claves"), exist_ok=True)
+        ruta_imagen = os.path.join(carpeta_imagenes, huella)
+        if not os.path.exists(ruta_imagen):
+            temporal = f"{ruta_imagen}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporal, "wb") as f:
+                f.write(datos)
+            os.replace(temporal, ruta_imagen)
+        with open(_ruta_clave(clave), "w", encoding="utf-8") as f:
+            f.write(huella)
+        _expulsar_disco(carpeta_imagenes, conservar=ruta_imagen)
+    except OSError:
+        pass  # Sin caché en disco se sigue trabajando con la imagen extraída
+
+def _expulsar_disco(carpeta_imagenes, conservar):
+    """Elimina las imágenes menos usadas hasta quedar por debajo de LIMITE_DISCO_BYTES."""
+    archivos = []
+    for archivo in os.listdir(carpeta_imagenes):
+        if archivo.endswith(".tmp"):
+            continue
+        ruta = os.path.join(carpeta_imagenes, archivo)
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            continue
+        archivos.append((estado.st_mtime, estado.st_size, ruta))
+    total = sum(tamano for _, tamano, _ in archivos)
+    for _, tamano, ruta in sorted(archivos):
+        if total <= LIMITE_DISCO_BYTES:
+            break
+        if ruta == conservar:
+            continue
+        try:
+            os.remove(ruta)
+            total -= tamano
+        except OSError:
+            pass
+
+def _obtener(clave, calcular):
+    """
+    Imagen de la clave desde la memoria o el disco; si no está, la calcula con
+    `calcular()` (que puede devolver None) y la guarda.
+    """
+    with _candado:
+        if clave in _claves:
+            huella = _claves[clave]
+            _claves.move_to_end(clave)
+            if huella is None:
+                return None
+            if huella in _imagenes:
+                _imagenes.move_to_end(huella)
+                return _imagenes[huella]
+
+    huella, datos = _leer_disco(clave)
+    if datos is None:
+        datos = calcular()
+        if datos is None:
+            with _candado:
+                _claves[clave] = None
+            return None
+        huella = hashlib.sha256(datos).hexdigest()
+        _escribir_disco(clave, huella, datos)
+
+    with _candado:
+        _claves[clave] = huella
+        _guardar_en_memoria(huella, datos)
+    return datos
+
+def obtener_imagen(ruta_excel, hoja, posicion):
+    """
+    Igual que imagenes_excel.extraer_imagen, pero pasando por la caché: el Excel solo
+    se abre si la imagen no está en memoria ni en disco.
+    """
+    return _obtener(clave_imagen(ruta_excel, hoja, posicion),
+                    lambda: extraer_imagen(ruta_excel, hoja, posicion))
+
+def normalizar(imagen, ancho_pulgadas):
+    """
+    normalizacion_imagenes.normalizar_imagen con caché. `imagen` son bytes (la clave
+    es su SHA-256) o la ruta de un archivo (la clave cambia si el archivo se
+    modifica), así que una imagen compartida por varios informes, como las de
+    encabezado y pie, se normaliza una sola vez.
+    """
+    dpi = normalizacion_imagenes.DPI_OBJETIVO
+    if isinstance(imagen, bytes):
+        clave = ("normalizada", hashlib.sha256(imagen).hexdigest(), ancho_pulgadas, dpi)
+
+        def leer():
+            return imagen
+    else:
+        estado = os.stat(imagen)
+        clave = ("normalizada", os.path.abspath(imagen), estado.st_size, estado.st_mtime_ns, ancho_pulgadas, dpi)
+
+        def leer():
+            with open(imagen, "rb") as f:
+                return f.read()
+    datos = _obtener(clave, lambda: normalizacion_imagenes.normalizar_imagen(leer(), ancho_pulgadas, dpi))
+    if datos is not None:
+        # Una imagen ya normalizada que vuelve a pasar por aquí no se procesa otra vez
+        huella = hashlib.sha256(datos).hexdigest()
+        with _candado:
+            _claves[("normalizada", huella, ancho_pulgadas, dpi)] = huella
+            _guardar_en_memoria(huella, datos)
+    return datos
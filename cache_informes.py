@@ -0,0 +1,167 @@
+"""
+Caché de informes generados, direccionada por contenido, para regenerar un lote
+de forma incremental.
+
+La clave de un informe es el SHA-256 de sus entradas: el modelo Word, los valores
+de los marcadores de su fila, las imágenes (gráfico, corrección de mapa, encabezado
+y pie, ya normalizadas), el supervisor, las recomendaciones y VERSION_INFORMES.
+El .docx y el PDF generados se guardan en CARPETA_CACHE (variable de entorno
+CACHE_INFORMES_DIR) con esa clave como nombre; si en otra ejecución la clave es la
+misma, se copian a la carpeta de salida en lugar de volver a generarlos.
+
+Cada lote deja en su carpeta de salida un manifiesto (NOMBRE_MANIFIESTO) con la
+clave y las huellas de las entradas de cada informe, qué se hizo con él y por qué;
+el siguiente lote lo compara para explicar qué cambió.
+"""
+import os
+import json
+import shutil
+import hashlib
+import datetime
+from functools import lru_cache
+
+CARPETA_CACHE = os.environ.get("CACHE_INFORMES_DIR", ".cache_informes")
+LIMITE_CACHE_BYTES = 1024 * 1024 * 1024
+NOMBRE_MANIFIESTO = "manifiesto_lote.json"
+
+# Cambiar este número cuando cambie la forma de generar los informes, para no reutilizar los anteriores
+VERSION_INFORMES = 1
+
+# Entradas de la clave, en el orden en que se explican los cambios
+COMPONENTES = ("plantilla", "marcadores", "grafico", "correccion", "encabezado", "pie",
+               "supervisor", "recomendaciones", "version")
+
+def huella(datos):
+    """SHA-256 de bytes o texto; "" si no hay datos."""
+    if datos is None:
+        return ""
+    if isinstance(datos, str):
+        datos = datos.encode("utf-8")
+    return hashlib.sha256(datos).hexdigest()
+
+@lru_cache(maxsize=256)
+def _huella_archivo(ruta, tamano, mtime_ns):
+    with open(ruta, "rb") as f:
+        return huella(f.read())
+
+def huella_archivo(ruta):
+    """SHA-256 del contenido de un archivo; se calcula una vez mientras el archivo no cambie."""
+    estado = os.stat(ruta)
+    return _huella_archivo(os.path.abspath(ruta), estado.st_size, estado.st_mtime_ns)
+
+def _huella_imagen(imagen):
+    if imagen is None or isinstance(imagen, bytes):
+        return huella(imagen)
+    return huella_archivo(imagen)
+
+def componentes(ruta_plantilla, placeholders, recursos, selected_supervisor, recomendaciones):
+    """Huella de cada entrada del informe (ver COMPONENTES)."""
+    return {
+        "plantilla": huella_archivo(ruta_plantilla),
+        "marcadores": huella(json.dumps(placeholders, sort_keys=True, ensure_ascii=False, default=str)),
+        "grafico": _huella_imagen(recursos.get("grafico")),
+        "correccion": _huella_imagen(recursos.get("correccion")),
+        "encabezado": _huella_imagen(recursos.get("encabezado")),
+        "pie": _huella_imagen(recursos.get("pie")),
+        "supervisor": huella(selected_supervisor),
+        "recomendaciones": huella(recomendaciones or ""),
+        "version": str(VERSION_INFORMES),
+    }
+
+def clave(huellas):
+    """Clave del informe a partir de las huellas de sus entradas."""
+    return huella(json.dumps(huellas, sort_keys=True))
+
+def motivo(anterior, huellas):
+    """Por qué hay que regenerar un informe, comparando con su entrada del manifiesto anterior."""
+    if not anterior:
+        return "sin informe anterior"
+    cambios = [nombre for nombre in COMPONENTES if anterior.get("componentes", {}).get(nombre) != huellas.get(nombre)]
+    if cambios:
+        return "cambió: " + ", ".join(cambios)
+    return "sin cambios, pero no está en la caché"
+
+def _ruta(clave_informe, extension):
+    return os.path.join(CARPETA_CACHE, clave_informe + extension)
+
+def buscar(clave_informe, extension):
+    """Ruta del informe guardado con esa clave y extensión (".docx" o ".pdf"), o None."""
+    if not CARPETA_CACHE:
+        return None
+    ruta = _ruta(clave_informe, extension)
+    try:
+        os.utime(ruta)  # Marca el informe como usado recientemente
+        return ruta
+    except OSError:
+        return None
+
+def copiar(origen, destino):
+    """Copia un archivo sin dejar nunca el destino a medio escribir."""
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    try:
+        shutil.copyfile(origen, temporal)
+        os.replace(temporal, destino)
+    except OSError:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+def guardar(clave_informe, ruta, extension):
+    """Guarda en la caché una copia del informe generado en `ruta`."""
+    if not CARPETA_CACHE:
+        return
+    try:
+        os.makedirs(CARPETA_CACHE, exist_ok=True)
+        destino = _ruta(clave_informe, extension)
+        copiar(ruta, destino)
+        limpiar_cache(conservar=destino)
+    except OSError:
+        pass  # Sin caché el siguiente lote simplemente vuelve a generar el informe
+
+def limpiar_cache(carpeta_cache=None, limite_bytes=None, conservar=None):
+    """Elimina los informes menos usados hasta quedar por debajo del límite. `conservar` nunca se elimina."""
+    carpeta_cache = carpeta_cache or CARPETA_CACHE
+    limite_bytes = LIMITE_CACHE_BYTES if limite_bytes is None else limite_bytes
+    archivos = []
+    for archivo in os.listdir(carpeta_cache):
+        if archivo.endswith((".docx", ".pdf")):
+            ruta = os.path.join(carpeta_cache, archivo)
+            try:
+                estado = os.stat(ruta)
+            except OSError:
+                continue
+            archivos.append((estado.st_mtime, estado.st_size, ruta))
+    total = sum(tamano for _, tamano, _ in archivos)
+    for _, tamano, ruta in sorted(archivos):
+        if total <= limite_bytes:
+            break
+        if ruta == conservar:
+            continue
+        try:
+            os.remove(ruta)
+            total -= tamano
+        except OSError:
+            pass  # Otro proceso pudo haberlo eliminado ya
+
+def leer_manifiesto(carpeta_salida):
+    """Entradas del manifiesto del lote anterior en la carpeta, por nombre de archivo del informe."""
+    try:
+        with open(os.path.join(carpeta_salida, NOMBRE_MANIFIESTO), encoding="utf-8") as f:
+            manifiesto = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {entrada["archivo"]: entrada for entrada in manifiesto.get("informes", [])}
+
+def escribir_manifiesto(carpeta_salida, entradas):
+    """Guarda el manifiesto del lote (una entrada por informe) en la carpeta de salida."""
+    manifiesto = {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "version": VERSION_INFORMES,
+        "informes": entradas,
+    }
+    ruta = os.path.join(carpeta_salida, NOMBRE_MANIFIESTO)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+    return ruta
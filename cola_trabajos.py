@@ -0,0 +1,148 @@
+"""
+Cola de trabajos del servidor, compartida por todas las sesiones de Streamlit.
+
+La generación no se ejecuta en el hilo de la sesión: cada pedido se pone en la cola
+de su carril y lo toma un grupo acotado de hilos. Hay un carril para los informes
+individuales y otro para los lotes, así que un lote de cientos de informes no deja
+esperando el informe de otra persona. Si un carril ya tiene MAXIMO_EN_ESPERA
+trabajos esperando, los pedidos nuevos se rechazan con ColaLlena en lugar de
+acumularse.
+
+Cada trabajo es un diccionario con su estado ("en cola", "en curso", "terminado" o
+"error"), su progreso, los avisos que registró y su resultado; la interfaz lo
+consulta con `estado(id)`. Mientras se ejecuta tiene una carpeta de trabajo propia
+("carpeta"), que se elimina al terminar. Los trabajos terminados se olvidan pasadas
+RETENCION_SEGUNDOS.
+
+Variables de entorno: COLA_HILOS_INFORMES, COLA_HILOS_LOTES, COLA_MAXIMO_EN_ESPERA
+y TRABAJOS_DIR (carpeta donde se crean las carpetas de trabajo).
+"""
+import os
+import time
+import uuid
+import shutil
+import logging
+import tempfile
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+CARRILES = {
+    "informe": int(os.environ.get("COLA_HILOS_INFORMES", "2")),
+    "lote": int(os.environ.get("COLA_HILOS_LOTES", "1")),
+}
+MAXIMO_EN_ESPERA = int(os.environ.get("COLA_MAXIMO_EN_ESPERA", "10"))
+RETENCION_SEGUNDOS = 3600
+CARPETA_TRABAJOS = os.environ.get("TRABAJOS_DIR") or None
+
+log = logging.getLogger("informes.cola_trabajos")
+
+_trabajos = {}
+_grupos = {}
+_candado = threading.Lock()
+_actual = contextvars.ContextVar("trabajo_actual", default=None)
+
+class ColaLlena(RuntimeError):
+    """El carril ya tiene MAXIMO_EN_ESPERA trabajos esperando."""
+
+class _AvisosDelTrabajo(logging.Handler):
+    """Guarda en el trabajo en curso los avisos y errores del logger "informes"."""
+
+    def emit(self, record):
+        trabajo = _actual.get()
+        if trabajo is not None:
+            trabajo["avisos"].append((record.levelname, record.getMessage()))
+
+def _grupo(carril):
+    if carril not in _grupos:
+        if not _grupos:
+            from registro import configurar_registro
+            configurar_registro()
+            logging.getLogger("informes").addHandler(_AvisosDelTrabajo(logging.WARNING))
+        _grupos[carril] = ThreadPoolExecutor(max_workers=CARRILES[carril], thread_name_prefix=f"cola-{carril}")
+    return _grupos[carril]
+
+def _olvidar_viejos():
+    limite = time.time() - RETENCION_SEGUNDOS
+    for id_trabajo in [i for i, t in _trabajos.items() if t["terminado"] and t["terminado"] < limite]:
+        del _trabajos[id_trabajo]
+
+def enviar(carril, funcion, *args, sesion=None, descripcion=""):
+    """
+    Pone en la cola del carril la llamada `funcion(trabajo, *args)` y devuelve el id
+    del trabajo. La función recibe su propio diccionario de trabajo (para su
+    "carpeta" y para informar el progreso con `progresar`) y lo que devuelva queda
+    en "resultado". Lanza ColaLlena si el carril está saturado.
+    """
+    with _candado:
+        _olvidar_viejos()
+        en_espera = sum(1 for t in _trabajos.values() if t["carril"] == carril and t["estado"] == "en cola")
+        if en_espera >= MAXIMO_EN_ESPERA:
+            raise ColaLlena(f"Hay {en_espera} trabajos esperando en la cola de {carril}; intenta de nuevo en unos minutos.")
+        trabajo = {
+            "id": uuid.uuid4().hex,
+            "carril": carril,
+            "sesion": sesion,
+            "descripcion": descripcion,
+            "estado": "en cola",
+            "creado": time.time(),
+            "iniciado": None,
+            "terminado": None,
+            "progreso": None,
+            "avisos": [],
+            "resultado": None,
+            "error": "",
+            "carpeta": None,
+        }
+        _trabajos[trabajo["id"]] = trabajo
+        grupo = _grupo(carril)
+    # Contexto vacío: el trabajo no hereda nada de la sesión que lo pidió
+    grupo.submit(contextvars.Context().run, _ejecutar, trabajo, funcion, args)
+    log.info("Trabajo %s en cola (%s): %s", trabajo["id"], carril, descripcion)
+    return trabajo["id"]
+
+def _ejecutar(trabajo, funcion, args):
+    _actual.set(trabajo)
+    trabajo["iniciado"] = time.time()
+    trabajo["carpeta"] = tempfile.mkdtemp(prefix=f"trabajo_{trabajo['id'][:8]}_", dir=CARPETA_TRABAJOS)
+    trabajo["estado"] = "en curso"
+    try:
+        trabajo["resultado"] = funcion(trabajo, *args)
+        trabajo["estado"] = "terminado"
+    except Exception as e:
+        log.warning("El trabajo %s falló: %s", trabajo["id"], e)
+        trabajo["error"] = str(e)
+        trabajo["estado"] = "error"
+    finally:
+        shutil.rmtree(trabajo["carpeta"], ignore_errors=True)
+        trabajo["terminado"] = time.time()
+        log.info("Trabajo %s %s en %.1f s", trabajo["id"], trabajo["estado"],
+                 trabajo["terminado"] - trabajo["iniciado"])
+
+def progresar(trabajo, hechos, total):
+    """Anota el avance de un trabajo (por ejemplo, informes hechos de un lote)."""
+    trabajo["progreso"] = (hechos, total)
+
+def estado(id_trabajo):
+    """
+    Copia del trabajo con su "posicion" en la cola (1 = el siguiente; 0 si ya empezó),
+    o None si no existe o ya se olvidó.
+    """
+    with _candado:
+        trabajo = _trabajos.get(id_trabajo)
+        if trabajo is None:
+            return None
+        copia = dict(trabajo, avisos=list(trabajo["avisos"]))
+        copia["posicion"] = 0
+        if trabajo["estado"] == "en cola":
+            copia["posicion"] = 1 + sum(1 for t in _trabajos.values()
+                                        if t["carril"] == trabajo["carril"] and t["estado"] == "en cola"
+                                        and t["creado"] < trabajo["creado"])
+        return copia
+
+def ocupacion():
+    """Trabajos esperando y en curso por carril."""
+    with _candado:
+        return {carril: {"en cola": sum(1 for t in _trabajos.values() if t["carril"] == carril and t["estado"] == "en cola"),
+                         "en curso": sum(1 for t in _trabajos.values() if t["carril"] == carril and t["estado"] == "en curso")}
+                for carril in CARRILES}
@@ -0,0 +1,299 @@
+"""
+Conversión de informes Word a PDF con LibreOffice sin interfaz (headless).
+
+Se mantiene un grupo de trabajadores de larga duración, cada uno con su propio
+LibreOffice y su propio perfil de usuario, que toman los trabajos de una cola
+común. Abrir LibreOffice cuesta varios segundos; así se abre una vez por
+trabajador y no una vez por informe.
+
+La cola tiene prioridades: las conversiones de un informe suelto
+(PRIORIDAD_INFORME) pasan delante de las de un lote (PRIORIDAD_LOTE), así que el
+PDF que alguien espera en la página no queda detrás de cientos de informes de un
+lote; a lo sumo espera a que un trabajador termine el documento que tiene entre
+manos. Dentro de cada prioridad se respeta el orden de llegada.
+
+- Si el módulo `uno` de LibreOffice se puede importar, cada trabajador deja un
+  soffice escuchando en un puerto local y convierte los documentos por UNO sin
+  volver a arrancarlo.
+- Si no (por ejemplo, en un entorno virtual sin python3-uno), cada trabajador
+  llama a `soffice --convert-to pdf` con su perfil ya inicializado, que es lo
+  más lento del primer arranque. Aun así cada documento arranca un LibreOffice
+  nuevo, así que al iniciar el grupo se avisa en el registro; packages.txt
+  instala python3-uno para que no haga falta.
+
+Cada trabajo tiene un tiempo máximo (TIEMPO_MAXIMO_TRABAJO); si se supera, o si
+LibreOffice se cae, se mata el proceso, el trabajo termina con error y el
+trabajador arranca un LibreOffice nuevo para el siguiente trabajo.
+La ruta de LibreOffice se puede indicar con la variable de entorno SOFFICE.
+"""
+import os
+import queue
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import atexit
+import logging
+import itertools
+from concurrent.futures import Future
+
+TIEMPO_MAXIMO_TRABAJO = 120   # segundos por documento
+TIEMPO_ARRANQUE = 60          # segundos para que LibreOffice acepte conexiones
+FILTRO_PDF = "writer_pdf_Export"
+
+PRIORIDAD_INFORME = 1
+PRIORIDAD_LOTE = 2
+_PRIORIDAD_FIN = 0   # Para detener los trabajadores sin esperar a los trabajos en cola
+
+log = logging.getLogger("informes.conversion_pdf")
+
+_cola = queue.PriorityQueue()
+_orden = itertools.count()   # Desempata por orden de llegada dentro de cada prioridad
+_trabajadores = []
+_candado = threading.Lock()
+
+def ruta_soffice():
+    """Ruta del ejecutable de LibreOffice, o None si no está instalado."""
+    candidatos = [os.environ.get("SOFFICE"), "soffice", "libreoffice",
+                  "/Applications/LibreOffice.app/Contents/MacOS/soffice",
+                  r"C:\Program Files\LibreOffice\program\soffice.exe"]
+    for candidato in candidatos:
+        if candidato and shutil.which(candidato):
+            return shutil.which(candidato)
+    return None
+
+def _hay_uno():
+    try:
+        import uno  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _url_perfil(carpeta):
+    return "file:///" + os.path.abspath(carpeta).replace(os.sep, "/").lstrip("/")
+
+def _lanzar(argumentos):
+    """Lanza LibreOffice en su propio grupo de procesos para poder matarlo entero."""
+    opciones = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    if os.name == "posix":
+        opciones["start_new_session"] = True
+    return subprocess.Popen(argumentos, **opciones)
+
+def _matar(proceso):
+    if proceso is None or proceso.poll() is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(proceso.pid, signal.SIGKILL)
+        else:
+            proceso.kill()
+        proceso.wait(timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+def _argumentos_base(trabajador):
+    return [trabajador["soffice"], "--headless", "--invisible", "--nologo", "--nodefault",
+            "--norestore", "--nolockcheck", f"-env:UserInstallation={_url_perfil(trabajador['perfil'])}"]
+
+# ----------------- Conversión por UNO (LibreOffice residente) -----------------
+
+def _propiedades(**valores):
+    from com.sun.star.beans import PropertyValue
+    propiedades = []
+    for nombre, valor in valores.items():
+        propiedad = PropertyValue()
+        propiedad.Name = nombre
+        propiedad.Value = valor
+        propiedades.append(propiedad)
+    return tuple(propiedades)
+
+def _arrancar_uno(trabajador):
+    import uno
+    puerto = _puerto_libre()
+    trabajador["proceso"] = _lanzar(_argumentos_base(trabajador) + [
+        f"--accept=socket,host=127.0.0.1,port={puerto};urp;StarOffice.ComponentContext"])
+    local = uno.getComponentContext()
+    resolvedor = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+    limite = time.monotonic() + TIEMPO_ARRANQUE
+    while True:
+        try:
+            contexto = resolvedor.resolve(
+                f"uno:socket,host=127.0.0.1,port={puerto};urp;StarOffice.ComponentContext")
+            break
+        except Exception:
+            if trabajador["proceso"].poll() is not None or time.monotonic() > limite:
+                _matar(trabajador["proceso"])
+                raise RuntimeError("LibreOffice no arrancó para convertir a PDF.")
+            time.sleep(0.25)
+    trabajador["escritorio"] = contexto.ServiceManager.createInstanceWithContext(
+        "com.sun.star.frame.Desktop", contexto)
+
+def _convertir_uno(trabajador, entrada, salida, tiempo_maximo):
+    import uno
+    if trabajador["proceso"] is None or trabajador["proceso"].poll() is not None:
+        _arrancar_uno(trabajador)
+    vencido = threading.Event()
+
+    def vencer():
+        vencido.set()
+        _matar(trabajador["proceso"])
+
+    reloj = threading.Timer(tiempo_maximo, vencer)
+    reloj.start()
+    try:
+        documento = trabajador["escritorio"].loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(entrada)), "_blank", 0, _propiedades(Hidden=True))
+        try:
+            documento.storeToURL(uno.systemPathToFileUrl(os.path.abspath(salida)),
+                                 _propiedades(FilterName=FILTRO_PDF))
+        finally:
+            documento.close(True)
+    except Exception as e:
+        # Un LibreOffice caído o colgado no sirve para el siguiente trabajo
+        _matar(trabajador["proceso"])
+        if vencido.is_set():
+            raise TimeoutError(f"La conversión de {os.path.basename(entrada)} superó {tiempo_maximo} s.")
+        raise RuntimeError(f"LibreOffice falló al convertir {os.path.basename(entrada)}: {e}")
+    finally:
+        reloj.cancel()
+
+# ----------------- Conversión por línea de órdenes -----------------
+
+def _convertir_cli(trabajador, entrada, salida, tiempo_maximo):
+    carpeta = trabajador["carpeta_salida"]
+    proceso = _lanzar(_argumentos_base(trabajador) + ["--convert-to", "pdf", "--outdir", carpeta,
+                                                      os.path.abspath(entrada)])
+    trabajador["proceso"] = proceso
+    try:
+        proceso.wait(timeout=tiempo_maximo)
+    except subprocess.TimeoutExpired:
+        _matar(proceso)
+        raise TimeoutError(f"La conversión de {os.path.basename(entrada)} superó {tiempo_maximo} s.")
+    generado = os.path.join(carpeta, os.path.splitext(os.path.basename(entrada))[0] + ".pdf")
+    if proceso.returncode != 0 or not os.path.exists(generado):
+        raise RuntimeError(f"LibreOffice no generó el PDF de {os.path.basename(entrada)} "
+                           f"(código {proceso.returncode}).")
+    os.replace(generado, salida)
+
+# ----------------- Grupo de trabajadores -----------------
+
+def _bucle(trabajador):
+    convertir = _convertir_uno if trabajador["uno"] else _convertir_cli
+    while True:
+        _, _, trabajo = _cola.get()
+        if trabajo is None:
+            break
+        futuro = trabajo["futuro"]
+        if not futuro.set_running_or_notify_cancel():
+            continue
+        inicio = time.perf_counter()
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(trabajo["salida"])), exist_ok=True)
+            convertir(trabajador, trabajo["entrada"], trabajo["salida"], trabajo["tiempo_maximo"])
+            futuro.segundos = time.perf_counter() - inicio
+            log.debug("PDF generado en %.2f s: %s", futuro.segundos, trabajo["salida"])
+            futuro.set_result(trabajo["salida"])
+        except Exception as e:
+            trabajador["fallos"] += 1
+            futuro.segundos = time.perf_counter() - inicio
+            log.warning("Conversión a PDF fallida (%s); el LibreOffice del trabajador se reinicia.", e)
+            futuro.set_exception(e)
+    _matar(trabajador["proceso"])
+    shutil.rmtree(trabajador["perfil"], ignore_errors=True)
+
+def iniciar(procesos=None):
+    """
+    Arranca los trabajadores que falten hasta tener `procesos` (por defecto, la mitad
+    de los núcleos). Si ya están en marcha se reutilizan; el grupo no se reduce.
+    Lanza RuntimeError si LibreOffice no está instalado.
+    """
+    soffice = ruta_soffice()
+    if soffice is None:
+        raise RuntimeError("No se encontró LibreOffice (soffice). Instálalo o indica su ruta en la "
+                           "variable de entorno SOFFICE para generar los PDF.")
+    procesos = procesos or max(1, (os.cpu_count() or 2) // 2)
+    uno_disponible = _hay_uno()
+    with _candado:
+        if not uno_disponible and len(_trabajadores) < procesos:
+            log.warning("No se puede importar el módulo uno de LibreOffice (paquete python3-uno): cada PDF "
+                        "arrancará un LibreOffice nuevo, varios segundos más lento por documento.")
+        while len(_trabajadores) < procesos:
+            perfil = tempfile.mkdtemp(prefix="informes_lo_")
+            trabajador = {
+                "soffice": soffice,
+                "perfil": perfil,
+                "carpeta_salida": os.path.join(perfil, "pdf"),
+                "uno": uno_disponible,
+                "proceso": None,
+                "escritorio": None,
+                "fallos": 0,
+            }
+            os.makedirs(trabajador["carpeta_salida"])
+            trabajador["hilo"] = threading.Thread(target=_bucle, args=(trabajador,), daemon=True,
+                                                  name=f"pdf-{len(_trabajadores)}")
+            trabajador["hilo"].start()
+            _trabajadores.append(trabajador)
+    return len(_trabajadores)
+
+def detener():
+    """Termina los trabajadores y sus LibreOffice. Los trabajos pendientes se cancelan."""
+    with _candado:
+        while True:
+            try:
+                _, _, trabajo = _cola.get_nowait()
+            except queue.Empty:
+                break
+            if trabajo is not None:
+                trabajo["futuro"].cancel()
+        for _ in _trabajadores:
+            _cola.put((_PRIORIDAD_FIN, next(_orden), None))
+        for trabajador in _trabajadores:
+            trabajador["hilo"].join(timeout=30)
+        _trabajadores.clear()
+
+atexit.register(detener)
+
+def enviar(entrada, salida, tiempo_maximo=None, prioridad=PRIORIDAD_INFORME):
+    """
+    Pone en la cola la conversión del .docx `entrada` al PDF `salida` y devuelve un
+    Future con la ruta del PDF (o la excepción del trabajo); al terminar, el atributo
+    `segundos` del Future indica lo que tardó la conversión. Arranca el grupo si hace falta.
+    Los lotes usan `prioridad=PRIORIDAD_LOTE` para no retrasar los informes sueltos.
+    """
+    if not _trabajadores:
+        iniciar()
+    futuro = Future()
+    _cola.put((prioridad, next(_orden), {"entrada": entrada, "salida": salida, "futuro": futuro,
+                                         "tiempo_maximo": tiempo_maximo or TIEMPO_MAXIMO_TRABAJO}))
+    return futuro
+
+def convertir_archivo(entrada, salida, tiempo_maximo=None):
+    """Convierte un .docx a PDF y espera el resultado."""
+    return enviar(entrada, salida, tiempo_maximo).result()
+
+def convertir_bytes(contenido, nombre="informe.docx", tiempo_maximo=None, carpeta=None):
+    """
+    Convierte un .docx en memoria y devuelve los bytes del PDF. Los archivos
+    intermedios van en una carpeta temporal dentro de `carpeta` (por ejemplo, la
+    carpeta de trabajo de un trabajo de la cola).
+    """
+    with tempfile.TemporaryDirectory(prefix="informes_pdf_", dir=carpeta) as carpeta:
+        entrada = os.path.join(carpeta, os.path.basename(nombre))
+        salida = os.path.splitext(entrada)[0] + ".pdf"
+        with open(entrada, "wb") as f:
+            f.write(contenido)
+        convertir_archivo(entrada, salida, tiempo_maximo)
+        with open(salida, "rb") as f:
+            return f.read()
+
+def ruta_pdf(ruta_docx):
+    """Ruta del PDF que corresponde a un .docx (misma carpeta y nombre)."""
+    return os.path.splitext(ruta_docx)[0] + ".pdf"
@@ -0,0 +1,107 @@
+"""
+Empaquetado de los informes de un lote en un ZIP para descargarlos de una vez.
+
+Cada informe se agrega al ZIP en cuanto termina (con su PDF, si lo hay), copiándolo
+desde su archivo de salida por bloques, así que la memoria no crece con el tamaño
+del lote. Dentro del ZIP los informes se ordenan en carpetas
+OPERADORA/TECNOLOGÍA/PROVINCIA, y al cerrar se agrega NOMBRE_MANIFIESTO_CSV con el
+número, el estado y los archivos de cada informe del lote (también los que
+fallaron). El manifiesto se va escribiendo en un archivo temporal junto al ZIP.
+
+El ZIP se escribe con otro nombre y solo se renombra a su ruta al cerrarlo, así
+que nunca queda a medio escribir; si el lote falla, `descartar` elimina los
+temporales. Si dos archivos distintos darían la misma ruta dentro del ZIP, el
+segundo se guarda con un sufijo (" (2)", " (3)"...) en lugar de repetir la
+entrada. Un resultado cuyo archivo ya está en el paquete (dos informes del lote
+escritos en el mismo archivo) no se vuelve a agregar: queda como error en el
+manifiesto.
+"""
+import os
+import csv
+import zipfile
+
+NOMBRE_ZIP = "informes_lote.zip"
+NOMBRE_MANIFIESTO_CSV = "manifiesto.csv"
+COLUMNAS_MANIFIESTO = ("numero", "parroquia", "provincia", "operadora", "tecnologia", "estado", "accion",
+                       "error", "docx", "pdf")
+
+def _carpeta(valor, sin_valor):
+    """Nombre de carpeta dentro del ZIP a partir de un valor de la fila."""
+    texto = str(valor or "").strip().upper()
+    for caracter in '/\\:*?"<>|':
+        texto = texto.replace(caracter, "_")
+    return texto or sin_valor
+
+def ruta_en_zip(resultado, ruta):
+    """Ruta de un archivo del informe dentro del ZIP: OPERADORA/TECNOLOGÍA/PROVINCIA/archivo."""
+    return "/".join((_carpeta(resultado["operadora"], "SIN_OPERADORA"),
+                     _carpeta(resultado["tecnologia"], "SIN_TECNOLOGIA"),
+                     _carpeta(resultado.get("provincia"), "SIN_PROVINCIA"),
+                     os.path.basename(ruta)))
+
+def abrir(ruta_zip):
+    """Empieza un paquete nuevo en `ruta_zip` y lo devuelve para agregar y cerrar."""
+    os.makedirs(os.path.dirname(os.path.abspath(ruta_zip)), exist_ok=True)
+    temporal = f"{ruta_zip}.{os.getpid()}.tmp"
+    manifiesto = open(f"{temporal}.csv", "w", encoding="utf-8-sig", newline="")
+    escritor = csv.DictWriter(manifiesto, fieldnames=COLUMNAS_MANIFIESTO)
+    escritor.writeheader()
+    return {
+        "ruta": ruta_zip,
+        "temporal": temporal,
+        "zip": zipfile.ZipFile(temporal, "w", zipfile.ZIP_DEFLATED, allowZip64=True),
+        "manifiesto": manifiesto,
+        "escritor": escritor,
+        "informes": 0,
+        "nombres": set(),
+        "archivos": set(),
+    }
+
+def _nombre_libre(paquete, nombre):
+    """`nombre` o, si ya está en el ZIP, el mismo con el primer sufijo " (n)" libre."""
+    base, extension = os.path.splitext(nombre)
+    numero = 1
+    while nombre in paquete["nombres"]:
+        numero += 1
+        nombre = f"{base} ({numero}){extension}"
+    paquete["nombres"].add(nombre)
+    return nombre
+
+def agregar(paquete, resultado):
+    """Agrega al paquete los archivos de un resultado del lote y su fila del manifiesto."""
+    fila = {columna: resultado.get(columna, "") for columna in COLUMNAS_MANIFIESTO}
+    fila["docx"] = fila["pdf"] = ""
+    if resultado["estado"] == "OK" and os.path.abspath(resultado["salida"]) in paquete["archivos"]:
+        fila["estado"] = "ERROR"
+        fila["error"] = "Otro informe del lote se guardó en el mismo archivo; no se agrega dos veces."
+    elif resultado["estado"] == "OK":
+        # El .docx ya es un ZIP comprimido: se guarda tal cual para no gastar tiempo en recomprimirlo
+        for columna, ruta, compresion in (("docx", resultado["salida"], zipfile.ZIP_STORED),
+                                          ("pdf", resultado.get("pdf"), zipfile.ZIP_DEFLATED)):
+            if ruta and os.path.exists(ruta):
+                paquete["archivos"].add(os.path.abspath(ruta))
+                fila[columna] = _nombre_libre(paquete, ruta_en_zip(resultado, ruta))
+                paquete["zip"].write(ruta, fila[columna], compress_type=compresion)
+        paquete["informes"] += 1
+    paquete["escritor"].writerow(fila)
+
+def cerrar(paquete):
+    """Agrega el manifiesto, termina el ZIP y devuelve su ruta."""
+    paquete["manifiesto"].close()
+    try:
+        paquete["zip"].write(paquete["manifiesto"].name, NOMBRE_MANIFIESTO_CSV)
+        paquete["zip"].close()
+        os.replace(paquete["temporal"], paquete["ruta"])
+    finally:
+        os.remove(paquete["manifiesto"].name)
+    return paquete["ruta"]
+
+def descartar(paquete):
+    """Cierra el paquete sin terminarlo y elimina sus archivos temporales."""
+    try:
+        paquete["manifiesto"].close()
+        paquete["zip"].close()
+    finally:
+        for ruta in (paquete["temporal"], paquete["manifiesto"].name):
+            if os.path.exists(ruta):
+                os.remove(ruta)
@@ -0,0 +1,564 @@
+"""
+Generación de informes de cobertura, sin interfaz.
+
+Aquí está todo el proceso de un informe (marcadores, encabezados y pies, gráfico,
+imágenes, supervisor y recomendaciones) para usarlo desde la aplicación de
+Streamlit (informe.py), el modo lote (lote.py), la línea de órdenes
+(generar_informes.py) o cualquier otro script. Importarlo no arranca Streamlit,
+no cambia la localización y no carga pandas: pandas solo se importa al leer un
+consolidado (leer_consolidado).
+
+La función principal es `generar(placeholders, plantilla, recursos, ...)`, que
+devuelve los bytes del .docx. Los avisos para el usuario (archivos ambiguos,
+secciones que faltan) se emiten con logging en el logger "informes.generador".
+"""
+import re
+import logging
+from io import BytesIO
+from collections import Counter
+from concurrent.futures import Future
+
+from docx.oxml import OxmlElement
+from docx.shared import Inches, Cm, Pt
+from docx.text.paragraph import Paragraph
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+import conversion_pdf
+import precarga
+from cache_imagenes import obtener_imagen, normalizar
+from indice_carpetas import buscar_archivo, buscar_por_nombre
+from indice_cobertura import construir_indice, comprobar_columnas, estandarizar_operadora
+from marcadores import CLAVES_MARCADORES
+from sustitucion import sustituir_parrafo
+from plantillas import (localizar_elementos, aplicar_textos, aplicar_marcadores, aplicar_supervisor_y_recomendaciones,
+                        ancla, obtener_plantilla, nuevo_documento)
+from registro import medir, cronometrado
+
+log = logging.getLogger("informes.generador")
+
+SUPERVISORES = [
+    "Ing. Mauricio Sánchez Pinos",
+    "Ing. Mesías Vizuete López",
+    "Ing. Felipe Zumba Arichavala",
+    "Ing. Ramiro Hurtado Figueroa"
+]
+
+# Ancho impreso de las imágenes del informe (gráfico, corrección de mapa, encabezado y pie)
+ANCHO_IMAGENES_PULGADAS = 6
+
+# Hoja de los Excel de mediciones con el gráfico del informe, que es su SEGUNDA imagen
+HOJA_GRAFICO = "MAPAS SMA-QoS-9"
+POSICION_GRAFICO = 1
+
+# Recursos de un informe sin imágenes; buscar_recursos devuelve el mismo diccionario
+SIN_RECURSOS = {"grafico": None, "excel_grafico": None, "encabezado": None, "pie": None, "correccion": None}
+
+# ----------------- Funciones originales -----------------
+
+def extract_info_from_filename(filename):
+    """
+    Extrae la información del nombre del archivo Word, en particular la parroquia.
+    Se espera un formato: PARROQUIA_XXG_OPERADORA_TIPO.docx
+    """
+    match = re.match(r"(.*)_(\dG)_(.*)_(.*)\.docx", filename)
+    if match:
+        parroquia = match.group(1).replace("_", " ").upper()
+        tecnologia = match.group(2)
+        tipo_medicion = match.group(4).upper()
+        # Estandarizar el nombre del operador (CONECEL -> CONECEL S.A.)
+        operadora = estandarizar_operadora(match.group(3))
+        log.debug("Archivo Word procesado: Parroquia=%s, Tecnología=%s, Operadora=%s, Tipo=%s", parroquia, tecnologia, operadora, tipo_medicion)
+        return parroquia, tecnologia, operadora, tipo_medicion
+    log.debug("Formato de nombre de archivo incorrecto.")
+    return None, None, None, None
+
+def replace_texts(paragraph, placeholders, counter, literales=None, sin_reemplazo=None):
+    """
+    Reemplaza marcadores en el párrafo, aunque Word los haya partido en varios runs.
+    Usa un contador mutable para las fechas con el marcador «FECHA_CRONOGRAMA_DE_MEDICION_2024».
+    """
+    return sustituir_parrafo(paragraph, placeholders, counter, literales, sin_reemplazo)
+
+@cronometrado("encabezados_pies")
+def process_headers_and_footers(doc, placeholders, sin_reemplazo=None):
+    """Procesa encabezados y pies de página del documento Word,
+    asegurando que los marcadores de fecha y número de informe se inserten como texto plano.
+    """
+    for section in doc.sections:
+        header = section.header
+        footer = section.footer
+
+        # Procesar encabezados que estén dentro de tablas (si existen)
+        for table in header.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    for paragraph in cell.paragraphs:
+                        # Procesar fecha de informe con "Cuenca,"
+                        if "«FECHA_DE_INFORME»" in paragraph.text:
+                            paragraph.clear()
+                            run = paragraph.add_run("Cuenca, ")  # Agregar "Cuenca, "
+                            run.font.name = 'Arial'
+                            run.font.size = Pt(9)
+                            run = paragraph.add_run(placeholders.get("«FECHA_DE_INFORME»", ""))
+                            run.font.name = 'Arial'
+                            run.font.size = Pt(9)
+                        
+                        # Procesar número de informe
+                        if "«NÚMERO__DE_INFORME»" in paragraph.text:
+                            paragraph.clear()
+                            run = paragraph.add_run(placeholders.get("«NÚMERO__DE_INFORME»", ""))
+                            run.font.name = 'Arial'
+                            run.font.size = Pt(10)
+
+        # Procesar párrafos del encabezado fuera de tablas
+        for paragraph in header.paragraphs:
+            # Procesar fecha de informe con "Cuenca,"
+            if "«FECHA_DE_INFORME»" in paragraph.text:
+                paragraph.clear()
+                run = paragraph.add_run("Cuenca, ")  # Agregar "Cuenca, "
+                run.font.name = 'Arial'
+                run.font.size = Pt(9)
+                run = paragraph.add_run(placeholders.get("«FECHA_DE_INFORME»", ""))
+                run.font.name = 'Arial'
+                run.font.size = Pt(9)
+            
+            # Procesar número de informe
+            if "«NÚMERO__DE_INFORME»" in paragraph.text:
+                paragraph.clear()
+                run = paragraph.add_run(placeholders.get("«NÚMERO__DE_INFORME»", ""))
+                run.font.name = 'Arial'
+                run.font.size = Pt(10)
+
+        # El procesamiento del pie de página permanece sin cambios
+        for paragraph in footer.paragraphs:
+            replace_texts(paragraph, placeholders, [0], sin_reemplazo=sin_reemplazo)
+        for table in footer.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    for paragraph in cell.paragraphs:
+                        replace_texts(paragraph, placeholders, [0], sin_reemplazo=sin_reemplazo)
+
+@cronometrado("sustitucion")
+def process_doc_elements(doc, placeholders, selected_supervisor, recomendaciones, sin_reemplazo=None,
+                         ubicaciones=None):
+    """
+    Recorre los elementos (párrafos y tablas) del cuerpo del documento,
+    reemplazando marcadores y actualizando según el supervisor seleccionado.
+    Si el documento es copia de un modelo compilado, `ubicaciones` evita volver a recorrerlo.
+    """
+    if ubicaciones is None:
+        ubicaciones = localizar_elementos(doc)
+    return aplicar_textos(doc, ubicaciones, placeholders, selected_supervisor, recomendaciones, sin_reemplazo)
+
+# ----------------- Funciones nuevas para buscar e insertar el gráfico -----------------
+
+def como_imagen(imagen):
+    """Las imágenes pueden llegar como ruta o como bytes; add_picture acepta ruta o stream."""
+    if isinstance(imagen, bytes):
+        return BytesIO(imagen)
+    return imagen
+
+@cronometrado("extraccion_grafico")
+def buscar_grafico(parroquia, carpeta, parroquias=()):
+    """
+    Extrae imágenes incrustadas directamente en la hoja de Excel.
+    Ahora selecciona la SEGUNDA imagen en la hoja.
+    Devuelve los bytes de la imagen (sin decodificar) y la ruta del Excel.
+    `parroquias` (todas las del consolidado) evita tomar el Excel de otra parroquia cuyo nombre contiene a esta.
+    """
+    log.debug("Buscando imagen PNG para %s en %s", parroquia, carpeta)
+    ruta_excel, candidatos = buscar_archivo(carpeta, "libros", parroquia, parroquias)
+    if ruta_excel is None:
+        return None, None
+    if len(candidatos) > 1:
+        log.warning("Varios Excel de gráficos coinciden con %s; se usa %s.", parroquia, ruta_excel)
+    log.debug("Excel encontrado: %s", ruta_excel)
+    # Se leen solo las relaciones hoja -> dibujo -> imagen del zip, sin cargar el libro,
+    # y solo si la imagen de este Excel no está ya en la caché
+    try:
+        # Tomar la SEGUNDA imagen
+        imagen = obtener_imagen(ruta_excel, HOJA_GRAFICO, POSICION_GRAFICO)
+        if imagen is None:
+            log.error("No se encontraron suficientes imágenes en la hoja.")
+            return None, None
+        log.debug("Imagen extraída de: %s", ruta_excel)
+        return imagen, ruta_excel
+    except Exception as e:
+        log.error("Error al leer las imágenes del Excel: %s", e)
+        return None, None
+
+@cronometrado("insercion_imagenes")
+def insertar_grafico_en_word(doc, imagen, ruta_excel, parrafo=None):
+    """
+    Inserta el gráfico en el documento Word después del texto 'RESULTADOS'.
+    `imagen` puede ser la ruta del archivo o sus bytes.
+    Si se pasa `parrafo` (el ancla ya localizada en el modelo), no se busca.
+    """
+    log.debug("Insertando gráfico en el documento")
+    if parrafo is None:
+        # Buscar el párrafo exacto donde aparece "RESULTADOS CONECEL S.A." (o OTECEL)
+        parrafo = ancla(doc, "resultados")
+
+    if parrafo is not None:
+        # Insertar la imagen directamente después del texto del ancla
+        run = parrafo.add_run()
+        run.add_picture(como_imagen(imagen), width=Inches(ANCHO_IMAGENES_PULGADAS))  # Ajustar el ancho a 6 pulgadas (más razonable)
+
+        log.debug("Gráfico insertado correctamente.")
+    else:
+        log.error("No se encontró la sección 'RESULTADOS CONECEL S.A.' en el documento.")
+
+def buscar_imagenes_encabezado_pie(carpeta):
+    """
+    Busca las imágenes PNG llamadas 'encabezado' y 'pie de página' en la carpeta especificada.
+    """
+    encabezado_path = buscar_por_nombre(carpeta, "encabezado.png")
+    if encabezado_path:
+        log.debug("Imagen de encabezado encontrada: %s", encabezado_path)
+    pie_path = buscar_por_nombre(carpeta, "pie de pagina.png")
+    if pie_path:
+        log.debug("Imagen de pie de página encontrada: %s", pie_path)
+
+    return encabezado_path, pie_path
+
+@cronometrado("insercion_imagenes")
+def reemplazar_imagenes_encabezado_pie(doc, encabezado_path, pie_path):
+    """
+    Reemplaza las imágenes en el encabezado y pie de página del documento Word.
+    """
+    log.debug("Reemplazando imágenes en encabezado y pie de página")
+
+    for section in doc.sections:
+        header = section.header
+        footer = section.footer
+
+        # Eliminar imágenes existentes en el encabezado
+        for paragraph in header.paragraphs:
+            for run in paragraph.runs:
+                if run._element.xpath(".//w:drawing"):
+                    run._element.clear()
+
+        # Insertar nueva imagen en el encabezado
+        header_paragraph = header.paragraphs[0]
+        header_run = header_paragraph.add_run()
+        header_run.add_picture(como_imagen(encabezado_path), width=Inches(ANCHO_IMAGENES_PULGADAS))
+
+        # Eliminar imágenes existentes en el pie de página
+        for paragraph in footer.paragraphs:
+            for run in paragraph.runs:
+                if run._element.xpath(".//w:drawing"):
+                    run._element.clear()
+
+        # Insertar nueva imagen en el pie de página
+        footer_paragraph = footer.paragraphs[0]
+        footer_run = footer_paragraph.add_run()
+        footer_run.add_picture(como_imagen(pie_path), width=Inches(ANCHO_IMAGENES_PULGADAS))
+
+    log.debug("Imágenes en encabezado y pie de página reemplazadas correctamente.")
+
+@cronometrado("encabezados_pies")
+def ajustar_margenes(doc):
+    """
+    Ajusta los márgenes del documento Word.
+    """
+    log.debug("Ajustando márgenes del documento")
+
+    for section in doc.sections:
+        section.top_margin = Cm(4)
+        section.bottom_margin = Cm(2.54)
+        section.left_margin = Cm(2.54)
+        section.right_margin = Cm(2.54)
+
+    log.debug("Márgenes ajustados correctamente.")
+
+def buscar_imagen_correccion_mapa(parroquia, carpeta, parroquias=()):
+    """
+    Busca una imagen PNG o JPEG en la carpeta especificada que contenga el nombre de la parroquia.
+    `parroquias` (todas las del consolidado) evita tomar la imagen de otra parroquia cuyo nombre contiene a esta.
+    """
+    log.debug("Buscando imagen de corrección de mapa para %s en %s", parroquia, carpeta)
+    img_path, candidatos = buscar_archivo(carpeta, "imagenes", parroquia, parroquias)
+    if len(candidatos) > 1:
+        log.warning("Varias imágenes de corrección de mapa coinciden con %s; se usa %s.", parroquia, img_path)
+    if img_path:
+        log.debug("Imagen de corrección de mapa encontrada: %s", img_path)
+    return img_path
+
+@cronometrado("insercion_imagenes")
+def insertar_imagen_correccion_mapa(doc, img_path, parrafo=None):
+    """
+    Inserta la imagen de corrección de mapa en el documento Word después de 'Imagen 3.- Porcentaje de Cobertura WCDMA (3G), parámetro RSCP.'
+    Su título va en un párrafo propio que agrega insertar_titulo_correccion_mapa.
+    Si se pasa `parrafo` (el ancla ya localizada en el modelo), no se busca.
+    """
+    log.debug("Insertando imagen de corrección de mapa en el documento")
+    if parrafo is None:
+        # Buscar el párrafo exacto donde aparece "Imagen 3.- Porcentaje de Cobertura WCDMA (3G), parámetro RSCP."
+        parrafo = ancla(doc, "imagen_3")
+
+    if parrafo is not None:
+        # Insertar la imagen directamente después del texto del ancla
+        run = parrafo.add_run()
+        run.add_picture(como_imagen(img_path), width=Inches(ANCHO_IMAGENES_PULGADAS))  # Ajustar el ancho a 6 pulgadas (más razonable)
+        log.debug("Imagen de corrección de mapa insertada correctamente.")
+    else:
+        log.error("No se encontró la sección 'Imagen 3.- Porcentaje de Cobertura WCDMA (3G), parámetro RSCP.' en el documento.")
+
+def insertar_titulo_correccion_mapa(doc, parrafo=None):
+    """
+    Agrega el texto "Imagen 4.- Corrección mapa de cobertura." con fuente Arial 9 y
+    "Imagen 4.-" en negrita, en un párrafo centrado justo después del de la imagen.
+    Es un párrafo nuevo entre los del modelo: mueve las rutas de las ubicaciones que
+    vienen detrás, así que se agrega cuando ya no se van a usar (ver firmar_informe).
+    """
+    if parrafo is None:
+        parrafo = ancla(doc, "imagen_3")
+    if parrafo is None:
+        return
+    new_para = Paragraph(OxmlElement("w:p"), parrafo._parent)
+    new_run = new_para.add_run("Imagen 4.- ")
+    new_run.font.name = 'Arial'
+    new_run.font.size = Pt(9)
+    new_run.bold = True
+    new_run = new_para.add_run("Corrección mapa de cobertura.")
+    new_run.font.name = 'Arial'
+    new_run.font.size = Pt(9)
+    new_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    parrafo._p.addnext(new_para._p)
+
+# ----------------- Funciones para convertir Word a PDF -----------------
+
+def convert_word_to_pdf(doc_path, pdf_path):
+    """
+    Convierte un documento de Word a PDF con los LibreOffice residentes de conversion_pdf.
+    """
+    conversion_pdf.convertir_archivo(doc_path, pdf_path)
+    log.debug("Documento Word convertido a PDF y guardado en: %s", pdf_path)
+
+# ----------------- Generación de un informe -----------------
+
+def construir_placeholders(fila):
+    """
+    Devuelve el diccionario de marcadores de una fila del índice del consolidado,
+    cuyos valores ya vienen calculados por construir_tabla_marcadores.
+    """
+    return {clave: fila[clave] for clave in CLAVES_MARCADORES}
+
+def _recursos_grafico(parroquia, ruta_carpeta, parroquias):
+    """Gráfico del Excel de mediciones de la parroquia y la ruta de ese Excel."""
+    log.debug("Ruta de la carpeta de gráficos: %s", ruta_carpeta)
+    grafico, excel_grafico = buscar_grafico(parroquia, ruta_carpeta, parroquias)
+    log.debug("Ruta Excel del gráfico encontrado: %s", excel_grafico)
+    if not grafico:
+        log.warning("No se encontró un archivo Excel con la parroquia en el nombre o el gráfico no pudo extraerse.")
+    return {"grafico": grafico, "excel_grafico": excel_grafico}
+
+def _recursos_encabezado_pie(ruta_carpeta_imagenes):
+    """Imágenes de encabezado y pie de página de la carpeta de imágenes."""
+    log.debug("Ruta de la carpeta de imágenes: %s", ruta_carpeta_imagenes)
+    encabezado, pie = buscar_imagenes_encabezado_pie(ruta_carpeta_imagenes)
+    return {"encabezado": encabezado, "pie": pie}
+
+def _recursos_correccion(parroquia, ruta_carpeta, parroquias):
+    """Imagen de corrección de mapa de la parroquia."""
+    return {"correccion": buscar_imagen_correccion_mapa(parroquia, ruta_carpeta, parroquias)}
+
+def requiere_correccion(placeholders):
+    """Indica si el informe lleva imagen de corrección de mapa de cobertura."""
+    return str(placeholders.get("«REQUIERE_MODIFICAR_MAPA_DE_COBERTURA_OPE»", "")).upper() == "SI"
+
+def _busquedas(parroquia, placeholders, ruta_carpeta, ruta_carpeta_imagenes, parroquias):
+    """Búsquedas de imágenes que necesita el informe, como pares (función, argumentos)."""
+    busquedas = []
+    # Busca el archivo Excel que contenga la parroquia para extraer el gráfico
+    if ruta_carpeta != "":
+        busquedas.append((_recursos_grafico, (parroquia, ruta_carpeta, parroquias)))
+    else:
+        log.debug("La variable 'carpeta_graficos' está vacía. Ingrese una ruta válida en el campo de texto.")
+
+    # Buscar las imágenes de encabezado y pie de página
+    if ruta_carpeta_imagenes != "":
+        busquedas.append((_recursos_encabezado_pie, (ruta_carpeta_imagenes,)))
+
+    # Si modificar_mapa_de_cobertura_operadora es "SI", buscar la imagen de corrección de mapa
+    if requiere_correccion(placeholders):
+        if ruta_carpeta != "":
+            busquedas.append((_recursos_correccion, (parroquia, ruta_carpeta, parroquias)))
+        else:
+            log.warning("El informe pide corrección de mapa, pero no se indicó la carpeta de gráficos; "
+                        "se genera sin esa imagen.")
+    return busquedas
+
+def buscar_recursos(parroquia, placeholders, ruta_carpeta, ruta_carpeta_imagenes, parroquias=()):
+    """
+    Busca las imágenes que lleva el informe: el gráfico del Excel de mediciones, las
+    imágenes de encabezado y pie de página y, si corresponde, la de corrección de mapa.
+    Devuelve un diccionario con los bytes o rutas encontrados (None si falta alguno).
+    """
+    recursos = dict(SIN_RECURSOS)
+    for busqueda, argumentos in _busquedas(parroquia, placeholders, ruta_carpeta, ruta_carpeta_imagenes, parroquias):
+        recursos.update(busqueda(*argumentos))
+    return recursos
+
+def _buscar_y_normalizar(busqueda, argumentos):
+    return normalizar_recursos(busqueda(*argumentos))
+
+def precargar_recursos(parroquia, placeholders, ruta_carpeta, ruta_carpeta_imagenes, parroquias=()):
+    """
+    Como buscar_recursos, pero cada búsqueda (gráfico, encabezado y pie, corrección)
+    se lanza en el grupo de hilos de precarga y sus imágenes se normalizan allí mismo.
+    Devuelve enseguida un Future con el diccionario de recursos, que se puede pasar
+    tal cual a componer_informe.
+    """
+    return precarga.reunir([precarga.enviar(_buscar_y_normalizar, busqueda, argumentos)
+                            for busqueda, argumentos in _busquedas(parroquia, placeholders, ruta_carpeta,
+                                                                   ruta_carpeta_imagenes, parroquias)],
+                           SIN_RECURSOS)
+
+@cronometrado("normalizacion_imagenes")
+def normalizar_recursos(recursos):
+    """
+    Copia de `recursos` con las imágenes reducidas a su tamaño impreso y recomprimidas
+    (ver normalizacion_imagenes), como bytes. Cada imagen se procesa una vez por contenido.
+    """
+    normalizados = dict(recursos)
+    for nombre in ("grafico", "encabezado", "pie", "correccion"):
+        if normalizados.get(nombre):
+            normalizados[nombre] = normalizar(normalizados[nombre], ANCHO_IMAGENES_PULGADAS)
+    return normalizados
+
+def componer_informe(doc, placeholders, recursos, ubicaciones=None):
+    """
+    Rellena los marcadores del cuerpo, encabezados y pies e inserta las imágenes de
+    `recursos`, normalizadas a su tamaño impreso. `recursos` puede ser también el
+    Future de precargar_recursos: se espera por él después de sustituir los marcadores.
+    El supervisor, las recomendaciones y el título de la corrección de mapa se
+    escriben después con firmar_informe.
+    Devuelve un Counter con los marcadores que quedaron sin valor.
+    """
+    if ubicaciones is None:
+        ubicaciones = localizar_elementos(doc)
+
+    # Reemplaza marcadores en el cuerpo, encabezados y pies
+    sin_reemplazo = Counter()
+    with medir("sustitucion"):
+        aplicar_marcadores(doc, ubicaciones, placeholders, sin_reemplazo)
+    process_headers_and_footers(doc, placeholders, sin_reemplazo)
+
+    if isinstance(recursos, Future):
+        recursos = recursos.result()
+    recursos = normalizar_recursos(recursos)
+
+    if recursos["grafico"]:
+        # Insertar la imagen directamente en el mismo documento
+        insertar_grafico_en_word(doc, recursos["grafico"], recursos["excel_grafico"],
+                                 ancla(doc, "resultados", ubicaciones))
+        log.info("Gráfico insertado en la sección 'RESULTADOS'")
+
+    if recursos["encabezado"] and recursos["pie"]:
+        reemplazar_imagenes_encabezado_pie(doc, recursos["encabezado"], recursos["pie"])
+
+        # Ajustar márgenes del documento
+        ajustar_margenes(doc)
+
+    if recursos["correccion"]:
+        insertar_imagen_correccion_mapa(doc, recursos["correccion"], ancla(doc, "imagen_3", ubicaciones))
+
+    return sin_reemplazo
+
+@cronometrado("sustitucion")
+def firmar_informe(doc, selected_supervisor, recomendaciones, ubicaciones=None, correccion=False):
+    """
+    Escribe el supervisor en las tablas de firmas y las recomendaciones del informe.
+    Con `correccion` (el informe lleva imagen de corrección de mapa) agrega al final
+    su título, después de usar las ubicaciones que ese párrafo nuevo desplaza.
+    """
+    if ubicaciones is None:
+        ubicaciones = localizar_elementos(doc)
+    aplicar_supervisor_y_recomendaciones(doc, ubicaciones, selected_supervisor, recomendaciones)
+    if correccion:
+        insertar_titulo_correccion_mapa(doc, ancla(doc, "imagen_3", ubicaciones))
+
+def lleva_correccion(recursos):
+    """Indica si los recursos (diccionario o Future de precargar_recursos) traen imagen de corrección."""
+    if isinstance(recursos, Future):
+        recursos = recursos.result()
+    return bool(recursos and recursos.get("correccion"))
+
+def generar_informe(doc, placeholders, parroquia, selected_supervisor, recomendaciones,
+                    ruta_carpeta, ruta_carpeta_imagenes, ubicaciones=None, parroquias=(), recursos=None):
+    """
+    Aplica sobre el documento todo el proceso de un informe: marcadores del cuerpo,
+    encabezados y pies, gráfico de resultados, imágenes de encabezado/pie,
+    si corresponde la imagen de corrección de mapa, y por último supervisor y
+    recomendaciones.
+    `ubicaciones` son las del modelo compilado del que se copió el documento y
+    `parroquias`, los nombres de todas las parroquias del consolidado.
+    Las imágenes se precargan mientras se sustituyen los marcadores, salvo que se
+    pasen ya en `recursos` (un diccionario o un Future, como en el modo lote).
+    Devuelve un Counter con los marcadores que quedaron sin valor.
+    """
+    if ubicaciones is None:
+        ubicaciones = localizar_elementos(doc)
+    if recursos is None:
+        recursos = precargar_recursos(parroquia, placeholders, ruta_carpeta, ruta_carpeta_imagenes, parroquias)
+    sin_reemplazo = componer_informe(doc, placeholders, recursos, ubicaciones)
+    firmar_informe(doc, selected_supervisor, recomendaciones, ubicaciones, lleva_correccion(recursos))
+    return sin_reemplazo
+
+@cronometrado("guardado")
+def documento_a_bytes(doc):
+    """Guarda el documento en memoria y devuelve el contenido del .docx."""
+    salida = BytesIO()
+    doc.save(salida)
+    return salida.getvalue()
+
+def describir_sin_reemplazo(sin_reemplazo):
+    """Texto breve con los marcadores sin valor y cuántas veces aparecen."""
+    return ", ".join(f"{marcador} (x{veces})" if veces > 1 else marcador
+                     for marcador, veces in sorted(sin_reemplazo.items()))
+
+def generar(placeholders, plantilla, recursos=None, selected_supervisor=SUPERVISORES[0], recomendaciones="",
+            sin_reemplazo=None):
+    """
+    Genera un informe y devuelve los bytes del .docx.
+
+    - `placeholders`: valores de los marcadores de la fila (construir_placeholders o
+      una fila de construir_tabla_marcadores).
+    - `plantilla`: bytes del modelo Word; se interpreta una sola vez por contenido.
+    - `recursos`: imágenes del informe, como las devuelve buscar_recursos (bytes o
+      rutas), o el Future de precargar_recursos; las que falten o sean None no se insertan.
+    Los marcadores que quedan sin valor se suman en el Counter `sin_reemplazo`, si se pasa.
+    """
+    compilada = obtener_plantilla(plantilla)
+    doc = nuevo_documento(compilada)
+    if not isinstance(recursos, Future):
+        recursos = dict(SIN_RECURSOS, **(recursos or {}))
+    faltantes = componer_informe(doc, placeholders, recursos, compilada["ubicaciones"])
+    firmar_informe(doc, selected_supervisor, recomendaciones, compilada["ubicaciones"], lleva_correccion(recursos))
+    if sin_reemplazo is not None:
+        sin_reemplazo.update(faltantes)
+    return documento_a_bytes(doc)
+
+# ----------------- Consolidado -----------------
+
+@cronometrado("carga_excel")
+def leer_consolidado(contenido):
+    """
+    Lee la hoja COBERTURA de un consolidado (bytes), usando la caché Parquet.
+    Devuelve la hoja, su tabla de marcadores, el índice de búsqueda de filas (cuyas
+    filas incluyen los marcadores) y sus claves repetidas.
+    Lanza ValueError si a la hoja le falta PARROQUIA u OPERADORA.
+    """
+    import cache_excel
+    from marcadores import construir_tabla_marcadores
+    df_cobertura = cache_excel.cargar_cobertura(contenido)
+    # Antes de unir los marcadores, para que el error solo liste las columnas de la hoja
+    comprobar_columnas(df_cobertura)
+    tabla_marcadores = construir_tabla_marcadores(df_cobertura)
+    indice, duplicados = construir_indice(df_cobertura.join(tabla_marcadores))
+    return df_cobertura, tabla_marcadores, indice, duplicados
+
+def parroquias_de(indice):
+    """Nombres normalizados de todas las parroquias del índice del consolidado."""
+    return sorted({parroquia for parroquia, _, _ in indice})
@@ -0,0 +1,223 @@
+"""
+Generación de informes desde la línea de órdenes, sin Streamlit.
+
+Uso:
+    python -m generar_informes uno --plantilla PARROQUIA_3G_CONECEL_COBERTURA.docx \\
+        --consolidado CONSOLIDADO.xlsx --graficos GRAFICOS --imagenes IMAGENES --salida informes
+    python -m generar_informes uno --plantilla MODELO.docx --marcadores fila.json --parroquia "SAN JUAN"
+    python -m generar_informes lote --consolidado CONSOLIDADO.xlsx --plantillas MODELOS --salida informes \\
+        --graficos GRAFICOS --imagenes IMAGENES --procesos 4 --pdf --tiempos tiempos.csv --zip informes.zip
+    python -m generar_informes plan --consolidado CONSOLIDADO.xlsx --plantillas MODELOS --salida informes \\
+        --graficos GRAFICOS --imagenes IMAGENES --informe problemas.csv
+
+Los módulos de generación se importan después de leer los argumentos, así que
+`--help` responde al instante; pandas solo se carga si hay que leer un consolidado.
+`lote` comprueba antes el lote con planificacion.planificar y no empieza si hay
+errores (salvo con --sin-comprobar); `plan` solo hace esa comprobación.
+Sale con código 1 si algún informe no pudo generarse o si la comprobación encontró errores.
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+from collections import Counter
+
+log = logging.getLogger("informes.cli")
+
+def _leer(ruta):
+    with open(ruta, "rb") as f:
+        return f.read()
+
+def _escribir(ruta, contenido):
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+
+def _carpeta(ruta):
+    """Ruta de carpeta de los argumentos; "" si no se indicó (igual que en la interfaz)."""
+    return (ruta or "").strip()
+
+def uno(args):
+    """Genera un informe a partir de un modelo Word y de su fila del consolidado o de un JSON de marcadores."""
+    import generador
+    import conversion_pdf
+    from indice_cobertura import buscar_fila
+
+    nombre = os.path.basename(args.plantilla)
+    parroquia, tecnologia, operadora, _ = generador.extract_info_from_filename(nombre)
+    parroquias = ()
+    if args.marcadores:
+        with open(args.marcadores, encoding="utf-8") as f:
+            placeholders = json.load(f)
+        parroquia = args.parroquia or parroquia
+    else:
+        if not (parroquia and operadora):
+            log.error("El nombre del archivo no sigue el formato esperado: %s", nombre)
+            return 1
+        _, _, indice, _ = generador.leer_consolidado(_leer(args.consolidado))
+        fila = buscar_fila(indice, parroquia, operadora, tecnologia)
+        if fila is None:
+            log.error("No se encontraron datos para la parroquia %s con tecnología %s y operadora %s.",
+                      parroquia, tecnologia, operadora)
+            return 1
+        placeholders = generador.construir_placeholders(fila)
+        parroquias = generador.parroquias_de(indice)
+
+    recursos = None
+    if parroquia:
+        recursos = generador.precargar_recursos(parroquia, placeholders, _carpeta(args.graficos),
+                                                _carpeta(args.imagenes), parroquias)
+    sin_reemplazo = Counter()
+    contenido = generador.generar(placeholders, _leer(args.plantilla), recursos, args.supervisor,
+                                  args.recomendaciones, sin_reemplazo)
+    if sin_reemplazo:
+        log.warning("Marcadores sin valor en el informe: %s", generador.describir_sin_reemplazo(sin_reemplazo))
+
+    salida = args.salida
+    if os.path.isdir(salida) or salida.endswith(os.sep):
+        numero = placeholders.get("«NÚMERO__DE_INFORME»", "")
+        salida = os.path.join(salida, f"{numero}_{nombre}" if numero else nombre)
+    _escribir(salida, contenido)
+    print(salida)
+    if args.pdf:
+        conversion_pdf.convertir_archivo(salida, conversion_pdf.ruta_pdf(salida))
+        print(conversion_pdf.ruta_pdf(salida))
+    return 0
+
+def _comprobar(args, df_cobertura, tabla_marcadores, indice, duplicados):
+    """Comprueba el lote con planificacion.planificar y muestra sus problemas."""
+    import generador
+    import planificacion
+
+    comprobacion = planificacion.planificar(df_cobertura, tabla_marcadores, args.plantillas, args.salida,
+                                            _carpeta(args.graficos), _carpeta(args.imagenes),
+                                            generador.parroquias_de(indice), duplicados)
+    for problema in comprobacion["problemas"]:
+        nivel = logging.ERROR if problema["nivel"] == planificacion.ERROR else logging.WARNING
+        log.log(nivel, "%s: %s", problema["elemento"], problema["problema"])
+    listos = sum(1 for fila in comprobacion["plan"] if fila["estado"] != "con errores")
+    print(f"Plan: {listos} de {len(comprobacion['plan'])} informes sin errores "
+          f"({comprobacion['errores']} errores, {comprobacion['avisos']} avisos)")
+    return comprobacion
+
+def plan(args):
+    """Comprueba modelos, filas e imágenes del lote sin generar ningún informe."""
+    import generador
+    import planificacion
+
+    resultado = _comprobar(args, *generador.leer_consolidado(_leer(args.consolidado)))
+    if args.informe:
+        with open(args.informe, "w", encoding="utf-8", newline="") as f:
+            f.write(planificacion.a_csv(resultado["problemas"], planificacion.COLUMNAS_PROBLEMAS))
+    if args.plan:
+        with open(args.plan, "w", encoding="utf-8", newline="") as f:
+            f.write(planificacion.a_csv(resultado["plan"], planificacion.COLUMNAS_PLAN))
+    return 1 if resultado["errores"] else 0
+
+def lote(args):
+    """Genera todos los informes del consolidado que tengan modelo Word en la carpeta de plantillas."""
+    import generador
+    import lote as modo_lote
+    from registro import tiempos_a_json, tiempos_a_csv
+
+    df_cobertura, tabla_marcadores, indice, duplicados = generador.leer_consolidado(_leer(args.consolidado))
+    if args.sin_comprobar:
+        for (parroquia, operadora, tecnologia), filas in duplicados.items():
+            log.warning("%s / %s / %s aparece repetida en las filas %s de COBERTURA; se usa la primera.",
+                        parroquia, tecnologia or "-", operadora, ", ".join(str(fila) for fila in filas))
+        trabajos, sin_plantilla = modo_lote.emparejar_plantillas(df_cobertura, tabla_marcadores,
+                                                                 args.plantillas, args.salida)
+        for fila in sin_plantilla:
+            log.warning("Sin modelo Word para %s", fila)
+    else:
+        comprobacion = _comprobar(args, df_cobertura, tabla_marcadores, indice, duplicados)
+        if comprobacion["errores"]:
+            log.error("El lote no se generó porque la comprobación encontró errores (usa --sin-comprobar para "
+                      "generarlo igualmente).")
+            return 1
+        trabajos = comprobacion["trabajos"]
+    if not trabajos:
+        log.error("Ninguna fila del consolidado tiene un modelo Word asociado.")
+        return 1
+
+    def al_progresar(hechos, total, resultado):
+        print(f"{hechos}/{total} {resultado['estado']} {resultado['accion']} {resultado['salida']} "
+              f"{resultado['motivo']} {resultado['error']}",
+              file=sys.stderr)
+
+    resultados = modo_lote.generar_lote(trabajos, args.supervisor, args.recomendaciones,
+                                        _carpeta(args.graficos), _carpeta(args.imagenes),
+                                        generador.parroquias_de(indice), procesos=args.procesos,
+                                        al_progresar=al_progresar, pdf=args.pdf, procesos_pdf=args.procesos_pdf,
+                                        incremental=not args.todo, paquete=args.zip)
+    if args.tiempos:
+        texto = tiempos_a_csv(resultados) if args.tiempos.lower().endswith(".csv") else tiempos_a_json(resultados)
+        with open(args.tiempos, "w", encoding="utf-8", newline="") as f:
+            f.write(texto)
+    errores = [r for r in resultados if r["estado"] != "OK"]
+    reutilizados = sum(1 for r in resultados if r["accion"] == "reutilizado")
+    print(f"Informes generados: {len(resultados) - len(errores)} de {len(resultados)} "
+          f"({reutilizados} sin cambios, copiados de la caché)")
+    if args.zip:
+        print(args.zip)
+    return 1 if errores else 0
+
+def _argumentos_comunes(parser):
+    parser.add_argument("--graficos", help="carpeta con los Excel de gráficos de la operadora y las imágenes de corrección de mapa")
+    parser.add_argument("--imagenes", help="carpeta con las imágenes de encabezado y pie de página")
+    parser.add_argument("--supervisor", help="supervisor que firma (por defecto, el primero de la lista)")
+    parser.add_argument("--recomendaciones", default="", help="texto de las recomendaciones")
+    parser.add_argument("--pdf", action="store_true", help="convertir también a PDF con LibreOffice")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m generar_informes",
+                                     description="Genera informes de cobertura sin la interfaz de Streamlit.")
+    subparsers = parser.add_subparsers(dest="orden", required=True)
+
+    parser_uno = subparsers.add_parser("uno", help="genera un informe")
+    parser_uno.add_argument("--plantilla", required=True,
+                            help="modelo Word con nombre PARROQUIA_XXG_OPERADORA_TIPO.docx")
+    origen = parser_uno.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--consolidado", help="consolidado Excel con la hoja COBERTURA")
+    origen.add_argument("--marcadores", help="JSON con los valores de los marcadores ({marcador: valor})")
+    parser_uno.add_argument("--parroquia", help="parroquia para buscar las imágenes (con --marcadores)")
+    parser_uno.add_argument("--salida", default=".", help="archivo .docx o carpeta de salida")
+    _argumentos_comunes(parser_uno)
+    parser_uno.set_defaults(funcion=uno)
+
+    parser_lote = subparsers.add_parser("lote", help="genera todos los informes del consolidado")
+    parser_lote.add_argument("--consolidado", required=True, help="consolidado Excel con la hoja COBERTURA")
+    parser_lote.add_argument("--plantillas", required=True, help="carpeta con los modelos Word")
+    parser_lote.add_argument("--salida", required=True, help="carpeta donde se guardan los informes")
+    parser_lote.add_argument("--procesos", type=int, help="procesos de generación (por defecto, uno por núcleo)")
+    parser_lote.add_argument("--procesos-pdf", type=int, help="LibreOffice para la conversión a PDF")
+    parser_lote.add_argument("--sin-comprobar", action="store_true",
+                             help="no comprobar el lote antes de generarlo (ver la orden plan)")
+    parser_lote.add_argument("--todo", action="store_true",
+                             help="regenerar todos los informes aunque sus entradas no hayan cambiado")
+    parser_lote.add_argument("--zip", help="empaqueta también los informes en este .zip, con su manifiesto CSV")
+    parser_lote.add_argument("--tiempos", help="guarda los tiempos por informe en este archivo (.json o .csv)")
+    _argumentos_comunes(parser_lote)
+    parser_lote.set_defaults(funcion=lote)
+
+    parser_plan = subparsers.add_parser("plan", help="comprueba el lote sin generar ningún informe")
+    parser_plan.add_argument("--consolidado", required=True, help="consolidado Excel con la hoja COBERTURA")
+    parser_plan.add_argument("--plantillas", required=True, help="carpeta con los modelos Word")
+    parser_plan.add_argument("--salida", default=".", help="carpeta donde se guardarían los informes")
+    parser_plan.add_argument("--graficos", help="carpeta con los Excel de gráficos de la operadora y las imágenes de corrección de mapa")
+    parser_plan.add_argument("--imagenes", help="carpeta con las imágenes de encabezado y pie de página")
+    parser_plan.add_argument("--informe", help="guarda los problemas encontrados en este CSV")
+    parser_plan.add_argument("--plan", help="guarda el plan (un informe por fila) en este CSV")
+    parser_plan.set_defaults(funcion=plan)
+
+    args = parser.parse_args(argv)
+    from registro import configurar_registro
+    configurar_registro()
+    if getattr(args, "supervisor", "") is None:
+        from generador import SUPERVISORES
+        args.supervisor = SUPERVISORES[0]
+    return args.funcion(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
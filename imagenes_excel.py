@@ -0,0 +1,90 @@
+"""
+Extracción de imágenes incrustadas en un .xlsx sin cargar el libro.
+
+Un .xlsx es un zip: la hoja apunta a un dibujo (xl/drawings/drawingN.xml) y el
+dibujo apunta a los archivos de imagen (xl/media/...). Aquí solo se leen esas
+relaciones y se devuelven los bytes de la imagen tal como están guardados, sin
+interpretar celdas ni decodificar la imagen.
+"""
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+NS = {
+    "main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+    "xdr": "http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing",
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+}
+TIPO_DIBUJO = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/drawing"
+
+# Mismo orden en que openpyxl llena sheet._images
+TIPOS_ANCLA = ("absoluteAnchor", "oneCellAnchor", "twoCellAnchor")
+
+# Formatos que openpyxl descarta y que Word no acepta como imagen
+EXTENSIONES_DESCARTADAS = (".wmf", ".emf")
+
+def _relaciones(archivo_zip, parte):
+    """Devuelve {id: ruta dentro del zip} de las relaciones de una parte."""
+    carpeta, nombre = posixpath.split(parte)
+    ruta_rels = posixpath.join(carpeta, "_rels", nombre + ".rels")
+    if ruta_rels not in archivo_zip.namelist():
+        return {}, {}
+    raiz = ET.fromstring(archivo_zip.read(ruta_rels))
+    destinos = {}
+    tipos = {}
+    for rel in raiz.findall("rel:Relationship", NS):
+        destino = rel.get("Target")
+        if rel.get("TargetMode") == "External":
+            continue
+        if destino.startswith("/"):
+            destino = destino.lstrip("/")
+        else:
+            destino = posixpath.normpath(posixpath.join(carpeta, destino))
+        destinos[rel.get("Id")] = destino
+        tipos[rel.get("Id")] = rel.get("Type")
+    return destinos, tipos
+
+def _parte_de_hoja(archivo_zip, nombre_hoja):
+    """Ruta dentro del zip del XML de la hoja con ese nombre."""
+    libro = ET.fromstring(archivo_zip.read("xl/workbook.xml"))
+    destinos, _ = _relaciones(archivo_zip, "xl/workbook.xml")
+    for hoja in libro.iterfind("main:sheets/main:sheet", NS):
+        if hoja.get("name") == nombre_hoja:
+            return destinos[hoja.get(f"{{{NS['r']}}}id")]
+    raise KeyError(f"Worksheet {nombre_hoja} does not exist.")
+
+def imagenes_de_hoja(archivo_zip, nombre_hoja):
+    """Rutas dentro del zip de las imágenes de la hoja, en el orden de sheet._images."""
+    parte_hoja = _parte_de_hoja(archivo_zip, nombre_hoja)
+    destinos_hoja, tipos_hoja = _relaciones(archivo_zip, parte_hoja)
+
+    imagenes = []
+    for id_rel, dibujo in destinos_hoja.items():
+        if tipos_hoja[id_rel] != TIPO_DIBUJO:
+            continue
+        raiz = ET.fromstring(archivo_zip.read(dibujo))
+        destinos_dibujo, _ = _relaciones(archivo_zip, dibujo)
+        for tipo in TIPOS_ANCLA:
+            for ancla in raiz.findall(f"xdr:{tipo}", NS):
+                blip = ancla.find("xdr:pic/xdr:blipFill/a:blip", NS)
+                if blip is None:
+                    blip = ancla.find("xdr:grpSp/xdr:pic/xdr:blipFill/a:blip", NS)
+                if blip is None:
+                    continue
+                media = destinos_dibujo.get(blip.get(f"{{{NS['r']}}}embed"))
+                if media and not media.lower().endswith(EXTENSIONES_DESCARTADAS):
+                    imagenes.append(media)
+    return imagenes
+
+def extraer_imagen(ruta_excel, nombre_hoja, posicion):
+    """
+    Devuelve los bytes de la imagen número `posicion` (desde 0) de la hoja, o None
+    si la hoja tiene menos imágenes. Lanza KeyError si la hoja no existe.
+    """
+    with zipfile.ZipFile(ruta_excel) as archivo_zip:
+        imagenes = imagenes_de_hoja(archivo_zip, nombre_hoja)
+        if len(imagenes) <= posicion:
+            return None
+        return archivo_zip.read(imagenes[posicion])
@@ -0,0 +1,102 @@
+"""
+Índice de las carpetas de gráficos e imágenes.
+
+Cada carpeta se lista una sola vez y sus archivos se indexan por las secuencias de
+palabras de su nombre (sin tildes, en mayúsculas), de modo que la parroquia
+"SAN JUAN" encuentra "MEDICION SAN JUAN 2024.xlsx" o "MEDICION_SAN_JUAN.xlsx" sin
+recorrer la carpeta y sin confundirse con "SAN JUANITO". El índice se rehace solo
+cuando cambia la fecha de modificación de la carpeta (al crear, borrar o renombrar
+archivos).
+"""
+import os
+import re
+import logging
+from functools import lru_cache
+
+from indice_cobertura import normalizar_texto
+
+EXTENSIONES_LIBROS = (".xlsx",)
+EXTENSIONES_IMAGENES = (".png", ".jpeg", ".jpg")
+
+_indices = {}
+
+log = logging.getLogger("informes.indice_carpetas")
+
+@lru_cache(maxsize=4096)
+def palabras(texto):
+    """Palabras normalizadas de un nombre (sin tildes, en mayúsculas)."""
+    return tuple(re.findall(r"[A-Z0-9]+", normalizar_texto(texto)))
+
+def _secuencias(tokens):
+    """Todas las secuencias contiguas de palabras de un nombre."""
+    for inicio in range(len(tokens)):
+        for fin in range(inicio + 1, len(tokens) + 1):
+            yield tokens[inicio:fin]
+
+def _construir(carpeta, mtime):
+    indice = {"mtime": mtime, "libros": {}, "imagenes": {}, "palabras": {}, "nombres": {}}
+    for archivo in os.listdir(carpeta):
+        if archivo.startswith("~$"):
+            continue  # Archivos temporales de Office
+        indice["nombres"][archivo.lower()] = archivo
+        extension = os.path.splitext(archivo)[1].lower()
+        if extension in EXTENSIONES_LIBROS:
+            grupo = indice["libros"]
+        elif extension in EXTENSIONES_IMAGENES:
+            grupo = indice["imagenes"]
+        else:
+            continue
+        tokens = palabras(os.path.splitext(archivo)[0])
+        indice["palabras"][archivo] = tokens
+        for secuencia in set(_secuencias(tokens)):
+            grupo.setdefault(secuencia, []).append(archivo)
+    return indice
+
+def indice_carpeta(carpeta):
+    """Devuelve el índice de la carpeta, rehaciéndolo si la carpeta cambió."""
+    mtime = os.stat(carpeta).st_mtime_ns
+    indice = _indices.get(carpeta)
+    if indice is None or indice["mtime"] != mtime:
+        indice = _construir(carpeta, mtime)
+        _indices[carpeta] = indice
+    return indice
+
+def _reclamado_por_otra(tokens_archivo, tokens_parroquia, parroquias):
+    """Indica si el nombre del archivo contiene otra parroquia conocida más larga que incluye a esta."""
+    for otra in parroquias:
+        if len(otra) > len(tokens_parroquia) and any(
+                otra[i:i + len(tokens_parroquia)] == tokens_parroquia for i in range(len(otra))):
+            if any(tokens_archivo[i:i + len(otra)] == otra for i in range(len(tokens_archivo))):
+                return True
+    return False
+
+def buscar_archivo(carpeta, grupo, parroquia, parroquias=()):
+    """
+    Busca en la carpeta el archivo de `grupo` ("libros" o "imagenes") de la parroquia.
+
+    `parroquias` son los nombres de todas las parroquias conocidas: un archivo de
+    "SAN JUAN BOSCO" no se toma como de "SAN JUAN", aunque sea el único que coincide.
+    Si aun así quedan varios candidatos, se elige el de nombre más corto.
+    Devuelve la ruta elegida (o None) y la lista de candidatos para avisar de ambigüedades.
+    """
+    indice = indice_carpeta(carpeta)
+    tokens = palabras(parroquia)
+    if not tokens:
+        return None, []
+    candidatos = indice[grupo].get(tokens, [])
+    if candidatos and parroquias:
+        conocidas = {palabras(nombre) for nombre in parroquias}
+        propios = [c for c in candidatos if not _reclamado_por_otra(indice["palabras"][c], tokens, conocidas)]
+        if not propios:
+            log.warning("Los archivos que coinciden con %s en %s son de otra parroquia (%s); no se usa ninguno.",
+                        parroquia, carpeta, ", ".join(sorted(candidatos)))
+        candidatos = propios
+    if not candidatos:
+        return None, []
+    candidatos = sorted(candidatos, key=lambda c: (len(indice["palabras"][c]), c))
+    return os.path.join(carpeta, candidatos[0]), [os.path.join(carpeta, c) for c in candidatos]
+
+def buscar_por_nombre(carpeta, nombre):
+    """Ruta del archivo con ese nombre exacto (sin distinguir mayúsculas), o None."""
+    archivo = indice_carpeta(carpeta)["nombres"].get(nombre.lower())
+    return os.path.join(carpeta, archivo) if archivo else None
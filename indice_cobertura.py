@@ -0,0 +1,100 @@
+"""
+Índice de búsqueda sobre la hoja COBERTURA.
+
+El índice se construye una vez por consolidado cargado y permite encontrar la fila
+de una combinación parroquia/operadora/tecnología sin volver a normalizar las
+columnas en cada búsqueda. Las claves se normalizan quitando tildes, espacios
+sobrantes y diferencias de mayúsculas, y con el nombre estándar de la operadora.
+"""
+import re
+import unicodedata
+
+# Columnas sin las que no se puede buscar ninguna fila
+COLUMNAS_REQUERIDAS = ("PARROQUIA", "OPERADORA")
+
+OPERADORAS = {
+    "CONECEL": "CONECEL S.A.",
+    "OTECEL": "OTECEL S.A.",
+}
+
+def normalizar_texto(texto):
+    """Quita tildes y espacios sobrantes y pasa el texto a mayúsculas."""
+    if not isinstance(texto, str):
+        return ""
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", texto).strip().upper()
+
+def estandarizar_operadora(operadora):
+    """Devuelve el nombre estándar de la operadora (CONECEL -> CONECEL S.A.)."""
+    operadora = normalizar_texto(operadora)
+    nombre = re.sub(r"[\s.]*S\.?\s*A\.?$", "", operadora).strip()
+    return OPERADORAS.get(nombre, operadora)
+
+def columna_tecnologia(df_cobertura):
+    """Devuelve el nombre de la columna de tecnología (2G/3G/4G) si existe en la hoja."""
+    for columna in df_cobertura.columns:
+        if str(columna).strip().upper().startswith("TECNOLOG"):
+            return columna
+    return None
+
+def clave_fila(parroquia, operadora, tecnologia=None):
+    """Clave normalizada con la que se guarda y se busca una fila en el índice."""
+    return (normalizar_texto(parroquia), estandarizar_operadora(operadora),
+            normalizar_texto(tecnologia) or None)
+
+def comprobar_columnas(df_cobertura):
+    """Lanza ValueError si a la hoja COBERTURA le falta alguna de COLUMNAS_REQUERIDAS."""
+    faltantes = [columna for columna in COLUMNAS_REQUERIDAS if columna not in df_cobertura.columns]
+    if faltantes:
+        raise ValueError(f"La hoja COBERTURA no tiene la columna {', '.join(faltantes)} "
+                         f"(columnas encontradas: {', '.join(str(c) for c in df_cobertura.columns)}).")
+
+def construir_indice(df_cobertura):
+    """
+    Construye el índice (parroquia, operadora, tecnología) -> fila de la hoja COBERTURA.
+
+    Si la hoja tiene columna de tecnología, cada fila también se registra sin ella
+    para las búsquedas que no la indiquen (se toma la primera, como hacía el filtro
+    original). Devuelve el índice y un diccionario con las claves repetidas y los
+    números de fila de Excel donde aparecen.
+    Lanza ValueError si a la hoja le falta alguna de COLUMNAS_REQUERIDAS (ver comprobar_columnas).
+    """
+    comprobar_columnas(df_cobertura)
+    col_tecnologia = columna_tecnologia(df_cobertura)
+    indice = {}
+    filas_por_clave = {}
+    for numero, registro in enumerate(df_cobertura.to_dict("records")):
+        if not isinstance(registro.get('PARROQUIA'), str) or not isinstance(registro.get('OPERADORA'), str):
+            continue  # Filas vacías o de totales
+        tecnologia = registro[col_tecnologia] if col_tecnologia else None
+        clave = clave_fila(registro['PARROQUIA'], registro['OPERADORA'], tecnologia)
+        # +2: la fila 1 de Excel es el encabezado
+        filas_por_clave.setdefault(clave, []).append(numero + 2)
+        indice.setdefault(clave, registro)
+        if clave[2] is not None:
+            indice.setdefault(clave[:2] + (None,), registro)
+
+    duplicados = {clave: filas for clave, filas in filas_por_clave.items() if len(filas) > 1}
+    return indice, duplicados
+
+def _tecnologia_de(registro):
+    """Tecnología normalizada de una fila, o None si la hoja no la indica."""
+    for columna, valor in registro.items():
+        if str(columna).strip().upper().startswith("TECNOLOG"):
+            return normalizar_texto(valor) or None
+    return None
+
+def buscar_fila(indice, parroquia, operadora, tecnologia=None):
+    """
+    Devuelve la fila (como diccionario columna -> valor) o None si no existe.
+    Si la hoja no indica la tecnología de la fila, cualquier tecnología coincide.
+    """
+    if tecnologia:
+        registro = indice.get(clave_fila(parroquia, operadora, tecnologia))
+        if registro is not None:
+            return registro
+    registro = indice.get(clave_fila(parroquia, operadora))
+    if registro is not None and tecnologia and _tecnologia_de(registro) not in (None, normalizar_texto(tecnologia)):
+        return None
+    return registro
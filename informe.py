@@ -1,553 +1,589 @@
+"""
+Aplicación de Streamlit para generar los informes de cobertura.
+
+Aquí solo está la interfaz; la generación está en generador.py, que se puede usar
+sin Streamlit (por ejemplo, con `python -m generar_informes`).
+"""
 import streamlit as st
 import pandas as pd
-from docx import Document
-from docx.text.paragraph import Paragraph
-from docx.table import Table
-import re, locale, os
-import openpyxl
-from io import BytesIO
-from PIL import Image as PILImage
-from docx.shared import Inches, Cm, Pt
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
-
-# Configura la localización a español
-locale.setlocale(locale.LC_ALL, 'es_ES')
-
-# ----------------- Funciones originales -----------------
-
-def extract_info_from_filename(filename):
+import locale, os, copy, hashlib, logging, threading
+from contextvars import ContextVar
+from concurrent.futures import Future
+import conversion_pdf
+import cola_trabajos
+from generador import (extract_info_from_filename, construir_placeholders, precargar_recursos, componer_informe,
+                       firmar_informe, lleva_correccion, documento_a_bytes, describir_sin_reemplazo,
+                       leer_consolidado, parroquias_de, SUPERVISORES)
+from plantillas import obtener_plantilla, nuevo_documento
+from indice_cobertura import buscar_fila
+from indice_carpetas import EXTENSIONES_LIBROS, EXTENSIONES_IMAGENES
+from registro import (medir, registrar, configurar_registro, filas_de_tiempos,
+                      tiempos_a_json, tiempos_a_csv, ETAPAS)
+
+# Mensajes de diagnóstico (nivel en INFORMES_LOG_NIVEL)
+log = logging.getLogger("informes.informe")
+
+class AvisosEnPagina(logging.Handler):
     """
-    Extrae la información del nombre del archivo Word, en particular la parroquia.
-    Se espera un formato: PARROQUIA_XXG_OPERADORA_TIPO.docx
+    Muestra en la página los avisos y errores del logger "informes". Los de los hilos
+    de precarga se escriben en la sesión que lanzó la tarea (guardada en `pagina`,
+    que las tareas heredan con su contexto).
     """
-    match = re.match(r"(.*)_(\dG)_(.*)_(.*)\.docx", filename)
-    if match:
-        parroquia = match.group(1).replace("_", " ").upper()
-        tecnologia = match.group(2)
-        operadora = match.group(3).upper()
-        tipo_medicion = match.group(4).upper()
-        # Estandarizar el nombre del operador
-        if operadora == "CONECEL":
-            operadora = "CONECEL S.A."
-        elif operadora == "OTECEL":
-            operadora = "OTECEL S.A."
-        st.write(f"[DEBUG] Archivo Word procesado: Parroquia={parroquia}, Tecnología={tecnologia}, Operadora={operadora}, Tipo={tipo_medicion}")
-        return parroquia, tecnologia, operadora, tipo_medicion
-    st.write("[DEBUG] Formato de nombre de archivo incorrecto.")
-    return None, None, None, None
-
-def replace_placeholder(paragraph, placeholder, new_text):
-    """Reemplaza en un párrafo el marcador por el nuevo texto conservando el formato."""
-    for run in paragraph.runs:
-        if placeholder in run.text:
-            run.text = run.text.replace(placeholder, new_text)
-
-def format_date(date_value, format_type):
-    """Formatea la fecha según el formato solicitado."""
-    try:
-        date_obj = pd.to_datetime(date_value)
-        if format_type == "month_only":
-            return date_obj.strftime("%B")  # Ej: "enero"
-        elif format_type == "dd_mm_yyyy":
-            return date_obj.strftime("%d/%m/%Y")  # Ej: "31/01/2025"
-        elif format_type == "long_format":
-            return date_obj.strftime("%d de %B de %Y")  # Ej: "31 de enero de 2025"
+
+    def __init__(self, nivel):
+        super().__init__(nivel)
+        self.pagina = ContextVar("pagina_streamlit", default=None)
+
+    def emit(self, record):
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        contexto = self.pagina.get()
+        if contexto is None:
+            return
+        add_script_run_ctx(threading.current_thread(), contexto)
+        if record.levelno >= logging.ERROR:
+            st.error(record.getMessage())
         else:
-            return str(date_value)
-    except Exception as e:
-        st.write(f"[DEBUG] Error en format_date: {e}")
-        return str(date_value)
+            st.warning(record.getMessage())
 
-def replace_texts(paragraph, placeholders, counter):
-    """
-    Reemplaza marcadores en el párrafo.
-    Usa un contador mutable para las fechas con el marcador «FECHA_CRONOGRAMA_DE_MEDICION_2024».
-    """
-    date_marker = "«FECHA_CRONOGRAMA_DE_MEDICION_2024»"
-    if date_marker in paragraph.text:
-        if counter[0] == 0:
-            replace_placeholder(paragraph, date_marker, placeholders["fecha_antecedentes"])
-        elif counter[0] == 1:
-            replace_placeholder(paragraph, date_marker, placeholders["fecha_pruebas_realizadas"])
-        elif counter[0] == 2:
-            replace_placeholder(paragraph, date_marker, placeholders["fecha_conclusiones"])
-        counter[0] += 1
-    for key, value in placeholders.items():
-        if key not in ["fecha_antecedentes", "fecha_pruebas_realizadas", "fecha_conclusiones"]:
-            if key in paragraph.text:
-                replace_placeholder(paragraph, key, value)
-    return counter
-
-def process_headers_and_footers(doc, placeholders):
-    """Procesa encabezados y pies de página del documento Word,
-    asegurando que los marcadores de fecha y número de informe se inserten como texto plano.
-    """
-    for section in doc.sections:
-        header = section.header
-        footer = section.footer
-
-        # Procesar encabezados que estén dentro de tablas (si existen)
-        for table in header.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        # Procesar fecha de informe con "Cuenca,"
-                        if "«FECHA_DE_INFORME»" in paragraph.text:
-                            paragraph.clear()
-                            run = paragraph.add_run("Cuenca, ")  # Agregar "Cuenca, "
-                            run.font.name = 'Arial'
-                            run.font.size = Pt(9)
-                            run = paragraph.add_run(placeholders.get("«FECHA_DE_INFORME»", ""))
-                            run.font.name = 'Arial'
-                            run.font.size = Pt(9)
-                        
-                        # Procesar número de informe
-                        if "«NÚMERO__DE_INFORME»" in paragraph.text:
-                            paragraph.clear()
-                            run = paragraph.add_run(placeholders.get("«NÚMERO__DE_INFORME»", ""))
-                            run.font.name = 'Arial'
-                            run.font.size = Pt(10)
-
-        # Procesar párrafos del encabezado fuera de tablas
-        for paragraph in header.paragraphs:
-            # Procesar fecha de informe con "Cuenca,"
-            if "«FECHA_DE_INFORME»" in paragraph.text:
-                paragraph.clear()
-                run = paragraph.add_run("Cuenca, ")  # Agregar "Cuenca, "
-                run.font.name = 'Arial'
-                run.font.size = Pt(9)
-                run = paragraph.add_run(placeholders.get("«FECHA_DE_INFORME»", ""))
-                run.font.name = 'Arial'
-                run.font.size = Pt(9)
-            
-            # Procesar número de informe
-            if "«NÚMERO__DE_INFORME»" in paragraph.text:
-                paragraph.clear()
-                run = paragraph.add_run(placeholders.get("«NÚMERO__DE_INFORME»", ""))
-                run.font.name = 'Arial'
-                run.font.size = Pt(10)
-
-        # El procesamiento del pie de página permanece sin cambios
-        for paragraph in footer.paragraphs:
-            replace_texts(paragraph, placeholders, [0])
-        for table in footer.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        replace_texts(paragraph, placeholders, [0])
-
-def process_doc_elements(doc, placeholders, selected_supervisor, recomendaciones):
+def configurar_interfaz():
+    """Localización en español y avisos del generador en la página de esta sesión."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    try:
+        locale.setlocale(locale.LC_ALL, 'es_ES')
+    except locale.Error:
+        log.debug("Localización es_ES no disponible; se usa la del sistema.")
+    raiz = configurar_registro()
+    # Streamlit vuelve a ejecutar el script en cada interacción: el manejador se agrega una vez
+    manejador = next((m for m in raiz.handlers if getattr(m, "avisos_en_pagina", False)), None)
+    if manejador is None:
+        manejador = AvisosEnPagina(logging.WARNING)
+        manejador.avisos_en_pagina = True
+        raiz.addHandler(manejador)
+    manejador.pagina.set(get_script_run_ctx(suppress_warning=True))
+
+# ----------------- Interfaz de Streamlit -----------------
+
+@st.cache_data(show_spinner="Cargando consolidado...", max_entries=4)
+def cargar_consolidado(contenido):
     """
-    Recorre los elementos (párrafos y tablas) del cuerpo del documento,
-    reemplazando marcadores y actualizando según el supervisor seleccionado.
+    Lee la hoja COBERTURA una sola vez por contenido del archivo subido; las
+    recargas de la página la toman de memoria y los reinicios, de la caché Parquet.
+    Devuelve también la tabla de marcadores, el índice de búsqueda de filas (cuyas
+    filas incluyen los marcadores) y sus claves repetidas.
     """
-    counter = [0]
-    for element in list(doc.element.body):
-        if element.tag.endswith('p'):
-            paragraph = Paragraph(element, doc)
-            replace_texts(paragraph, placeholders, counter)
-        elif element.tag.endswith('tbl'):
-            table = Table(element, doc)
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        replace_texts(paragraph, placeholders, counter)
-                        replace_placeholder(paragraph, "Ing. Mauricio Sánchez Pinos", selected_supervisor)
-                        if selected_supervisor == "Ing. Mesías Vizuete López":
-                            replace_placeholder(paragraph, "PROFESIONAL TÉCNICO 1", "ANALISTA TÉCNICO 2")
-    
-    # Reemplazar párrafos de recomendaciones
-    if recomendaciones:  # Verifica si hay texto de recomendaciones para insertar
-        start_recomendaciones = False  # Bandera para marcar cuando encontremos la sección
-        recommendations_added = False   # Bandera para controlar que solo se inserte una vez
-        for paragraph in doc.paragraphs:  # Itera sobre todos los párrafos del documento
-            # Detecta el inicio de la sección de recomendaciones
-            if "RECOMENDACIONES" in paragraph.text:
-                start_recomendaciones = True
-                continue  # Salta este párrafo para no modificar el título
-            if start_recomendaciones:
-                # Detecta el final de la sección de recomendaciones
-                if "Informe realizado por:" in paragraph.text:
-                    start_recomendaciones = False
-                    break  # Sale del bucle al encontrar el final
-                # Si aún no se han agregado las recomendaciones
-                if not recommendations_added:
-                    paragraph.clear()  # Limpia el contenido actual del párrafo
-                    paragraph.add_run(recomendaciones)  # Agrega el nuevo texto
-                    recommendations_added = True  # Marca que ya se agregaron las recomendaciones
-                else:
-                    paragraph.clear()  # Solo limpia los párrafos restantes
-    return counter
-
-# ----------------- Funciones nuevas para buscar e insertar el gráfico -----------------
-
-def buscar_grafico(parroquia, carpeta):
+    return leer_consolidado(contenido)
+
+def avisar_duplicados(duplicados):
+    """Muestra las combinaciones parroquia/operadora/tecnología repetidas en el consolidado."""
+    for (parroquia, operadora, tecnologia), filas in duplicados.items():
+        st.warning(f"{parroquia} / {tecnologia or '-'} / {operadora} aparece repetida en las filas "
+                   f"{', '.join(str(fila) for fila in filas)} de COBERTURA; se usa la primera.")
+
+def huella(contenido):
+    """SHA-256 de un contenido en bytes."""
+    return hashlib.sha256(contenido).hexdigest()
+
+def estado_carpeta(carpeta):
     """
-    Extrae imágenes PNG incrustadas directamente en la hoja de Excel.
-    Ahora selecciona la SEGUNDA imagen en la hoja.
+    Nombre, tamaño y fecha de modificación de cada libro e imagen de la carpeta.
+    Cambia al agregar, borrar o renombrar archivos y también al editar uno en su
+    sitio, que no siempre cambia la fecha de la carpeta.
     """
-    st.write(f"[DEBUG] Buscando imagen PNG para {parroquia} en {carpeta}")
-    for archivo in os.listdir(carpeta):
-        if archivo.startswith("~$") or not archivo.lower().endswith(".xlsx"):
-            continue  # Solo procesar archivos .xlsx (evitar .xls y temporales)
-        if parroquia.upper() in archivo.upper():
-            ruta_excel = os.path.join(carpeta, archivo)
-            st.write(f"[DEBUG] Excel encontrado: {ruta_excel}")
-            # Intento 1: Extraer imagen usando openpyxl
-            try:
-                wb = openpyxl.load_workbook(ruta_excel, data_only=True)
-                sheet = wb["MAPAS SMA-QoS-9"]
-                # Verificar si hay imágenes en la hoja
-                if not hasattr(sheet, "_images") or len(sheet._images) < 2:
-                    st.error("No se encontraron suficientes imágenes en la hoja.")
-                    return None, None
-                # Tomar la SEGUNDA imagen
-                imagen = sheet._images[1]  # Cambio aquí: seleccionamos la segunda imagen
-                img_data = BytesIO(imagen._data())
-                img_pil = PILImage.open(img_data)
-                # Guardar temporalmente como PNG
-                img_path = os.path.abspath(f"temp_{parroquia}_imagen.png")
-                img_pil.save(img_path)
-                st.write(f"[DEBUG] Imagen extraída y guardada en: {img_path}")
-                # Mostrar la imagen en Streamlit
-                st.image(img_path, caption="Imagen extraída de Excel", use_column_width=True)
-                return img_path, ruta_excel
-            except Exception as e:
-                st.error(f"Error con openpyxl: {str(e)}")
-                return None, None
-    return None, None
-
-def insertar_grafico_en_word(doc, img_path, ruta_excel):
+    if carpeta == "":
+        return None
+    try:
+        with os.scandir(carpeta) as entradas:
+            return tuple(sorted((entrada.name, entrada.stat().st_size, entrada.stat().st_mtime_ns)
+                                for entrada in entradas
+                                if entrada.name.lower().endswith(EXTENSIONES_LIBROS + EXTENSIONES_IMAGENES)))
+    except OSError:
+        return None
+
+def etapa(nombre, clave, calcular, medida=None, etapas=None):
     """
-    Inserta el gráfico en el documento Word después del texto 'RESULTADOS'.
+    Devuelve el resultado de una etapa de la generación guardado en la sesión si la
+    clave de sus entradas no cambió; si cambió (o no hay resultado), lo recalcula.
+    Con `medida` (una de registro.ETAPAS) el cálculo se cronometra como esa etapa.
+    Los trabajos de la cola, que no corren en el hilo de la sesión, pasan en
+    `etapas` el diccionario de etapas de su sesión.
     """
-    st.write(f"[DEBUG] Insertando gráfico en el documento")
-    encontrado = False
-    posicion = -1
-
-    # Buscar el párrafo exacto donde aparece "RESULTADOS CONECEL S.A."
-    for i, para in enumerate(doc.paragraphs):
-        if "RESULTADOS CONECEL S.A." in para.text or "RESULTADOS OTECEL S.A." in para.text:
-            st.write(f"[DEBUG] Sección encontrada en el párrafo {i}")
-            posicion = i
-            encontrado = True
-            break
-
-    if encontrado and posicion != -1:
-        # Insertar la imagen directamente después del párrafo encontrado
-        st.write(f"[DEBUG] Insertando gráfico en el párrafo {posicion + 1}")
-        run = doc.paragraphs[posicion].add_run()
-        run.add_picture(img_path, width=Inches(6))  # Ajustar el ancho a 6 pulgadas (más razonable)
-
-        st.write("[DEBUG] Gráfico insertado correctamente.")
+    if etapas is None:
+        etapas = st.session_state.setdefault("etapas", {})
+    if nombre in etapas and etapas[nombre][0] == clave and not _fallido(etapas[nombre][1]):
+        log.debug("Etapa %s tomada de la sesión", nombre)
+        return etapas[nombre][1]
+    if medida:
+        with medir(medida):
+            resultado = calcular()
     else:
-        st.error("[ERROR] No se encontró la sección 'RESULTADOS CONECEL S.A.' en el documento.")
+        resultado = calcular()
+    etapas[nombre] = (clave, resultado)
+    return resultado
 
-def buscar_imagenes_encabezado_pie(carpeta):
-    """
-    Busca las imágenes PNG llamadas 'encabezado' y 'pie de página' en la carpeta especificada.
-    """
-    encabezado_path = None
-    pie_path = None
-
-    for archivo in os.listdir(carpeta):
-        if archivo.lower() == "encabezado.png":
-            encabezado_path = os.path.join(carpeta, archivo)
-            st.write(f"[DEBUG] Imagen de encabezado encontrada: {encabezado_path}")
-        elif archivo.lower() == "pie de pagina.png":
-            pie_path = os.path.join(carpeta, archivo)
-            st.write(f"[DEBUG] Imagen de pie de página encontrada: {pie_path}")
+def _fallido(resultado):
+    """Indica si el resultado guardado es un Future que terminó con error (no se reutiliza)."""
+    return isinstance(resultado, Future) and resultado.done() and resultado.exception() is not None
 
-    return encabezado_path, pie_path
-
-def reemplazar_imagenes_encabezado_pie(doc, encabezado_path, pie_path):
+def preparar_informe(uploaded_word, huella_excel, df_cobertura, indice, selected_supervisor,
+                     recomendaciones, carpeta_graficos, carpeta_imagenes, entradas, con_pdf=False, carpeta_copia=""):
     """
-    Reemplaza las imágenes en el encabezado y pie de página del documento Word.
+    Parte del informe que se hace en la sesión: interpreta el nombre del modelo, busca
+    su fila en el consolidado y la muestra. Devuelve los datos que necesita
+    generar_por_etapas, o None si el informe no puede generarse.
     """
-    st.write(f"[DEBUG] Reemplazando imágenes en encabezado y pie de página")
-
-    for section in doc.sections:
-        header = section.header
-        footer = section.footer
-
-        # Eliminar imágenes existentes en el encabezado
-        for paragraph in header.paragraphs:
-            for run in paragraph.runs:
-                if run._element.xpath(".//w:drawing"):
-                    run._element.clear()
-
-        # Insertar nueva imagen en el encabezado
-        header_paragraph = header.paragraphs[0]
-        header_run = header_paragraph.add_run()
-        header_run.add_picture(encabezado_path, width=Inches(6))
-
-        # Eliminar imágenes existentes en el pie de página
-        for paragraph in footer.paragraphs:
-            for run in paragraph.runs:
-                if run._element.xpath(".//w:drawing"):
-                    run._element.clear()
-
-        # Insertar nueva imagen en el pie de página
-        footer_paragraph = footer.paragraphs[0]
-        footer_run = footer_paragraph.add_run()
-        footer_run.add_picture(pie_path, width=Inches(6))
-
-    st.write("[DEBUG] Imágenes en encabezado y pie de página reemplazadas correctamente.")
-
-def ajustar_margenes(doc):
+    filename = uploaded_word.name
+    log.debug("Archivo Word cargado: %s", filename)
+
+    # Extrae la información del nombre del archivo Word (incluida la parroquia)
+    parroquia, tecnologia, operadora, tipo_medicion = extract_info_from_filename(filename)
+    if not (parroquia and operadora):
+        st.error("El nombre del archivo no sigue el formato esperado.")
+        return None
+    log.debug("Información extraída: Parroquia=%s, Tecnología=%s, Operadora=%s, Tipo de Medición=%s", parroquia, tecnologia, operadora, tipo_medicion)
+
+    # Busca la fila por PARROQUIA, OPERADORA y TECNOLOGÍA en el índice
+    clave_fila = (huella_excel, parroquia, operadora, tecnologia)
+    fila = etapa("fila", clave_fila, lambda: buscar_fila(indice, parroquia, operadora, tecnologia), "busqueda_fila")
+    if fila is None:
+        st.error(f"No se encontraron datos para la parroquia {parroquia} con tecnología {tecnologia} y operadora {operadora}.")
+        return None
+    log.debug("Fila encontrada: %s", fila)
+    st.caption("Fila del consolidado usada para el informe:")
+    st.dataframe(pd.DataFrame([fila])[df_cobertura.columns])
+
+    return {
+        "filename": filename,
+        "contenido_word": uploaded_word.getvalue(),
+        "parroquia": parroquia,
+        "parroquias": parroquias_de(indice),
+        "clave_fila": clave_fila,
+        # Extrae valores para los marcadores
+        "placeholders": construir_placeholders(fila),
+        "selected_supervisor": selected_supervisor,
+        "recomendaciones": recomendaciones,
+        "carpeta_graficos": carpeta_graficos,
+        "carpeta_imagenes": carpeta_imagenes,
+        "con_pdf": con_pdf,
+        "carpeta_copia": carpeta_copia,
+        "entradas": entradas,
+    }
+
+def generar_por_etapas(trabajo, etapas, datos):
     """
-    Ajusta los márgenes del documento Word.
+    Genera el informe preparado con preparar_informe dentro de un trabajo de la cola,
+    en etapas (imágenes, modelo, composición, firma y guardado, y con "con_pdf" la
+    conversión a PDF). Las imágenes se precargan en hilos mientras avanzan el modelo
+    y la composición.
+    Cada etapa se guarda en `etapas` (las de la sesión) con la clave de sus entradas,
+    así que al cambiar solo el supervisor o las recomendaciones se rehace únicamente
+    la firma a partir de una copia del informe ya compuesto.
+    Devuelve el informe generado, con los segundos de cada etapa en "tiempos".
     """
-    st.write(f"[DEBUG] Ajustando márgenes del documento")
-
-    for section in doc.sections:
-        section.top_margin = Cm(4)
-        section.bottom_margin = Cm(2.54)
-        section.left_margin = Cm(2.54)
-        section.right_margin = Cm(2.54)
+    placeholders = datos["placeholders"]
+    numero_informe = placeholders["«NÚMERO__DE_INFORME»"]
+    carpeta_graficos, carpeta_imagenes = datos["carpeta_graficos"], datos["carpeta_imagenes"]
+
+    with registrar() as tiempos:
+        # Imágenes del informe: dependen de la parroquia y del contenido de las carpetas.
+        # Se leen en segundo plano mientras se interpreta el modelo y se sustituyen los marcadores
+        clave_recursos = (datos["clave_fila"], placeholders["«REQUIERE_MODIFICAR_MAPA_DE_COBERTURA_OPE»"],
+                          carpeta_graficos, estado_carpeta(carpeta_graficos),
+                          carpeta_imagenes, estado_carpeta(carpeta_imagenes))
+        recursos = etapa("recursos", clave_recursos,
+                         lambda: precargar_recursos(datos["parroquia"], placeholders, carpeta_graficos,
+                                                    carpeta_imagenes, datos["parroquias"]), etapas=etapas)
+
+        # Lee el modelo Word (se interpreta una sola vez por contenido)
+        clave_plantilla = huella(datos["contenido_word"])
+        plantilla = etapa("plantilla", clave_plantilla, lambda: obtener_plantilla(datos["contenido_word"]),
+                          "compilacion_plantilla", etapas)
+
+        # Informe compuesto sin supervisor ni recomendaciones
+        def componer():
+            doc = nuevo_documento(plantilla)
+            return doc, componer_informe(doc, placeholders, recursos, plantilla["ubicaciones"])
+        clave_compuesto = (clave_plantilla, clave_recursos)
+        compuesto, sin_reemplazo = etapa("compuesto", clave_compuesto, componer, etapas=etapas)
+
+        # Firma y guardado en memoria, sobre una copia para conservar el informe compuesto
+        def firmar():
+            doc = copy.deepcopy(compuesto)
+            firmar_informe(doc, datos["selected_supervisor"], datos["recomendaciones"], plantilla["ubicaciones"],
+                           lleva_correccion(recursos))
+            return documento_a_bytes(doc)
+        clave_firmado = (clave_compuesto, datos["selected_supervisor"], datos["recomendaciones"])
+        contenido = etapa("firmado", clave_firmado, firmar, etapas=etapas)
+
+        modified_filename = f"{numero_informe}_{datos['filename']}"
+        log.debug("Documento modificado generado: %s", modified_filename)
+
+        pdf = None
+        if datos["con_pdf"]:
+            pdf = etapa("pdf", clave_firmado,
+                        lambda: conversion_pdf.convertir_bytes(contenido, modified_filename,
+                                                               carpeta=trabajo["carpeta"]), "pdf", etapas)
+
+    if datos["carpeta_copia"]:
+        ruta_copia = os.path.join(datos["carpeta_copia"], modified_filename)
+        with open(ruta_copia, "wb") as f:
+            f.write(contenido)
+        log.debug("Copia guardada en: %s", ruta_copia)
+        if pdf:
+            with open(conversion_pdf.ruta_pdf(ruta_copia), "wb") as f:
+                f.write(pdf)
+    return {"nombre": modified_filename, "contenido": contenido, "pdf": pdf, "grafico": recursos.result()["grafico"],
+            "sin_reemplazo": sin_reemplazo, "entradas": datos["entradas"], "tiempos": tiempos, "avisos": []}
+
+def id_sesion():
+    """Identificador de la sesión de Streamlit actual (para los registros de la cola)."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    contexto = get_script_run_ctx(suppress_warning=True)
+    return contexto.session_id if contexto else None
+
+def mostrar_estado(trabajo, texto):
+    """Estado de un trabajo de la cola: posición mientras espera, progreso mientras se ejecuta."""
+    if trabajo["estado"] == "en cola":
+        st.info(f"{texto}: en cola, posición {trabajo['posicion']}. La página se actualiza sola.")
+    elif trabajo["progreso"]:
+        hechos, total = trabajo["progreso"]
+        st.progress(hechos / total if total else 0.0, text=f"{texto}: {hechos}/{total} informes")
+    else:
+        st.info(f"{texto}: en curso...")
+
+@st.fragment(run_every=1)
+def seguir_informe():
+    """Consulta cada segundo el trabajo del informe de esta sesión y, al terminar, lo muestra."""
+    trabajo = cola_trabajos.estado(st.session_state.get("trabajo_informe"))
+    if trabajo is None or trabajo["estado"] in ("en cola", "en curso"):
+        if trabajo:
+            mostrar_estado(trabajo, "Generando el informe")
+        else:
+            st.session_state.pop("trabajo_informe", None)
+        return
+    del st.session_state["trabajo_informe"]
+    if trabajo["estado"] == "terminado":
+        st.session_state.informe = dict(trabajo["resultado"], avisos=trabajo["avisos"])
+        st.session_state.pop("error_informe", None)
+    else:
+        st.session_state.error_informe = (f"Ocurrió un error: {trabajo['error']}", trabajo["avisos"])
+    st.rerun()
+
+def mostrar_avisos(avisos):
+    """Muestra los avisos y errores que registró un trabajo de la cola."""
+    for nivel, mensaje in avisos:
+        if nivel in ("ERROR", "CRITICAL"):
+            st.error(mensaje)
+        else:
+            st.warning(mensaje)
+
+def mostrar_informe(entradas):
+    """Ofrece para descargar el último informe generado en esta sesión."""
+    informe = st.session_state.get("informe")
+    if not informe:
+        return
+    if informe["entradas"] != entradas:
+        st.info("Los datos cambiaron desde la última generación; pulsa Generar para actualizar el informe.")
+    mostrar_avisos(informe["avisos"])
+    if informe["grafico"]:
+        st.image(informe["grafico"], caption="Imagen extraída de Excel", use_column_width=True)
+        st.success("Gráfico insertado en la sección 'RESULTADOS'")
+    if informe["sin_reemplazo"]:
+        st.warning(f"Marcadores sin valor en el informe: {describir_sin_reemplazo(informe['sin_reemplazo'])}")
+
+    # Ofrecer el archivo modificado para su descarga
+    st.download_button(
+        label="Descargar archivo Word modificado",
+        data=informe["contenido"],
+        file_name=informe["nombre"],
+        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    )
+    if informe["pdf"]:
+        st.download_button(
+            label="Descargar informe en PDF",
+            data=informe["pdf"],
+            file_name=conversion_pdf.ruta_pdf(informe["nombre"]),
+            mime="application/pdf"
+        )
+    mostrar_rendimiento(informe["tiempos"], st.session_state.get("tiempos_carga", {}))
+
+def mostrar_rendimiento(tiempos, tiempos_carga):
+    """Panel plegable con lo que tardó cada etapa de la última generación."""
+    with st.expander("Rendimiento"):
+        filas = [{"Etapa": ETAPAS[etapa_medida] + " (al cargar el archivo)", "Segundos": round(segundos, 3)}
+                 for etapa_medida, segundos in tiempos_carga.items()]
+        filas += [{"Etapa": ETAPAS[etapa_medida], "Segundos": round(tiempos[etapa_medida], 3)}
+                  for etapa_medida in ETAPAS if etapa_medida in tiempos]
+        st.dataframe(pd.DataFrame(filas, columns=["Etapa", "Segundos"]), hide_index=True)
+        st.caption(f"Total de la última generación: {sum(tiempos.values()):.3f} s. Las etapas que no "
+                   "aparecen se tomaron de la sesión sin recalcular.")
+
+def main():
+    configurar_interfaz()
+    st.title("Informes de Cobertura SMA")
+
+    # Carga de archivos para la parte de datos y para el documento Word
+    col1, col2 = st.columns(2)
+    with col1:
+        uploaded_excel = st.file_uploader("Cargar archivo Consolidado Excel", type=["xls", "xlsx"])
+    with col2:
+        uploaded_word = st.file_uploader("Cargar modelo de informe Word", type=["docx"])
+
+    selected_supervisor = st.selectbox("Selecciona al supervisor:", SUPERVISORES)
+
+    # Campo de texto para ingresar la ruta de la carpeta con los archivos Excel de gráficos
+    carpeta_graficos = st.text_input("Ingresa la ruta completa de la carpeta con archivos Excel y gráficos operadora",
+                                      value=st.session_state.get("carpeta_graficos", ""))
+    st.session_state.carpeta_graficos = carpeta_graficos
+
+    # Campo de texto para ingresar la ruta de la carpeta con las imágenes de encabezado y pie de página
+    carpeta_imagenes = st.text_input("Ingresa la ruta completa de la carpeta con las imágenes de encabezado y pie de página",
+                                      value=st.session_state.get("carpeta_imagenes", ""))
+    st.session_state.carpeta_imagenes = carpeta_imagenes
+
+    # Campo de texto para ingresar recomendaciones
+    recomendaciones = st.text_area("Ingresa recomendaciones (opcional):")
+
+    # Conversión a PDF con LibreOffice (opcional)
+    con_pdf = st.checkbox("Generar también el informe en PDF")
+
+    # El informe se genera en memoria; guardarlo también en disco es opcional
+    guardar_en_disco = st.checkbox("Guardar también una copia del informe en disco")
+    carpeta_copia = ""
+    if guardar_en_disco:
+        carpeta_copia = st.text_input("Ingresa la ruta completa de la carpeta donde guardar la copia",
+                                      value=st.session_state.get("carpeta_copia", ""))
+        st.session_state.carpeta_copia = carpeta_copia
+
+    if uploaded_excel is not None and uploaded_word is not None:
+        try:
+            # Procesa el Excel de datos (solo se vuelve a leer si cambia el archivo)
+            contenido_excel = uploaded_excel.getvalue()
+            huella_excel = huella(contenido_excel)
+            with registrar() as tiempos_carga:
+                df_cobertura, _, indice, duplicados = etapa("consolidado", huella_excel,
+                                                            lambda: cargar_consolidado(contenido_excel),
+                                                            "carga_excel")
+            if tiempos_carga:
+                st.session_state.tiempos_carga = tiempos_carga
+            log.debug("Archivo Excel de datos cargado.")
+            st.dataframe(df_cobertura)
+            avisar_duplicados(duplicados)
+
+            entradas = (huella_excel, huella(uploaded_word.getvalue()), uploaded_word.name,
+                        selected_supervisor, recomendaciones, carpeta_graficos.strip(), carpeta_imagenes.strip(),
+                        con_pdf)
+            en_curso = "trabajo_informe" in st.session_state
+            if st.button("Generar", disabled=en_curso):
+                datos = preparar_informe(uploaded_word, huella_excel, df_cobertura, indice,
+                                         selected_supervisor, recomendaciones, carpeta_graficos.strip(),
+                                         carpeta_imagenes.strip(), entradas, con_pdf,
+                                         carpeta_copia.strip() if guardar_en_disco else "")
+                if datos:
+                    try:
+                        st.session_state.trabajo_informe = cola_trabajos.enviar(
+                            "informe", generar_por_etapas, st.session_state.setdefault("etapas", {}), datos,
+                            sesion=id_sesion(), descripcion=datos["filename"])
+                        st.session_state.pop("error_informe", None)
+                    except cola_trabajos.ColaLlena as e:
+                        st.warning(f"El servidor está ocupado: {e}")
+            if "trabajo_informe" in st.session_state:
+                seguir_informe()
+            if "error_informe" in st.session_state:
+                mensaje, avisos = st.session_state.error_informe
+                mostrar_avisos(avisos)
+                st.error(mensaje)
+            mostrar_informe(entradas)
+        except Exception as e:
+            st.error(f"Ocurrió un error: {e}")
+    else:
+        st.info("Esperando a que cargues ambos archivos...")
 
-    st.write("[DEBUG] Márgenes ajustados correctamente.")
+    seccion_modo_lote(uploaded_excel, selected_supervisor, recomendaciones,
+                      carpeta_graficos.strip(), carpeta_imagenes.strip())
 
-def buscar_imagen_correccion_mapa(parroquia, carpeta):
+def seccion_modo_lote(uploaded_excel, selected_supervisor, recomendaciones, carpeta_graficos, carpeta_imagenes):
     """
-    Busca una imagen PNG o JPEG en la carpeta especificada que contenga el nombre de la parroquia.
+    Sección de la interfaz para generar todos los informes del consolidado en una sola ejecución.
     """
-    st.write(f"[DEBUG] Buscando imagen de corrección de mapa para {parroquia} en {carpeta}")
-    for archivo in os.listdir(carpeta):
-        if archivo.lower().endswith((".png", ".jpeg", ".jpg")) and parroquia.upper() in archivo.upper():
-            img_path = os.path.join(carpeta, archivo)
-            st.write(f"[DEBUG] Imagen de corrección de mapa encontrada: {img_path}")
-            return img_path
-    return None
-
-def insertar_imagen_correccion_mapa(doc, img_path):
+    with st.expander("Modo lote: generar todos los informes del consolidado"):
+        carpeta_plantillas = st.text_input("Ingresa la ruta completa de la carpeta con los modelos de informe Word",
+                                           value=st.session_state.get("carpeta_plantillas", ""))
+        st.session_state.carpeta_plantillas = carpeta_plantillas
+        carpeta_salida = st.text_input("Ingresa la ruta completa de la carpeta donde se guardarán los informes",
+                                       value=st.session_state.get("carpeta_salida", ""))
+        st.session_state.carpeta_salida = carpeta_salida
+        procesos = st.number_input("Número de procesos", min_value=1, max_value=os.cpu_count() or 1,
+                                   value=os.cpu_count() or 1)
+        incremental = st.checkbox("Generar solo los informes cuyos datos, modelo o imágenes cambiaron", value=True,
+                                  help="Los demás se copian de la caché de informes ya generados.")
+        con_pdf = st.checkbox("Convertir también los informes a PDF")
+        con_zip = st.checkbox("Empaquetar los informes en un ZIP para descargarlos", value=True)
+        procesos_pdf = 1
+        if con_pdf:
+            procesos_pdf = st.number_input("Número de LibreOffice para la conversión a PDF", min_value=1,
+                                           max_value=os.cpu_count() or 1,
+                                           value=max(1, (os.cpu_count() or 2) // 2))
+
+        forzar = st.checkbox("Generar aunque la comprobación encuentre errores",
+                             help="Los informes con errores saldrán incompletos (por ejemplo, sin gráfico).")
+
+        en_curso = "trabajo_lote" in st.session_state
+        col1, col2 = st.columns(2)
+        with col1:
+            comprobar = st.button("Comprobar el lote sin generarlo")
+        with col2:
+            generar = st.button("Generar todos los informes", disabled=en_curso)
+        if comprobar or generar:
+            if uploaded_excel is None or carpeta_plantillas.strip() == "" or carpeta_salida.strip() == "":
+                st.error("Carga el consolidado Excel e indica las carpetas de modelos y de salida.")
+            else:
+                plan = comprobar_lote(uploaded_excel, carpeta_plantillas.strip(), carpeta_salida.strip(),
+                                      carpeta_graficos, carpeta_imagenes)
+                if generar and plan["errores"] and not forzar:
+                    st.error("El lote no se generó: revisa los errores de la comprobación o marca "
+                             "«Generar aunque la comprobación encuentre errores».")
+                elif generar:
+                    enviar_lote(plan["trabajos"], plan["parroquias"], selected_supervisor, recomendaciones,
+                                carpeta_graficos, carpeta_imagenes, carpeta_salida.strip(), int(procesos),
+                                con_pdf, int(procesos_pdf), incremental, con_zip)
+        mostrar_plan()
+        if "trabajo_lote" in st.session_state:
+            seguir_lote()
+        mostrar_lote()
+
+def comprobar_lote(uploaded_excel, carpeta_plantillas, carpeta_salida, carpeta_graficos, carpeta_imagenes):
     """
-    Inserta la imagen de corrección de mapa en el documento Word después de 'Imagen 3.- Porcentaje de Cobertura WCDMA (3G), parámetro RSCP.'.
+    Comprueba modelos, filas e imágenes del lote sin generar nada (ver planificacion)
+    y guarda el resultado en la sesión para mostrarlo.
     """
-    st.write(f"[DEBUG] Insertando imagen de corrección de mapa en el documento")
-    encontrado = False
-    posicion = -1
-
-    # Buscar el párrafo exacto donde aparece "Imagen 3.- Porcentaje de Cobertura WCDMA (3G), parámetro RSCP."
-    for i, para in enumerate(doc.paragraphs):
-        if "Imagen 3.- Porcentaje de Cobertura WCDMA (3G), parámetro RSCP." in para.text:
-            st.write(f"[DEBUG] Sección encontrada en el párrafo {i}")
-            posicion = i
-            encontrado = True
-            break
-
-    if encontrado and posicion != -1:
-        # Insertar la imagen directamente después del párrafo encontrado
-        st.write(f"[DEBUG] Insertando imagen de corrección de mapa en el párrafo {posicion + 1}")
-        run = doc.paragraphs[posicion].add_run()
-        run.add_picture(img_path, width=Inches(6))  # Ajustar el ancho a 6 pulgadas (más razonable)
-
-        # Agregar el texto "Imagen 4.- Correción mapa de cobertura." con fuente Arial 9 y "Imagen.-" en negrita
-        new_para = doc.add_paragraph()
-        new_run = new_para.add_run("Imagen 4.- ")
-        new_run.font.name = 'Arial'
-        new_run.font.size = Pt(9)
-        new_run.bold = True
-        new_run = new_para.add_run("Corrección mapa de cobertura.")
-        new_run.font.name = 'Arial'
-        new_run.font.size = Pt(9)
-        new_para.alignment = 1 # Centrar el texto
-
-        st.write("[DEBUG] Imagen de corrección de mapa insertada correctamente.")
+    import planificacion
+
+    with medir("carga_excel"):
+        df_cobertura, tabla_marcadores, indice, duplicados = cargar_consolidado(uploaded_excel.getvalue())
+    plan = planificacion.planificar(df_cobertura, tabla_marcadores, carpeta_plantillas, carpeta_salida,
+                                    carpeta_graficos, carpeta_imagenes, parroquias_de(indice), duplicados)
+    plan["parroquias"] = parroquias_de(indice)
+    st.session_state.plan_lote = plan
+    return plan
+
+def mostrar_plan():
+    """Resultado de la última comprobación del lote: resumen, problemas y plan por informe."""
+    import planificacion
+
+    plan = st.session_state.get("plan_lote")
+    if not plan:
+        return
+    listos = sum(1 for fila in plan["plan"] if fila["estado"] != "con errores")
+    resumen = (f"Comprobación: {listos} de {len(plan['plan'])} informes sin errores "
+               f"({plan['errores']} errores, {plan['avisos']} avisos).")
+    if plan["errores"]:
+        st.error(resumen)
+    elif plan["avisos"]:
+        st.warning(resumen)
     else:
-        st.error("[ERROR] No se encontró la sección 'Imagen 3.- Porcentaje de Cobertura WCDMA (3G), parámetro RSCP.' en el documento.")
-
-# ----------------- Funciones para convertir Word a PDF -----------------
-
-def convert_word_to_pdf(doc_path, pdf_path):
+        st.success(resumen)
+    if plan["problemas"]:
+        st.dataframe(pd.DataFrame(plan["problemas"], columns=planificacion.COLUMNAS_PROBLEMAS), hide_index=True)
+    with st.expander("Plan del lote"):
+        st.dataframe(pd.DataFrame(plan["plan"], columns=planificacion.COLUMNAS_PLAN), hide_index=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Exportar problemas (CSV)",
+                               data=planificacion.a_csv(plan["problemas"], planificacion.COLUMNAS_PROBLEMAS),
+                               file_name="problemas_lote.csv", mime="text/csv")
+        with col2:
+            st.download_button("Exportar plan (CSV)", data=planificacion.a_csv(plan["plan"], planificacion.COLUMNAS_PLAN),
+                               file_name="plan_lote.csv", mime="text/csv")
+
+def enviar_lote(trabajos, parroquias, selected_supervisor, recomendaciones, carpeta_graficos, carpeta_imagenes,
+                carpeta_salida, procesos, con_pdf, procesos_pdf, incremental, con_zip):
     """
-    Convierte un documento de Word a PDF usando PyMuPDF.
+    Pone en la cola de lotes los trabajos de la comprobación (comprobar_lote).
+    Con `con_zip` los informes se empaquetan en la carpeta de salida mientras se generan.
     """
-    doc = fitz.open(doc_path)
-    pdf_bytes = doc.convert_to_pdf()
-    with open(pdf_path, "wb") as f:
-        f.write(pdf_bytes)
-    st.write(f"[DEBUG] Documento Word convertido a PDF y guardado en: {pdf_path}")
+    import lote
+    import empaquetado
 
+    if not trabajos:
+        st.error("Ninguna fila del consolidado tiene un modelo Word asociado.")
+        return
 
+    paquete = os.path.join(carpeta_salida, empaquetado.NOMBRE_ZIP) if con_zip else None
 
-# ----------------- Interfaz de Streamlit -----------------
+    def generar(trabajo):
+        def al_progresar(hechos, total, resultado):
+            cola_trabajos.progresar(trabajo, hechos, total)
 
-st.title("Informes de Cobertura SMA")
-
-# Carga de archivos para la parte de datos y para el documento Word
-col1, col2 = st.columns(2)
-with col1:
-    uploaded_excel = st.file_uploader("Cargar archivo Consolidado Excel", type=["xls", "xlsx"])
-with col2:
-    uploaded_word = st.file_uploader("Cargar modelo de informe Word", type=["docx"])
-
-# Botón de descarga al lado de la carga del informe de Word
-if uploaded_word is not None:
-    modified_filename = f"modified_{uploaded_word.name}"
-    if os.path.exists(modified_filename):
-        with open(modified_filename, "rb") as file:
-            st.download_button(
-                label="Descargar archivo Word modificado",
-                data=file,
-                file_name=modified_filename,
-                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            )
-
-supervisors = [
-    "Ing. Mauricio Sánchez Pinos",
-    "Ing. Mesías Vizuete López",
-    "Ing. Felipe Zumba Arichavala",
-    "Ing. Ramiro Hurtado Figueroa"
-]
-selected_supervisor = st.selectbox("Selecciona al supervisor:", supervisors)
-
-# Campo de texto para ingresar la ruta de la carpeta con los archivos Excel de gráficos
-carpeta_graficos = st.text_input("Ingresa la ruta completa de la carpeta con archivos Excel y gráficos operadora",
-                                  value=st.session_state.get("carpeta_graficos", ""))
-st.session_state.carpeta_graficos = carpeta_graficos
-
-# Campo de texto para ingresar la ruta de la carpeta con las imágenes de encabezado y pie de página
-carpeta_imagenes = st.text_input("Ingresa la ruta completa de la carpeta con las imágenes de encabezado y pie de página",
-                                  value=st.session_state.get("carpeta_imagenes", ""))
-st.session_state.carpeta_imagenes = carpeta_imagenes
-
-# Campo de texto para ingresar recomendaciones
-recomendaciones = st.text_area("Ingresa recomendaciones (opcional):")
-
-if uploaded_excel is not None and uploaded_word is not None:
-    try:
-        # Procesa el Excel de datos
-        df_cobertura = pd.read_excel(uploaded_excel, sheet_name="COBERTURA")
-        st.write("[DEBUG] Archivo Excel de datos cargado.")
-        st.dataframe(df_cobertura)
-
-        # Guarda el archivo Word cargado en un archivo temporal para manipularlo
-        temp_word_path = f"temp_{uploaded_word.name}"
-        with open(temp_word_path, "wb") as f:
-            f.write(uploaded_word.getbuffer())
-        st.write(f"[DEBUG] Archivo Word guardado temporalmente: {temp_word_path}")
-
-        # Lee el documento Word
-        doc = Document(temp_word_path)
-        filename = uploaded_word.name
-        st.write(f"[DEBUG] Archivo Word cargado: {filename}")
-
-        # Extrae la información del nombre del archivo Word (incluida la parroquia)
-        parroquia, tecnologia, operadora, tipo_medicion = extract_info_from_filename(filename)
-        if parroquia and operadora:
-            st.write(f"[DEBUG] Información extraída: Parroquia={parroquia}, Tecnología={tecnologia}, Operadora={operadora}, Tipo de Medición={tipo_medicion}")
-
-            # Filtra el DataFrame por PARROQUIA y OPERADORA
-            filtered_df = df_cobertura[
-                (df_cobertura['PARROQUIA'].str.strip().str.upper() == parroquia) &
-                (df_cobertura['OPERADORA'].str.strip() == operadora)
-            ]
-            if not filtered_df.empty:
-                st.write("[DEBUG] DataFrame filtrado:")
-                st.dataframe(filtered_df)
-
-                # Extrae valores para los marcadores
-                provincia = str(filtered_df['PROVINCIA'].values[0])
-                canton = str(filtered_df['CANTÓN'].values[0])
-                parroquia_val = str(filtered_df['PARROQUIA'].values[0])
-                fecha_medicion = filtered_df['FECHA CRONOGRAMA DE MEDICION 2024'].values[0]
-                numero_informe = str(filtered_df['NÚMERO  DE INFORME'].values[0])
-                fecha_informe = filtered_df['FECHA DE INFORME'].values[0]
-                numero_total_de_muestras_arcotel = str(filtered_df['NUMERO TOTAL DE MUESTRAS ARCOTEL'].values[0])
-                numero_muestras_validas_arcotel = str(filtered_df['NUMERO VALIDAS ARCOTEL'].values[0])
-                muestras_validas_velocidad = str(filtered_df['MUESTRAS VALIDAS VELOCIDAD ARCOTEL'].values[0])
-                modificar_mapa_de_cobertura_arc = str(filtered_df['REQUIERE MODIFICAR MAPA DE COBERTURA ARCOTEL'].values[0])
-                valor_medido = str(filtered_df['VALOR MEDIDO'].values[0])
-                cobertura_operadora = str(filtered_df['COBERTURA OPERADORA'].values[0])
-                alcanza_valor_objetivo_arcotel = str(filtered_df['ALCANZA VALOR OBJETIVO ARCOTEL'].values[0])
-                muestras_validas_operadora = str(filtered_df['PORCENTAJE DE MUESTRAS VALIDAS OPERADORA'].values[0])
-                alcanza_valor_objetivo_operadora = str(filtered_df['ALCANZA VALOR OBJETIVO OPERADORA'].values[0])
-                modificar_mapa_de_cobertura_operadora = str(filtered_df['REQUIERE MODIFICAR MAPA DE COBERTURA OPERADORA'].values[0])
-
-                placeholders = {
-                    "fecha_antecedentes": format_date(fecha_medicion, "month_only"),
-                    "fecha_pruebas_realizadas": format_date(fecha_medicion, "dd_mm_yyyy"),
-                    "fecha_conclusiones": format_date(fecha_medicion, "long_format"),
-                    "«PROVINCIA»": provincia,
-                    "«Provincia»": provincia.capitalize(),
-                    "«CANTÓN»": canton,
-                    "«Cantón»": canton.capitalize(),
-                    "«PARROQUIA»": parroquia_val,
-                    "«Parroquia»": parroquia_val.capitalize(),
-                    "«NÚMERO__DE_INFORME»": numero_informe,
-                    "«FECHA_DE_INFORME»": format_date(fecha_informe, "long_format"),
-                    "«VALOR_MEDIDO»": valor_medido,
-                    "«COBERTURA_OPERADORA»": cobertura_operadora,
-                    "«ALCANZA_VALOR_OBJETIVO_ARCOTEL»": alcanza_valor_objetivo_arcotel,
-                    "«NUMERO_TOTAL_DE_MUESTRAS_ARCOTEL»": numero_total_de_muestras_arcotel,
-                    "«NUMERO_VALIDAS_ARCOTEL»": numero_muestras_validas_arcotel,
-                    "«MUESTRAS_VALIDAS_VELOCIDAD_ARCOTEL»": muestras_validas_velocidad,
-                    "«REQUIERE_MODIFICAR_MAPA_DE_COBERTURA_ARC»": modificar_mapa_de_cobertura_arc,
-                    "«PORCENTAJE_DE_MUESTRAS_VALIDAS_OPERADORA»": muestras_validas_operadora,
-                    "«ALCANZA_VALOR_OBJETIVO_OPERADORA»": alcanza_valor_objetivo_operadora,
-                    "«REQUIERE_MODIFICAR_MAPA_DE_COBERTURA_OPE»": modificar_mapa_de_cobertura_operadora
-                }
-
-                # Procesa el documento: reemplaza marcadores en el cuerpo, encabezados y pies
-                process_doc_elements(doc, placeholders, selected_supervisor, recomendaciones)
-                process_headers_and_footers(doc, placeholders)
-
-                # Busca el archivo Excel que contenga la parroquia para extraer el gráfico
-                ruta_carpeta = st.session_state.get("carpeta_graficos", "").strip()
-                if ruta_carpeta != "":
-                    st.write(f"[DEBUG] Ruta de la carpeta de gráficos: {ruta_carpeta}")
-                    img_path, ruta_excel_graf = buscar_grafico(parroquia, ruta_carpeta)
-                    st.write(f"[DEBUG] Ruta Excel del gráfico encontrado: {ruta_excel_graf}")
-                    if img_path:
-                        # Insertar la imagen directamente en el mismo documento
-                        insertar_grafico_en_word(doc, img_path, ruta_excel_graf)
-
-                        # Eliminar la imagen temporal después de insertarla
-                        os.remove(img_path)
-                        st.success("Gráfico insertado en la sección 'RESULTADOS'")
-                    else:
-                        st.warning("No se encontró un archivo Excel con la parroquia en el nombre o el gráfico no pudo extraerse.")
-                else:
-                    st.write("[DEBUG] La variable 'carpeta_graficos' está vacía. Ingrese una ruta válida en el campo de texto.")
-
-                # Buscar y reemplazar imágenes en encabezado y pie de página
-                ruta_carpeta_imagenes = st.session_state.get("carpeta_imagenes", "").strip()
-                if ruta_carpeta_imagenes != "":
-                    st.write(f"[DEBUG] Ruta de la carpeta de imágenes: {ruta_carpeta_imagenes}")
-                    encabezado_path, pie_path = buscar_imagenes_encabezado_pie(ruta_carpeta_imagenes)
-                    if encabezado_path and pie_path:
-                        reemplazar_imagenes_encabezado_pie(doc, encabezado_path, pie_path)
-
-                        # Ajustar márgenes del documento
-                        ajustar_margenes(doc)
-
-                # Si modificar_mapa_de_cobertura_operadora es "SI", insertar la imagen de corrección de mapa
-                if modificar_mapa_de_cobertura_operadora.upper() == "SI":
-                    img_correccion_path = buscar_imagen_correccion_mapa(parroquia, ruta_carpeta)
-                    if img_correccion_path:
-                        insertar_imagen_correccion_mapa(doc, img_correccion_path)
-
-                # Guardar el archivo modificado final
-                modified_filename = f"{numero_informe}_{filename}"
-                doc.save(modified_filename)
-                st.write(f"[DEBUG] Documento modificado guardado: {modified_filename}")
-
-                # Ofrecer el archivo modificado para su descarga
-                with open(modified_filename, "rb") as file:
-                    st.download_button(
-                        label="Descargar archivo Word modificado",
-                        data=file,
-                        file_name=modified_filename,
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
+        resultados = lote.generar_lote(trabajos, selected_supervisor, recomendaciones,
+                                       carpeta_graficos, carpeta_imagenes, parroquias,
+                                       procesos=procesos, pdf=con_pdf, procesos_pdf=procesos_pdf,
+                                       incremental=incremental, paquete=paquete, al_progresar=al_progresar)
+        return {"resultados": resultados, "paquete": paquete}
 
-            else:
-                st.error(f"No se encontraron datos para la parroquia {parroquia} con tecnología {tecnologia} y operadora {operadora}.")
+    try:
+        st.session_state.trabajo_lote = cola_trabajos.enviar("lote", generar, sesion=id_sesion(),
+                                                             descripcion=f"{len(trabajos)} informes en {carpeta_salida}")
+        st.session_state.pop("lote", None)
+    except cola_trabajos.ColaLlena as e:
+        st.warning(f"El servidor está ocupado: {e}")
+
+@st.fragment(run_every=1)
+def seguir_lote():
+    """Consulta cada segundo el lote de esta sesión y, al terminar, guarda sus resultados."""
+    trabajo = cola_trabajos.estado(st.session_state.get("trabajo_lote"))
+    if trabajo is None or trabajo["estado"] in ("en cola", "en curso"):
+        if trabajo:
+            mostrar_estado(trabajo, "Generando el lote")
         else:
-            st.error("El nombre del archivo no sigue el formato esperado.")
-    except Exception as e:
-        st.error(f"Ocurrió un error: {e}")
-else:
-    st.info("Esperando a que cargues ambos archivos...")
+            st.session_state.pop("trabajo_lote", None)
+        return
+    del st.session_state["trabajo_lote"]
+    st.session_state.lote = trabajo
+    st.rerun()
+
+def mostrar_lote():
+    """Resultados del último lote de esta sesión."""
+    trabajo = st.session_state.get("lote")
+    if not trabajo:
+        return
+    mostrar_avisos(trabajo["avisos"])
+    if trabajo["estado"] == "error":
+        st.error(f"Ocurrió un error: {trabajo['error']}")
+        return
+    resultados = trabajo["resultado"]["resultados"]
+    paquete = trabajo["resultado"]["paquete"]
+    errores = [r for r in resultados if r["estado"] != "OK"]
+    reutilizados = sum(1 for r in resultados if r["accion"] == "reutilizado")
+    st.success(f"Informes generados: {len(resultados) - len(errores)} de {len(resultados)} "
+               f"({reutilizados} sin cambios, copiados de la caché)")
+    if paquete and os.path.exists(paquete):
+        def leer_paquete():
+            with open(paquete, "rb") as f:
+                return f.read()
+        # El ZIP se lee del disco recién al pulsar el botón, no en cada ejecución de la página
+        st.download_button("Descargar todos los informes (ZIP)", data=leer_paquete,
+                           file_name=os.path.basename(paquete), mime="application/zip")
+    st.dataframe(pd.DataFrame(resultados).drop(columns="tiempos"))
+    mostrar_rendimiento_lote(resultados)
+
+def mostrar_rendimiento_lote(resultados):
+    """Panel plegable con los tiempos por informe del lote y su exportación a JSON o CSV."""
+    with st.expander("Rendimiento del lote"):
+        filas = filas_de_tiempos(resultados)
+        tabla = pd.DataFrame(filas)
+        st.dataframe(tabla)
+        if filas:
+            st.caption("Promedio por informe (s): " + ", ".join(
+                f"{ETAPAS[etapa_medida]} {tabla[etapa_medida].mean():.3f}" for etapa_medida in ETAPAS))
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Exportar tiempos (JSON)", data=tiempos_a_json(resultados),
+                               file_name="tiempos_lote.json", mime="application/json")
+        with col2:
+            st.download_button("Exportar tiempos (CSV)", data=tiempos_a_csv(resultados),
+                               file_name="tiempos_lote.csv", mime="text/csv")
+
+# Streamlit ejecuta el script como "__main__"; al importarlo (por ejemplo desde los
+# procesos del modo lote) solo se cargan las funciones.
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+Modo lote: genera todos los informes del consolidado en una sola ejecución,
+repartiendo los documentos entre varios procesos.
+
+Los modelos Word se buscan en una carpeta y se emparejan con las filas de la hoja
+COBERTURA a partir de su nombre (PARROQUIA_XXG_OPERADORA_TIPO.docx). Un modelo cuyo
+nombre empieza por "MODELO" (por ejemplo MODELO_3G_CONECEL_COBERTURA.docx) sirve
+para todas las parroquias de esa tecnología y operadora que no tengan uno propio.
+"""
+import os
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import conversion_pdf
+import cache_informes
+import empaquetado
+from registro import registrar, medir, anotar, configurar_registro
+
+from indice_cobertura import clave_fila, columna_tecnologia
+from marcadores import construir_tabla_marcadores
+from plantillas import obtener_plantilla, nuevo_documento
+from generador import (
+    extract_info_from_filename,
+    generar_informe,
+    precargar_recursos,
+    describir_sin_reemplazo,
+)
+
+PREFIJO_MODELO = "MODELO"
+
+# Trabajos cuyas imágenes se leen por adelantado, además de los que están generándose
+LECTURA_ADELANTADA = 8
+
+log = logging.getLogger("informes.lote")
+
+def buscar_plantillas(carpeta_plantillas):
+    """
+    Clasifica los modelos Word de la carpeta en modelos propios de una parroquia,
+    con clave (parroquia, tecnología, operadora), y modelos genéricos, con clave
+    (tecnología, operadora).
+    """
+    propias = {}
+    genericas = {}
+    for archivo in sorted(os.listdir(carpeta_plantillas)):
+        if archivo.startswith("~$") or not archivo.lower().endswith(".docx"):
+            continue
+        parroquia, tecnologia, operadora, tipo_medicion = extract_info_from_filename(archivo)
+        if not parroquia:
+            continue
+        ruta = os.path.join(carpeta_plantillas, archivo)
+        parroquia, operadora, tecnologia = clave_fila(parroquia, operadora, tecnologia)
+        if parroquia == PREFIJO_MODELO:
+            genericas[(tecnologia, operadora)] = ruta
+        else:
+            propias[(parroquia, tecnologia, operadora)] = ruta
+    return propias, genericas
+
+def _buscar_plantilla(propias, genericas, parroquia, tecnologia, operadora):
+    """Prefiere el modelo propio de la parroquia y, si no existe, el genérico."""
+    if tecnologia:
+        return propias.get((parroquia, tecnologia, operadora)) or genericas.get((tecnologia, operadora))
+    # La hoja no indica la tecnología: sirve cualquiera
+    for (parroquia_modelo, _, operadora_modelo), ruta in propias.items():
+        if parroquia_modelo == parroquia and operadora_modelo == operadora:
+            return ruta
+    for (_, operadora_modelo), ruta in genericas.items():
+        if operadora_modelo == operadora:
+            return ruta
+    return None
+
+def emparejar_plantillas(df_cobertura, tabla_marcadores, carpeta_plantillas, carpeta_salida):
+    """
+    Empareja cada fila de la hoja COBERTURA con su modelo Word. Los marcadores de
+    cada trabajo se toman de `tabla_marcadores` (construir_tabla_marcadores), que
+    se calcula aquí si se pasa None. Si una parroquia, operadora y tecnología se
+    repite en la hoja, solo se usa la primera fila, como en construir_indice.
+    Devuelve la lista de trabajos a ejecutar y la lista de filas sin modelo.
+    """
+    if tabla_marcadores is None:
+        tabla_marcadores = construir_tabla_marcadores(df_cobertura)
+    propias, genericas = buscar_plantillas(carpeta_plantillas)
+    col_tecnologia = columna_tecnologia(df_cobertura)
+
+    trabajos = []
+    sin_plantilla = []
+    vistas = set()
+    for fila, placeholders in zip(df_cobertura.to_dict("records"), tabla_marcadores.to_dict("records")):
+        if not isinstance(fila['PARROQUIA'], str) or not isinstance(fila['OPERADORA'], str):
+            continue  # Filas vacías o de totales
+        clave_parroquia, operadora, tecnologia = clave_fila(fila['PARROQUIA'], fila['OPERADORA'],
+                                                            fila[col_tecnologia] if col_tecnologia else None)
+        if (clave_parroquia, operadora, tecnologia) in vistas:
+            continue  # Fila repetida: dos trabajos escribirían el mismo archivo
+        vistas.add((clave_parroquia, operadora, tecnologia))
+        # Los gráficos y mapas se buscan con el nombre tal como está en la hoja
+        parroquia = fila['PARROQUIA'].strip().upper()
+
+        plantilla = _buscar_plantilla(propias, genericas, clave_parroquia, tecnologia, operadora)
+        if plantilla is None:
+            sin_plantilla.append(f"{parroquia} / {tecnologia or '-'} / {operadora}")
+            continue
+
+        nombre = os.path.basename(plantilla)
+        if nombre.upper().startswith(PREFIJO_MODELO + "_"):
+            nombre = parroquia.replace(" ", "_") + nombre[len(PREFIJO_MODELO):]
+        trabajos.append({
+            "plantilla": plantilla,
+            "parroquia": parroquia,
+            "provincia": fila["PROVINCIA"].strip().upper() if isinstance(fila.get("PROVINCIA"), str) else "",
+            "operadora": operadora,
+            "tecnologia": tecnologia,
+            "placeholders": placeholders,
+            "salida": os.path.join(carpeta_salida, f"{placeholders['«NÚMERO__DE_INFORME»']}_{nombre}"),
+        })
+    return trabajos, sin_plantilla
+
+def nuevo_resultado(trabajo, estado="OK", error=""):
+    """Resultado de un trabajo del lote, antes de generarlo."""
+    return {
+        "numero": trabajo["placeholders"].get("«NÚMERO__DE_INFORME»", ""),
+        "parroquia": trabajo["parroquia"],
+        "provincia": trabajo.get("provincia", ""),
+        "operadora": trabajo["operadora"],
+        "tecnologia": trabajo["tecnologia"],
+        "salida": trabajo["salida"],
+        "estado": estado,
+        "error": error,
+        "accion": "generado",
+        "motivo": "",
+        "marcadores_sin_valor": "",
+        "pdf": "",
+        "tiempos": {},
+    }
+
+def procesar_trabajo(trabajo, selected_supervisor, recomendaciones, carpeta_graficos, carpeta_imagenes,
+                     parroquias=()):
+    """
+    Genera un informe dentro de un proceso del pool. Cualquier error queda
+    registrado en el resultado del trabajo para no detener el resto del lote.
+    Si el trabajo trae sus imágenes ya leídas ("recursos", con sus tiempos en
+    "tiempos_precarga"), no se vuelven a buscar.
+    """
+    resultado = nuevo_resultado(trabajo)
+    with registrar() as tiempos:
+        for etapa, segundos in trabajo.get("tiempos_precarga", {}).items():
+            anotar(etapa, segundos)
+        try:
+            # Los trabajos que comparten modelo en este proceso lo interpretan una sola vez
+            with medir("compilacion_plantilla"):
+                with open(trabajo["plantilla"], "rb") as f:
+                    plantilla = obtener_plantilla(f.read())
+            doc = nuevo_documento(plantilla)
+            sin_reemplazo = generar_informe(doc, trabajo["placeholders"], trabajo["parroquia"], selected_supervisor,
+                                            recomendaciones, carpeta_graficos, carpeta_imagenes,
+                                            plantilla["ubicaciones"], parroquias, trabajo.get("recursos"))
+            resultado["marcadores_sin_valor"] = describir_sin_reemplazo(sin_reemplazo)
+            with medir("guardado"):
+                doc.save(trabajo["salida"])
+        except Exception as e:
+            log.warning("Error al generar %s: %s", trabajo["salida"], e)
+            resultado["estado"] = "ERROR"
+            resultado["error"] = str(e)
+    resultado["tiempos"] = tiempos
+    return resultado
+
+def generar_lote(trabajos, selected_supervisor, recomendaciones, carpeta_graficos, carpeta_imagenes,
+                 parroquias=(), procesos=None, al_progresar=None, pdf=False, procesos_pdf=None,
+                 lectura_adelantada=LECTURA_ADELANTADA, incremental=True, paquete=None):
+    """
+    Reparte los trabajos entre `procesos` procesos y devuelve un resultado por trabajo.
+    `parroquias` son todas las del consolidado, para no confundir archivos de gráficos.
+    Las imágenes de cada informe se leen en hilos de este proceso y se envían con el
+    trabajo; se adelantan como mucho `lectura_adelantada` trabajos respecto de los que
+    ya están generándose, para acotar la memoria.
+    Con `incremental=True` solo se generan los informes cuyas entradas cambiaron; los
+    demás se copian de la caché de cache_informes. En cada carpeta de salida queda el
+    manifiesto del lote con lo que se generó y por qué ("accion" y "motivo" de cada resultado).
+    Con `pdf=True` cada informe terminado se pasa a los `procesos_pdf` LibreOffice de
+    conversion_pdf mientras se siguen generando los demás.
+    `al_progresar(hechos, total, resultado)` se llama cada vez que termina un informe
+    (con su PDF, si se pidió).
+    Con `paquete` (ruta de un .zip) cada informe terminado se agrega además a ese ZIP,
+    con el manifiesto CSV del lote (ver empaquetado).
+    Cada resultado lleva en "tiempos" los segundos de cada etapa (ver registro.ETAPAS).
+    """
+    if pdf:
+        # Falla antes de generar nada si LibreOffice no está instalado
+        conversion_pdf.iniciar(procesos_pdf)
+    carpetas = {os.path.dirname(trabajo["salida"]) for trabajo in trabajos}
+    anteriores = {}
+    for carpeta in carpetas:
+        os.makedirs(carpeta or ".", exist_ok=True)
+        for archivo, entrada in cache_informes.leer_manifiesto(carpeta or ".").items():
+            anteriores[os.path.join(carpeta, archivo)] = entrada
+    resultados = []
+    zip_lote = empaquetado.abrir(paquete) if paquete else None
+    claves = {}       # salida -> (huellas de las entradas, clave)
+    inicio = time.perf_counter()
+
+    def terminar(resultado):
+        resultados.append(resultado)
+        if zip_lote:
+            empaquetado.agregar(zip_lote, resultado)
+        if al_progresar:
+            al_progresar(len(resultados), len(trabajos), resultado)
+
+    procesos = procesos or os.cpu_count() or 1
+    por_preparar = iter(trabajos)
+    precargas = {}    # Future de las imágenes -> (trabajo, tiempos de la precarga)
+    futuros = {}      # Future del proceso -> (trabajo, motivo)
+    conversiones = {}
+    pendientes = set()
+    en_curso = 0
+
+    def preparar():
+        """Empieza a leer las imágenes de los siguientes trabajos, sin pasar del límite en curso."""
+        nonlocal en_curso
+        while en_curso < procesos + lectura_adelantada:
+            trabajo = next(por_preparar, None)
+            if trabajo is None:
+                return
+            with registrar() as tiempos_precarga:
+                futuro = precargar_recursos(trabajo["parroquia"], trabajo["placeholders"], carpeta_graficos,
+                                            carpeta_imagenes, parroquias)
+            precargas[futuro] = (trabajo, tiempos_precarga)
+            pendientes.add(futuro)
+            en_curso += 1
+
+    def convertir(resultado):
+        conversion = conversion_pdf.enviar(resultado["salida"], conversion_pdf.ruta_pdf(resultado["salida"]),
+                                           prioridad=conversion_pdf.PRIORIDAD_LOTE)
+        conversiones[conversion] = resultado
+        pendientes.add(conversion)
+
+    def reutilizar(trabajo, clave):
+        """
+        Copia el informe (y su PDF) de la caché si están. Devuelve el resultado, o None
+        si hay que generarlo. Si solo falta el PDF, se copia el .docx y el resultado
+        queda con la acción "solo PDF", para convertirlo.
+        """
+        docx = cache_informes.buscar(clave, ".docx")
+        if docx is None:
+            return None
+        resultado = nuevo_resultado(trabajo)
+        resultado["accion"] = "reutilizado"
+        resultado["motivo"] = "sin cambios"
+        cache_informes.copiar(docx, trabajo["salida"])
+        if pdf:
+            guardado = cache_informes.buscar(clave, ".pdf")
+            if guardado is None:
+                resultado["accion"] = "solo PDF"
+                resultado["motivo"] = "sin cambios; faltaba el PDF en la caché"
+                return resultado
+            cache_informes.copiar(guardado, conversion_pdf.ruta_pdf(trabajo["salida"]))
+            resultado["pdf"] = conversion_pdf.ruta_pdf(trabajo["salida"])
+        return resultado
+
+    # "spawn" evita heredar los hilos del servidor de Streamlit en los procesos hijos
+    contexto = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto, initializer=configurar_registro) as pool:
+            preparar()
+            while pendientes:
+                hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    if futuro in precargas:
+                        trabajo, tiempos_precarga = precargas.pop(futuro)
+                        motivo = "regeneración completa"
+                        huellas = None
+                        try:
+                            recursos = futuro.result()
+                            trabajo = dict(trabajo, recursos=recursos, tiempos_precarga=tiempos_precarga)
+                            huellas = cache_informes.componentes(trabajo["plantilla"], trabajo["placeholders"],
+                                                                 recursos, selected_supervisor, recomendaciones)
+                            claves[trabajo["salida"]] = (huellas, cache_informes.clave(huellas))
+                        except Exception as e:
+                            # El proceso del informe volverá a buscar las imágenes
+                            log.warning("Error al leer las imágenes de %s: %s", trabajo["salida"], e)
+                            motivo = "no se pudieron leer las imágenes por adelantado"
+                        if huellas is not None and incremental:
+                            try:
+                                reutilizado = reutilizar(trabajo, claves[trabajo["salida"]][1])
+                                motivo = cache_informes.motivo(anteriores.get(trabajo["salida"]), huellas)
+                            except OSError as e:
+                                log.warning("No se pudo copiar %s de la caché: %s", trabajo["salida"], e)
+                                reutilizado = None
+                                motivo = "no se pudo copiar de la caché"
+                            if reutilizado:
+                                # Fuera de los try: un error de aquí en adelante no debe generar otra vez el informe
+                                if reutilizado["accion"] == "solo PDF":
+                                    convertir(reutilizado)
+                                else:
+                                    terminar(reutilizado)
+                                en_curso -= 1
+                                preparar()
+                                continue
+                        proceso = pool.submit(procesar_trabajo, trabajo, selected_supervisor, recomendaciones,
+                                              carpeta_graficos, carpeta_imagenes, parroquias)
+                        futuros[proceso] = (trabajo, motivo)
+                        pendientes.add(proceso)
+                        continue
+                    if futuro in conversiones:
+                        resultado = conversiones.pop(futuro)
+                        try:
+                            resultado["pdf"] = futuro.result()
+                            resultado["tiempos"]["pdf"] = futuro.segundos
+                            if resultado["salida"] in claves:
+                                cache_informes.guardar(claves[resultado["salida"]][1], resultado["pdf"], ".pdf")
+                        except Exception as e:
+                            log.warning("Error al convertir a PDF %s: %s", resultado["salida"], e)
+                            resultado["estado"] = "ERROR"
+                            resultado["error"] = f"PDF: {e}"
+                        terminar(resultado)
+                        continue
+                    trabajo, motivo = futuros.pop(futuro)
+                    en_curso -= 1
+                    preparar()
+                    try:
+                        resultado = futuro.result()
+                    except Exception as e:
+                        # El proceso murió (por ejemplo, falta de memoria) antes de devolver el resultado
+                        resultado = nuevo_resultado(trabajo, "ERROR", str(e))
+                    resultado["motivo"] = motivo
+                    if resultado["estado"] == "OK" and trabajo["salida"] in claves:
+                        cache_informes.guardar(claves[trabajo["salida"]][1], resultado["salida"], ".docx")
+                    if pdf and resultado["estado"] == "OK":
+                        convertir(resultado)
+                    else:
+                        terminar(resultado)
+        escribir_manifiestos(resultados, claves)
+        if zip_lote:
+            log.info("Paquete del lote: %s (%d informes)", empaquetado.cerrar(zip_lote), zip_lote["informes"])
+            zip_lote = None
+    finally:
+        # Si el lote se interrumpe no queda un ZIP a medias ni sus temporales
+        if zip_lote:
+            empaquetado.descartar(zip_lote)
+    segundos = time.perf_counter() - inicio
+    log.info("Lote terminado: %d informes en %.1f s (%d reutilizados, %d con error)", len(resultados), segundos,
+             sum(1 for r in resultados if r["accion"] == "reutilizado"),
+             sum(1 for r in resultados if r["estado"] != "OK"))
+    return resultados
+
+def escribir_manifiestos(resultados, claves):
+    """Escribe en cada carpeta de salida el manifiesto del lote (ver cache_informes)."""
+    por_carpeta = {}
+    for resultado in resultados:
+        huellas, clave = claves.get(resultado["salida"], ({}, ""))
+        por_carpeta.setdefault(os.path.dirname(resultado["salida"]), []).append({
+            "archivo": os.path.basename(resultado["salida"]),
+            "parroquia": resultado["parroquia"],
+            "operadora": resultado["operadora"],
+            "tecnologia": resultado["tecnologia"],
+            "estado": resultado["estado"],
+            "accion": resultado["accion"],
+            "motivo": resultado["motivo"],
+            # Un informe con error no se da por generado: el siguiente lote lo vuelve a intentar
+            "clave": clave if resultado["estado"] == "OK" else "",
+            "componentes": huellas if resultado["estado"] == "OK" else {},
+        })
+    for carpeta, entradas in por_carpeta.items():
+        ruta = cache_informes.escribir_manifiesto(carpeta or ".", entradas)
+        log.info("Manifiesto del lote: %s", ruta)
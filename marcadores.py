@@ -0,0 +1,96 @@
+"""
+Tabla de marcadores del consolidado.
+
+Convierte la hoja COBERTURA completa en una tabla con una columna por marcador del
+modelo Word («PROVINCIA», «FECHA_DE_INFORME», ...), de modo que cada fecha se
+interpreta una sola vez por columna y cada informe solo tiene que leer su fila.
+
+pandas se importa dentro de las funciones: quien solo necesita CLAVES_MARCADORES
+(por ejemplo, un proceso que genera un informe) no lo carga.
+"""
+
+MESES = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+         "agosto", "septiembre", "octubre", "noviembre", "diciembre"]
+
+# Marcador del modelo Word -> columna de la hoja COBERTURA
+COLUMNAS_TEXTO = {
+    "«PROVINCIA»": "PROVINCIA",
+    "«CANTÓN»": "CANTÓN",
+    "«PARROQUIA»": "PARROQUIA",
+    "«NÚMERO__DE_INFORME»": "NÚMERO  DE INFORME",
+    "«VALOR_MEDIDO»": "VALOR MEDIDO",
+    "«COBERTURA_OPERADORA»": "COBERTURA OPERADORA",
+    "«ALCANZA_VALOR_OBJETIVO_ARCOTEL»": "ALCANZA VALOR OBJETIVO ARCOTEL",
+    "«NUMERO_TOTAL_DE_MUESTRAS_ARCOTEL»": "NUMERO TOTAL DE MUESTRAS ARCOTEL",
+    "«NUMERO_VALIDAS_ARCOTEL»": "NUMERO VALIDAS ARCOTEL",
+    "«MUESTRAS_VALIDAS_VELOCIDAD_ARCOTEL»": "MUESTRAS VALIDAS VELOCIDAD ARCOTEL",
+    "«REQUIERE_MODIFICAR_MAPA_DE_COBERTURA_ARC»": "REQUIERE MODIFICAR MAPA DE COBERTURA ARCOTEL",
+    "«PORCENTAJE_DE_MUESTRAS_VALIDAS_OPERADORA»": "PORCENTAJE DE MUESTRAS VALIDAS OPERADORA",
+    "«ALCANZA_VALOR_OBJETIVO_OPERADORA»": "ALCANZA VALOR OBJETIVO OPERADORA",
+    "«REQUIERE_MODIFICAR_MAPA_DE_COBERTURA_OPE»": "REQUIERE MODIFICAR MAPA DE COBERTURA OPERADORA",
+}
+
+# Variantes con solo la primera letra en mayúscula
+CAPITALIZADOS = {
+    "«Provincia»": "«PROVINCIA»",
+    "«Cantón»": "«CANTÓN»",
+    "«Parroquia»": "«PARROQUIA»",
+}
+
+CLAVES_MARCADORES = [
+    "fecha_antecedentes",
+    "fecha_pruebas_realizadas",
+    "fecha_conclusiones",
+    "«FECHA_DE_INFORME»",
+] + list(COLUMNAS_TEXTO) + list(CAPITALIZADOS)
+
+def a_texto(valor):
+    """
+    Convierte un valor de la hoja en texto. Los números enteros guardados como
+    decimales (1309.0, habitual en columnas con celdas vacías) se escriben sin ".0".
+    """
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+def formatear_fechas(columna):
+    """
+    Interpreta una columna de fechas una sola vez y devuelve sus tres formatos:
+    solo el mes ("enero"), "31/01/2025" y "31 de enero de 2025". Los valores que
+    no son fechas se dejan como texto, igual que hacía format_date.
+    """
+    import pandas as pd
+    fechas = pd.to_datetime(columna, errors="coerce", format="mixed")
+    validas = fechas.notna()
+    original = columna.map(str)
+
+    mes = fechas.dt.month.map(lambda m: MESES[int(m) - 1], na_action="ignore")
+    dd_mm_yyyy = fechas.dt.strftime("%d/%m/%Y")
+    # Sin ninguna fecha válida `mes` es float64 y no se concatena con texto; los valores
+    # vacíos se reemplazan abajo por el original
+    largo = fechas.dt.strftime("%d de ") + mes.fillna("").astype(str) + fechas.dt.strftime(" de %Y")
+    return (
+        mes.where(validas, original),
+        dd_mm_yyyy.where(validas, original),
+        largo.where(validas, original),
+    )
+
+def construir_tabla_marcadores(df_cobertura):
+    """
+    Devuelve una tabla con el mismo índice que la hoja y una columna por marcador.
+    """
+    import pandas as pd
+    tabla = pd.DataFrame(index=df_cobertura.index)
+
+    mes, dd_mm_yyyy, largo = formatear_fechas(df_cobertura['FECHA CRONOGRAMA DE MEDICION 2024'])
+    tabla["fecha_antecedentes"] = mes
+    tabla["fecha_pruebas_realizadas"] = dd_mm_yyyy
+    tabla["fecha_conclusiones"] = largo
+    tabla["«FECHA_DE_INFORME»"] = formatear_fechas(df_cobertura['FECHA DE INFORME'])[2]
+
+    for marcador, columna in COLUMNAS_TEXTO.items():
+        tabla[marcador] = df_cobertura[columna].map(a_texto).astype(object)
+    for marcador, original in CAPITALIZADOS.items():
+        tabla[marcador] = tabla[original].str.capitalize()
+
+    return tabla[CLAVES_MARCADORES].astype(object)
@@ -0,0 +1,61 @@
+"""
+Normalización de las imágenes que se insertan en los informes.
+
+Los gráficos, los mapas de corrección y las imágenes de encabezado y pie se
+imprimen a 6 pulgadas de ancho, pero suelen venir con mucha más resolución de la
+que se ve en el papel. Aquí se reducen al ancho en píxeles que corresponde a
+DPI_OBJETIVO para su ancho impreso y se vuelven a comprimir:
+- PNG (y cualquier formato que no sea JPEG) se guarda como PNG, sin pérdida;
+- JPEG se guarda como JPEG con CALIDAD_JPEG.
+Si el resultado no es más pequeño que el original, se usa el original.
+
+Pillow se importa al normalizar la primera imagen; si no está instalado o la
+imagen no se puede leer, la imagen se inserta tal como viene. La caché por
+contenido está en cache_imagenes.normalizar.
+"""
+import os
+import logging
+from io import BytesIO
+
+# Resolución de impresión de las imágenes; con 0 no se normaliza
+DPI_OBJETIVO = int(os.environ.get("IMAGENES_DPI", "200"))
+CALIDAD_JPEG = 85
+
+log = logging.getLogger("informes.normalizacion_imagenes")
+
+def normalizar_imagen(datos, ancho_pulgadas, dpi=None):
+    """
+    Devuelve los bytes de la imagen reducida a `dpi` puntos por pulgada para
+    `ancho_pulgadas` de ancho impreso y recomprimida, o `datos` si así ocupa menos.
+    """
+    dpi = DPI_OBJETIVO if dpi is None else dpi
+    if not dpi:
+        return datos
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        log.debug("Pillow no está instalado; las imágenes se insertan sin normalizar.")
+        return datos
+    try:
+        with Image.open(BytesIO(datos)) as imagen:
+            formato = imagen.format
+            imagen = ImageOps.exif_transpose(imagen)
+            ancho_maximo = max(1, round(ancho_pulgadas * dpi))
+            if imagen.width > ancho_maximo:
+                if imagen.mode not in ("RGB", "RGBA", "L", "LA"):
+                    imagen = imagen.convert("RGBA" if "transparency" in imagen.info else "RGB")
+                alto = max(1, round(imagen.height * ancho_maximo / imagen.width))
+                imagen = imagen.resize((ancho_maximo, alto), Image.LANCZOS)
+            salida = BytesIO()
+            if formato == "JPEG":
+                imagen.convert("RGB").save(salida, "JPEG", quality=CALIDAD_JPEG, optimize=True, dpi=(dpi, dpi))
+            else:
+                imagen.save(salida, "PNG", optimize=True, dpi=(dpi, dpi))
+    except Exception as e:
+        log.warning("No se pudo normalizar una imagen (%s); se inserta sin cambios.", e)
+        return datos
+    normalizada = salida.getvalue()
+    if len(normalizada) >= len(datos):
+        return datos
+    log.debug("Imagen normalizada: %d -> %d bytes", len(datos), len(normalizada))
+    return normalizada
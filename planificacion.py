@@ -0,0 +1,216 @@
+"""
+Comprobación previa de un lote: revisa modelos, filas e imágenes sin generar nada.
+
+Antes de lanzar un lote largo conviene saber qué informes van a salir incompletos.
+`planificar` recorre en una sola pasada lo mismo que usaría el lote y solo mira
+metadatos:
+- los nombres de los modelos Word (que extract_info_from_filename los entienda, que
+  sean .docx válidos y que tengan fila en COBERTURA), sin abrir los documentos;
+- las filas de COBERTURA sin modelo;
+- que dos informes no se guarden en el mismo archivo de salida;
+- el Excel de gráficos de cada parroquia, leyendo del zip solo las relaciones de la
+  hoja HOJA_GRAFICO para contar sus imágenes (sin cargar el libro ni las imágenes);
+- la imagen de corrección de mapa, cuando la fila la pide;
+- las imágenes de encabezado y pie de página.
+
+Devuelve el plan (una fila por informe, con los archivos que usaría y su estado) y
+la lista de problemas. Los "error" dejan un informe incompleto o sin generar; los
+"aviso" no lo impiden (archivos ambiguos, modelos que se ignoran).
+"""
+import os
+import io
+import csv
+import zipfile
+from collections import Counter
+from functools import lru_cache
+
+import lote
+from generador import extract_info_from_filename, requiere_correccion, HOJA_GRAFICO, POSICION_GRAFICO
+from imagenes_excel import imagenes_de_hoja
+from indice_carpetas import buscar_archivo, buscar_por_nombre
+
+ERROR = "error"
+AVISO = "aviso"
+
+COLUMNAS_PLAN = ("numero", "parroquia", "provincia", "operadora", "tecnologia", "estado", "plantilla", "salida",
+                 "excel_grafico", "correccion", "problemas")
+COLUMNAS_PROBLEMAS = ("nivel", "elemento", "problema")
+
+@lru_cache(maxsize=1024)
+def _imagenes_grafico(ruta_excel, tamano, mtime_ns):
+    with zipfile.ZipFile(ruta_excel) as archivo_zip:
+        return len(imagenes_de_hoja(archivo_zip, HOJA_GRAFICO))
+
+def contar_imagenes_grafico(ruta_excel):
+    """
+    Número de imágenes de la hoja del gráfico en el Excel, leyendo solo las relaciones
+    del zip; se calcula una vez mientras el archivo no cambie. Lanza KeyError si la
+    hoja no existe.
+    """
+    estado = os.stat(ruta_excel)
+    return _imagenes_grafico(os.path.abspath(ruta_excel), estado.st_size, estado.st_mtime_ns)
+
+@lru_cache(maxsize=1024)
+def _es_docx(ruta, tamano, mtime_ns):
+    if not zipfile.is_zipfile(ruta):
+        return False
+    with zipfile.ZipFile(ruta) as archivo_zip:
+        return "word/document.xml" in archivo_zip.namelist()
+
+def es_docx(ruta):
+    """Indica si el archivo es un .docx legible (un zip con word/document.xml)."""
+    estado = os.stat(ruta)
+    return _es_docx(os.path.abspath(ruta), estado.st_size, estado.st_mtime_ns)
+
+def _carpeta_valida(carpeta, descripcion, problemas):
+    if carpeta and not os.path.isdir(carpeta):
+        problemas.append({"nivel": ERROR, "elemento": carpeta, "problema": f"No existe la carpeta de {descripcion}."})
+        return False
+    return bool(carpeta)
+
+def _revisar_plantillas(carpeta_plantillas, usadas, problemas):
+    """Modelos que no se entienden, que no son .docx o que no tienen fila en COBERTURA."""
+    for archivo in sorted(os.listdir(carpeta_plantillas)):
+        if archivo.startswith("~$") or not archivo.lower().endswith(".docx"):
+            continue
+        ruta = os.path.join(carpeta_plantillas, archivo)
+        parroquia, tecnologia, operadora, _ = extract_info_from_filename(archivo)
+        if not parroquia:
+            problemas.append({"nivel": AVISO, "elemento": archivo,
+                              "problema": "El nombre no sigue el formato PARROQUIA_XXG_OPERADORA_TIPO.docx; "
+                                          "el modelo se ignora."})
+        elif not es_docx(ruta):
+            problemas.append({"nivel": ERROR, "elemento": archivo, "problema": "No es un documento Word (.docx) válido."})
+        elif ruta not in usadas:
+            if archivo.upper().startswith(lote.PREFIJO_MODELO + "_"):
+                problemas.append({"nivel": AVISO, "elemento": archivo,
+                                  "problema": "Ninguna fila de COBERTURA usa este modelo genérico."})
+            else:
+                problemas.append({"nivel": ERROR, "elemento": archivo,
+                                  "problema": f"No hay fila en COBERTURA para {parroquia} / {tecnologia} / {operadora}."})
+
+def _revisar_grafico(trabajo, carpeta_graficos, parroquias, fila, agregar):
+    ruta_excel, candidatos = buscar_archivo(carpeta_graficos, "libros", trabajo["parroquia"], parroquias)
+    if ruta_excel is None:
+        agregar(ERROR, f"No hay Excel de gráficos para {trabajo['parroquia']} en {carpeta_graficos}.")
+        return
+    fila["excel_grafico"] = ruta_excel
+    if len(candidatos) > 1:
+        agregar(AVISO, f"Varios Excel de gráficos coinciden con {trabajo['parroquia']}; se usaría "
+                       f"{os.path.basename(ruta_excel)}.")
+    try:
+        imagenes = contar_imagenes_grafico(ruta_excel)
+    except KeyError:
+        agregar(ERROR, f"{os.path.basename(ruta_excel)} no tiene la hoja {HOJA_GRAFICO}.")
+        return
+    except (OSError, zipfile.BadZipFile) as e:
+        agregar(ERROR, f"No se pudo leer {os.path.basename(ruta_excel)}: {e}")
+        return
+    if imagenes <= POSICION_GRAFICO:
+        agregar(ERROR, f"La hoja {HOJA_GRAFICO} de {os.path.basename(ruta_excel)} tiene {imagenes} imágenes; "
+                       f"hacen falta al menos {POSICION_GRAFICO + 1}.")
+
+def _revisar_correccion(trabajo, carpeta_graficos, parroquias, fila, agregar):
+    if not carpeta_graficos:
+        agregar(ERROR, "La fila pide corrección de mapa y no se indicó la carpeta de gráficos.")
+        return
+    ruta, candidatos = buscar_archivo(carpeta_graficos, "imagenes", trabajo["parroquia"], parroquias)
+    if ruta is None:
+        agregar(ERROR, f"La fila pide corrección de mapa y no hay imagen de {trabajo['parroquia']} "
+                       f"en {carpeta_graficos}.")
+        return
+    fila["correccion"] = ruta
+    if len(candidatos) > 1:
+        agregar(AVISO, f"Varias imágenes de corrección de mapa coinciden con {trabajo['parroquia']}; "
+                       f"se usaría {os.path.basename(ruta)}.")
+
+def planificar(df_cobertura, tabla_marcadores, carpeta_plantillas, carpeta_salida, carpeta_graficos,
+               carpeta_imagenes, parroquias=(), duplicados=None):
+    """
+    Comprueba el lote sin generarlo. Devuelve un diccionario con:
+    - "trabajos": los trabajos del lote (como lote.emparejar_plantillas);
+    - "plan": una fila por trabajo (COLUMNAS_PLAN), con estado "listo", "con avisos"
+      o "con errores";
+    - "problemas": una fila por problema (COLUMNAS_PROBLEMAS);
+    - "errores" y "avisos": cuántos problemas hay de cada nivel.
+    `duplicados` son los de leer_consolidado, para incluirlos como avisos.
+    """
+    problemas = []
+    for (parroquia, operadora, tecnologia), filas in (duplicados or {}).items():
+        problemas.append({"nivel": AVISO, "elemento": f"{parroquia} / {tecnologia or '-'} / {operadora}",
+                          "problema": "Aparece repetida en las filas "
+                                      f"{', '.join(str(fila) for fila in filas)} de COBERTURA; se usa la primera."})
+    if not os.path.isdir(carpeta_plantillas):
+        problemas.append({"nivel": ERROR, "elemento": carpeta_plantillas,
+                          "problema": "No existe la carpeta de modelos Word."})
+        return _resumen([], [], problemas)
+
+    trabajos, sin_plantilla = lote.emparejar_plantillas(df_cobertura, tabla_marcadores, carpeta_plantillas,
+                                                        carpeta_salida)
+    _revisar_plantillas(carpeta_plantillas, {trabajo["plantilla"] for trabajo in trabajos}, problemas)
+    for fila in sin_plantilla:
+        problemas.append({"nivel": AVISO, "elemento": fila, "problema": "No hay modelo Word para esta fila."})
+
+    con_graficos = _carpeta_valida(carpeta_graficos, "gráficos", problemas)
+    if not carpeta_graficos:
+        problemas.append({"nivel": AVISO, "elemento": "", "problema":
+                          "No se indicó la carpeta de gráficos: los informes saldrán sin gráfico."})
+    if _carpeta_valida(carpeta_imagenes, "imágenes", problemas):
+        for nombre in ("encabezado.png", "pie de pagina.png"):
+            if buscar_por_nombre(carpeta_imagenes, nombre) is None:
+                problemas.append({"nivel": AVISO, "elemento": carpeta_imagenes,
+                                  "problema": f"No está {nombre}; se conserva la imagen del modelo."})
+
+    por_salida = Counter(trabajo["salida"] for trabajo in trabajos)
+    plan = []
+    for trabajo in trabajos:
+        elemento = f"{trabajo['parroquia']} / {trabajo['tecnologia'] or '-'} / {trabajo['operadora']}"
+        fila = {
+            "numero": trabajo["placeholders"].get("«NÚMERO__DE_INFORME»", ""),
+            "parroquia": trabajo["parroquia"],
+            "provincia": trabajo["provincia"],
+            "operadora": trabajo["operadora"],
+            "tecnologia": trabajo["tecnologia"],
+            "estado": "listo",
+            "plantilla": os.path.basename(trabajo["plantilla"]),
+            "salida": trabajo["salida"],
+            "excel_grafico": "",
+            "correccion": "",
+            "problemas": [],
+        }
+
+        def agregar(nivel, problema):
+            problemas.append({"nivel": nivel, "elemento": elemento, "problema": problema})
+            fila["problemas"].append(problema)
+            if nivel == ERROR:
+                fila["estado"] = "con errores"
+            elif fila["estado"] == "listo":
+                fila["estado"] = "con avisos"
+
+        if por_salida[trabajo["salida"]] > 1:
+            agregar(ERROR, f"Otro informe del lote se guardaría en el mismo archivo "
+                           f"{os.path.basename(trabajo['salida'])}.")
+        if con_graficos:
+            _revisar_grafico(trabajo, carpeta_graficos, parroquias, fila, agregar)
+        if requiere_correccion(trabajo["placeholders"]) and (con_graficos or not carpeta_graficos):
+            _revisar_correccion(trabajo, carpeta_graficos, parroquias, fila, agregar)
+        fila["problemas"] = " ".join(fila["problemas"])
+        plan.append(fila)
+    return _resumen(trabajos, plan, problemas)
+
+def _resumen(trabajos, plan, problemas):
+    return {
+        "trabajos": trabajos,
+        "plan": plan,
+        "problemas": problemas,
+        "errores": sum(1 for problema in problemas if problema["nivel"] == ERROR),
+        "avisos": sum(1 for problema in problemas if problema["nivel"] == AVISO),
+    }
+
+def a_csv(filas, columnas):
+    """Texto CSV de las filas del plan o de los problemas."""
+    salida = io.StringIO()
+    escritor = csv.DictWriter(salida, fieldnames=columnas)
+    escritor.writeheader()
+    escritor.writerows(filas)
+    return salida.getvalue()
@@ -0,0 +1,191 @@
+"""
+Modelos Word precompilados.
+
+Un modelo se interpreta una sola vez: se abre con python-docx y se recorre su cuerpo
+para anotar dónde están los párrafos con marcadores «…», los textos del supervisor
+en las tablas de firmas y los párrafos ancla (RESULTADOS, "Imagen 3.-",
+RECOMENDACIONES e "Informe realizado por:"), de los que salen la sección de
+recomendaciones y los puntos donde se insertan las imágenes. Cada informe parte de
+una copia del árbol ya interpretado y solo toca esas ubicaciones.
+
+Las ubicaciones son rutas de índices desde el elemento <w:body> (por ejemplo (12,)
+para el párrafo 12 del cuerpo o (20, 3, 1, 0) para un párrafo dentro de una tabla),
+así que valen igual en el modelo y en cualquiera de sus copias. Por eso lo que se
+inserta en un informe va dentro de párrafos existentes o al final del cuerpo; un
+elemento nuevo entre los del modelo movería las rutas de todo lo que viene después,
+así que solo se agrega cuando ya no se van a usar (como el título de la corrección
+de mapa, en generador.firmar_informe).
+"""
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from docx import Document
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+from docx.table import Table
+
+from sustitucion import sustituir_parrafo, sustituir_literales, literales_supervisor, LITERALES_SUPERVISOR
+
+INICIO_RECOMENDACIONES = "RECOMENDACIONES"
+FIN_RECOMENDACIONES = "Informe realizado por:"
+
+# Ancla -> textos que identifican su párrafo en el cuerpo del documento
+ANCLAS = {
+    "resultados": ("RESULTADOS CONECEL S.A.", "RESULTADOS OTECEL S.A."),
+    "imagen_3": ("Imagen 3.- Porcentaje de Cobertura WCDMA (3G), parámetro RSCP.",),
+    "recomendaciones": (INICIO_RECOMENDACIONES,),
+    # Solo cuenta si aparece después del inicio de RECOMENDACIONES
+    "fin_recomendaciones": (FIN_RECOMENDACIONES,),
+}
+
+MAX_PLANTILLAS = 16
+_plantillas = OrderedDict()
+_candado = threading.Lock()
+
+def _ruta(elemento, raiz):
+    """Ruta de índices desde `raiz` hasta `elemento`."""
+    ruta = []
+    while elemento is not raiz:
+        padre = elemento.getparent()
+        ruta.append(padre.index(elemento))
+        elemento = padre
+    return tuple(reversed(ruta))
+
+def parrafo_en(doc, ruta):
+    """Devuelve el párrafo del documento que está en la ruta indicada."""
+    elemento = doc.element.body
+    for i in ruta:
+        elemento = elemento[i]
+    return Paragraph(elemento, doc)
+
+def localizar_elementos(doc):
+    """
+    Recorre una vez el cuerpo del documento y devuelve las ubicaciones de:
+    - "marcadores": párrafos con marcadores o textos del supervisor, en orden de
+      documento, como pares (ruta, está_en_tabla);
+    - "anclas": primer párrafo de cada ancla de ANCLAS (o None si no está);
+    - "recomendaciones": párrafos entre las anclas RECOMENDACIONES e
+      "Informe realizado por:" (hasta el final si falta la segunda).
+    """
+    body = doc.element.body
+    marcadores = []
+    parrafos = []
+    anclas = {nombre: None for nombre in ANCLAS}
+
+    for element in body:
+        if element.tag == qn('w:p'):
+            texto = Paragraph(element, doc).text
+            ruta = _ruta(element, body)
+            parrafos.append((ruta, texto))
+            if "«" in texto:
+                marcadores.append((ruta, False))
+            for nombre, textos in ANCLAS.items():
+                if anclas[nombre] is None and any(t in texto for t in textos):
+                    if nombre == "fin_recomendaciones" and anclas["recomendaciones"] in (None, ruta):
+                        continue
+                    anclas[nombre] = ruta
+        elif element.tag == qn('w:tbl'):
+            vistos = set()
+            for row in Table(element, doc).rows:
+                for cell in row.cells:
+                    for paragraph in cell.paragraphs:
+                        # Las celdas combinadas aparecen varias veces en row.cells
+                        if paragraph._p in vistos:
+                            continue
+                        vistos.add(paragraph._p)
+                        texto = paragraph.text
+                        if "«" in texto or any(literal in texto for literal in LITERALES_SUPERVISOR):
+                            marcadores.append((_ruta(paragraph._p, body), True))
+
+    return {"marcadores": marcadores, "anclas": anclas,
+            "recomendaciones": _seccion_recomendaciones(parrafos, anclas)}
+
+def _seccion_recomendaciones(parrafos, anclas):
+    """Rutas de los párrafos del cuerpo entre las anclas de inicio y fin de RECOMENDACIONES."""
+    inicio, fin = anclas["recomendaciones"], anclas["fin_recomendaciones"]
+    if inicio is None:
+        return []
+    # Como en el recorrido original, otro párrafo con "RECOMENDACIONES" dentro de la sección se omite
+    return [ruta for ruta, texto in parrafos
+            if ruta > inicio and (fin is None or ruta < fin) and INICIO_RECOMENDACIONES not in texto]
+
+def ancla(doc, nombre, ubicaciones=None):
+    """Párrafo del ancla `nombre` de ANCLAS, o None si el documento no la tiene."""
+    if ubicaciones is None:
+        ubicaciones = localizar_elementos(doc)
+    ruta = ubicaciones["anclas"][nombre]
+    return parrafo_en(doc, ruta) if ruta else None
+
+def aplicar_textos(doc, ubicaciones, placeholders, selected_supervisor, recomendaciones, sin_reemplazo=None):
+    """
+    Reemplaza los marcadores y textos del supervisor y escribe las recomendaciones,
+    tocando solo las ubicaciones indicadas. Devuelve el contador de fechas.
+    """
+    literales_tablas = literales_supervisor(selected_supervisor)
+    counter = [0]
+    for ruta, en_tabla in ubicaciones["marcadores"]:
+        paragraph = parrafo_en(doc, ruta)
+        sustituir_parrafo(paragraph, placeholders, counter,
+                          literales_tablas if en_tabla else None, sin_reemplazo)
+    escribir_recomendaciones(doc, ubicaciones, recomendaciones)
+    return counter
+
+def aplicar_marcadores(doc, ubicaciones, placeholders, sin_reemplazo=None):
+    """
+    Como aplicar_textos, pero solo con los marcadores «…»: el supervisor y las
+    recomendaciones quedan como en el modelo para aplicarlos después con
+    aplicar_supervisor_y_recomendaciones. Devuelve el contador de fechas.
+    """
+    counter = [0]
+    for ruta, _ in ubicaciones["marcadores"]:
+        sustituir_parrafo(parrafo_en(doc, ruta), placeholders, counter, None, sin_reemplazo)
+    return counter
+
+def aplicar_supervisor_y_recomendaciones(doc, ubicaciones, selected_supervisor, recomendaciones):
+    """Escribe el supervisor en las tablas de firmas y las recomendaciones."""
+    literales_tablas = literales_supervisor(selected_supervisor)
+    for ruta, en_tabla in ubicaciones["marcadores"]:
+        if en_tabla:
+            sustituir_literales(parrafo_en(doc, ruta), literales_tablas)
+    escribir_recomendaciones(doc, ubicaciones, recomendaciones)
+
+def escribir_recomendaciones(doc, ubicaciones, recomendaciones):
+    """Sustituye los párrafos de la sección RECOMENDACIONES por el texto indicado."""
+    if recomendaciones:
+        for i, ruta in enumerate(ubicaciones["recomendaciones"]):
+            paragraph = parrafo_en(doc, ruta)
+            paragraph.clear()
+            if i == 0:
+                paragraph.add_run(recomendaciones)
+
+def compilar_plantilla(contenido):
+    """Interpreta un modelo Word (bytes) y anota sus ubicaciones."""
+    doc = Document(BytesIO(contenido))
+    return {"documento": doc, "ubicaciones": localizar_elementos(doc)}
+
+def obtener_plantilla(contenido):
+    """
+    Devuelve el modelo compilado, reutilizando el de una llamada anterior si el
+    contenido (SHA-256) es el mismo. Se conservan los MAX_PLANTILLAS más recientes.
+    Se puede llamar desde varios hilos (los de cola_trabajos); el modelo se
+    interpreta fuera del candado.
+    """
+    clave = hashlib.sha256(contenido).hexdigest()
+    with _candado:
+        plantilla = _plantillas.get(clave)
+        if plantilla is not None:
+            _plantillas.move_to_end(clave)
+            return plantilla
+    plantilla = compilar_plantilla(contenido)
+    with _candado:
+        _plantillas[clave] = plantilla
+        while len(_plantillas) > MAX_PLANTILLAS:
+            _plantillas.popitem(last=False)
+    return plantilla
+
+def nuevo_documento(plantilla):
+    """Copia del documento del modelo, lista para rellenar un informe."""
+    return copy.deepcopy(plantilla["documento"])
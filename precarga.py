@@ -0,0 +1,63 @@
+"""
+Precarga de las imágenes de los informes en un grupo de hilos.
+
+Leer el gráfico del Excel de mediciones, la imagen de corrección de mapa y las de
+encabezado y pie suele ser lo más lento de un informe cuando las carpetas están
+en una unidad de red. Estas lecturas se lanzan aquí en cuanto se conoce la fila
+del informe y avanzan mientras se sustituyen los marcadores del modelo; el
+informe solo espera por ellas al insertar las imágenes.
+
+Cada tarea se ejecuta en una copia del contexto de quien la envía, así que sus
+tiempos se suman al registro abierto con registro.registrar(). El número de hilos
+se elige con la variable de entorno PRECARGA_HILOS (por defecto, 8).
+"""
+import os
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+
+HILOS = int(os.environ.get("PRECARGA_HILOS", "8"))
+
+_grupo = None
+_candado = threading.Lock()
+
+def _hilos():
+    global _grupo
+    with _candado:
+        if _grupo is None:
+            _grupo = ThreadPoolExecutor(max_workers=HILOS, thread_name_prefix="precarga")
+        return _grupo
+
+def enviar(funcion, *args):
+    """Ejecuta `funcion(*args)` en el grupo de hilos y devuelve su Future."""
+    contexto = contextvars.copy_context()
+    return _hilos().submit(contexto.run, funcion, *args)
+
+def reunir(futuros, base):
+    """
+    Future con una copia del diccionario `base` actualizada con el diccionario que
+    devuelve cada uno de `futuros`, cuando todos terminan. Si alguno falla, el
+    Future termina con su excepción.
+    """
+    reunido = Future()
+    resultado = dict(base)
+    pendientes = [len(futuros)]
+    candado = threading.Lock()
+
+    def al_terminar(futuro):
+        with candado:
+            if reunido.done():
+                return
+            if futuro.exception() is not None:
+                reunido.set_exception(futuro.exception())
+                return
+            resultado.update(futuro.result())
+            pendientes[0] -= 1
+            if pendientes[0] == 0:
+                reunido.set_result(resultado)
+
+    if not futuros:
+        reunido.set_result(resultado)
+    for futuro in futuros:
+        futuro.add_done_callback(al_terminar)
+    return reunido
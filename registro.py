@@ -0,0 +1,119 @@
+"""
+Mensajes de diagnóstico y tiempos por etapa de la generación de informes.
+
+Los mensajes van al logger "informes" (y sus hijos, uno por módulo) en lugar de
+escribirse en la página. El nivel se elige con la variable de entorno
+INFORMES_LOG_NIVEL (DEBUG, INFO, WARNING...; por defecto INFO).
+
+Los tiempos se miden con `medir(etapa)` y se acumulan en el registro abierto con
+`registrar()` en el hilo o proceso actual; si no hay registro abierto, la medición
+solo se anota en el log. Así cada informe (en la interfaz o en un proceso del modo
+lote) obtiene un diccionario etapa -> segundos.
+"""
+import os
+import io
+import csv
+import json
+import time
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Etapas medidas, en el orden en que se muestran
+ETAPAS = {
+    "carga_excel": "Carga del Excel",
+    "busqueda_fila": "Búsqueda de la fila",
+    "compilacion_plantilla": "Compilación del modelo Word",
+    "sustitucion": "Sustitución de marcadores",
+    "encabezados_pies": "Encabezados y pies",
+    "extraccion_grafico": "Extracción del gráfico",
+    "normalizacion_imagenes": "Normalización de imágenes",
+    "insercion_imagenes": "Inserción de imágenes",
+    "guardado": "Guardado",
+    "pdf": "Conversión a PDF",
+}
+
+log = logging.getLogger("informes.registro")
+_registro = ContextVar("registro_tiempos", default=None)
+# Las tareas de precarga suman sus tiempos al registro desde otros hilos
+_candado = threading.Lock()
+
+def configurar_registro(nivel=None):
+    """Prepara el logger "informes" una sola vez, con el nivel indicado o el de INFORMES_LOG_NIVEL."""
+    raiz = logging.getLogger("informes")
+    nivel = nivel or os.environ.get("INFORMES_LOG_NIVEL", "INFO")
+    raiz.setLevel(nivel.upper() if isinstance(nivel, str) else nivel)
+    if not raiz.handlers:
+        manejador = logging.StreamHandler()
+        manejador.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        raiz.addHandler(manejador)
+        raiz.propagate = False
+    return raiz
+
+@contextmanager
+def registrar():
+    """Abre un registro de tiempos para lo que se ejecute dentro del bloque y lo devuelve."""
+    tiempos = {}
+    token = _registro.set(tiempos)
+    try:
+        yield tiempos
+    finally:
+        _registro.reset(token)
+
+def anotar(etapa, segundos):
+    """Suma `segundos` a la etapa en el registro abierto, si lo hay."""
+    tiempos = _registro.get()
+    if tiempos is not None:
+        with _candado:
+            tiempos[etapa] = tiempos.get(etapa, 0.0) + segundos
+    log.debug("%s: %.3f s", etapa, segundos)
+
+@contextmanager
+def medir(etapa):
+    """Mide el tiempo del bloque y lo suma a la etapa."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        anotar(etapa, time.perf_counter() - inicio)
+
+def cronometrado(etapa):
+    """Decorador: mide cada llamada de la función como parte de la etapa."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir(etapa):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+def filas_de_tiempos(resultados, columnas=("parroquia", "operadora", "tecnologia", "estado")):
+    """
+    Una fila por informe con sus columnas de identificación, los segundos de cada
+    etapa de ETAPAS (0 si no se ejecutó) y el total.
+    """
+    filas = []
+    for resultado in resultados:
+        tiempos = resultado.get("tiempos") or {}
+        fila = {columna: resultado.get(columna) for columna in columnas}
+        for etapa in ETAPAS:
+            fila[etapa] = round(tiempos.get(etapa, 0.0), 4)
+        fila["total"] = round(sum(tiempos.values()), 4)
+        filas.append(fila)
+    return filas
+
+def tiempos_a_json(resultados):
+    """Tiempos de los informes como texto JSON."""
+    return json.dumps(filas_de_tiempos(resultados), ensure_ascii=False, indent=2)
+
+def tiempos_a_csv(resultados):
+    """Tiempos de los informes como texto CSV."""
+    filas = filas_de_tiempos(resultados)
+    salida = io.StringIO()
+    if filas:
+        escritor = csv.DictWriter(salida, fieldnames=list(filas[0]))
+        escritor.writeheader()
+        escritor.writerows(filas)
+    return salida.getvalue()
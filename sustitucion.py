@@ -0,0 +1,138 @@
+"""
+Sustitución de marcadores «…» en una sola pasada por párrafo.
+
+Word suele partir un marcador en varios "runs" (por ejemplo «PARR + OQUIA») cuando
+se edita el modelo. Aquí el texto de los runs de un párrafo se une una vez, todos
+los marcadores se buscan con una sola expresión regular y cada reemplazo se escribe
+en el primer run del marcador, de modo que conserva su formato; el resto del
+marcador se elimina de los runs siguientes.
+"""
+import re
+import logging
+from functools import lru_cache
+
+MARCADOR_FECHA = "«FECHA_CRONOGRAMA_DE_MEDICION_2024»"
+
+# Valores que toma MARCADOR_FECHA según el orden en que aparece en el cuerpo del documento
+SECUENCIA_FECHAS = ["fecha_antecedentes", "fecha_pruebas_realizadas", "fecha_conclusiones"]
+
+# Textos de las tablas de firmas que dependen del supervisor seleccionado
+SUPERVISOR_MODELO = "Ing. Mauricio Sánchez Pinos"
+CARGO_MODELO = "PROFESIONAL TÉCNICO 1"
+LITERALES_SUPERVISOR = (SUPERVISOR_MODELO, CARGO_MODELO)
+
+log = logging.getLogger("informes.sustitucion")
+
+def literales_supervisor(selected_supervisor):
+    """Reemplazos de las tablas de firmas para el supervisor seleccionado."""
+    literales = {SUPERVISOR_MODELO: selected_supervisor}
+    if selected_supervisor == "Ing. Mesías Vizuete López":
+        literales[CARGO_MODELO] = "ANALISTA TÉCNICO 2"
+    return literales
+
+@lru_cache(maxsize=32)
+def compilar_patron(literales=(), marcadores=True):
+    """
+    Devuelve la expresión regular que encuentra cualquier marcador «…» y, además,
+    los textos literales indicados (por ejemplo, el nombre del supervisor).
+    Con `marcadores=False` solo encuentra los literales.
+    """
+    alternativas = [re.escape(literal) for literal in sorted(literales, key=len, reverse=True)]
+    if marcadores:
+        alternativas.append(r"«[^«»\r\n]{1,100}»")
+    return re.compile("|".join(alternativas))
+
+def _reemplazar_en_runs(runs, textos, inicio, fin, valor, limites):
+    """
+    Reemplaza textos[inicio:fin] (posiciones sobre el texto unido del párrafo) por valor.
+    El valor se escribe en el run donde empieza el marcador.
+    """
+    primero = next(i for i in range(len(runs)) if limites[i] <= inicio < limites[i + 1])
+    ultimo = next(i for i in range(primero, len(runs)) if limites[i] < fin <= limites[i + 1])
+    inicio_local = inicio - limites[primero]
+    fin_local = fin - limites[ultimo]
+    if primero == ultimo:
+        textos[primero] = textos[primero][:inicio_local] + valor + textos[primero][fin_local:]
+        return {primero}
+    textos[primero] = textos[primero][:inicio_local] + valor
+    for i in range(primero + 1, ultimo):
+        textos[i] = ""
+    textos[ultimo] = textos[ultimo][fin_local:]
+    return set(range(primero, ultimo + 1))
+
+def sustituir_parrafo(paragraph, placeholders, contador, literales=None, sin_reemplazo=None):
+    """
+    Reemplaza en una sola pasada todos los marcadores del párrafo.
+
+    - `contador` es la lista mutable [n] que indica cuántos párrafos con
+      «FECHA_CRONOGRAMA_DE_MEDICION_2024» se han procesado ya; el primero recibe
+      la fecha de antecedentes, el segundo la de pruebas y el tercero la de conclusiones.
+      Si falta la fecha que toca, el marcador se deja como está.
+    - `literales` es un diccionario opcional texto -> reemplazo para textos que no
+      son marcadores «…».
+    - Los marcadores que quedan sin valor se suman en el Counter `sin_reemplazo`.
+    """
+    literales = literales or {}
+    runs = paragraph.runs
+    textos = [run.text for run in runs]
+    texto = "".join(textos)
+    if "«" not in texto and not any(literal in texto for literal in literales):
+        return contador
+
+    limites = [0]
+    for parte in textos:
+        limites.append(limites[-1] + len(parte))
+
+    coincidencias = list(compilar_patron(tuple(literales)).finditer(texto))
+    valor_fecha = None
+    if any(c.group() == MARCADOR_FECHA for c in coincidencias):
+        if contador[0] < len(SECUENCIA_FECHAS):
+            valor_fecha = placeholders.get(SECUENCIA_FECHAS[contador[0]])
+            if valor_fecha is None:
+                log.warning("Falta el valor %s; %s se deja sin reemplazar.", SECUENCIA_FECHAS[contador[0]],
+                            MARCADOR_FECHA)
+        contador[0] += 1
+
+    modificados = set()
+    # De derecha a izquierda para que las posiciones de los marcadores anteriores sigan valiendo
+    for coincidencia in reversed(coincidencias):
+        marcador = coincidencia.group()
+        if marcador == MARCADOR_FECHA:
+            valor = valor_fecha
+        elif marcador in literales:
+            valor = literales[marcador]
+        else:
+            valor = placeholders.get(marcador)
+        if valor is None:
+            if sin_reemplazo is not None:
+                sin_reemplazo[marcador] += 1
+            continue
+        modificados |= _reemplazar_en_runs(runs, textos, coincidencia.start(), coincidencia.end(), valor, limites)
+
+    for i in modificados:
+        runs[i].text = textos[i]
+    return contador
+
+def sustituir_literales(paragraph, literales):
+    """
+    Reemplaza en el párrafo solo los textos literales indicados (texto -> reemplazo),
+    sin tocar los marcadores «…». Sirve para cambiar el supervisor de un informe ya
+    rellenado.
+    """
+    runs = paragraph.runs
+    textos = [run.text for run in runs]
+    texto = "".join(textos)
+    if not any(literal in texto for literal in literales):
+        return
+
+    limites = [0]
+    for parte in textos:
+        limites.append(limites[-1] + len(parte))
+
+    modificados = set()
+    for coincidencia in reversed(list(compilar_patron(tuple(literales), False).finditer(texto))):
+        modificados |= _reemplazar_en_runs(runs, textos, coincidencia.start(), coincidencia.end(),
+                                           literales[coincidencia.group()], limites)
+
+    for i in modificados:
+        runs[i].text = textos[i]
@@ -0,0 +1,58 @@
+import io
+import os
+
+import pandas as pd
+
+import cache_excel
+
+def _consolidado(parroquias):
+    salida = io.BytesIO()
+    df = pd.DataFrame({"PROVINCIA": ["AZUAY"] * len(parroquias), "PARROQUIA": parroquias,
+                       "OPERADORA": ["CONECEL"] * len(parroquias), "NOTAS": ["x"] * len(parroquias)})
+    df.to_excel(salida, sheet_name="COBERTURA", index=False)
+    return salida.getvalue()
+
+def _contar_lecturas(monkeypatch):
+    lecturas = []
+    leer = cache_excel.leer_cobertura
+
+    def contar(contenido):
+        lecturas.append(contenido)
+        return leer(contenido)
+
+    monkeypatch.setattr(cache_excel, "leer_cobertura", contar)
+    return lecturas
+
+def test_el_mismo_contenido_se_lee_una_vez(tmp_path, monkeypatch):
+    lecturas = _contar_lecturas(monkeypatch)
+    contenido = _consolidado(["GUALACEO", "PAUTE"])
+    primera = cache_excel.cargar_cobertura(contenido, str(tmp_path))
+    segunda = cache_excel.cargar_cobertura(contenido, str(tmp_path))
+    assert len(lecturas) == 1
+    assert list(segunda["PARROQUIA"]) == ["GUALACEO", "PAUTE"]
+    assert list(segunda.columns) == list(primera.columns) == ["PROVINCIA", "PARROQUIA", "OPERADORA"]
+
+def test_otro_contenido_no_usa_la_cache(tmp_path, monkeypatch):
+    lecturas = _contar_lecturas(monkeypatch)
+    cache_excel.cargar_cobertura(_consolidado(["GUALACEO"]), str(tmp_path))
+    df = cache_excel.cargar_cobertura(_consolidado(["PAUTE"]), str(tmp_path))
+    assert len(lecturas) == 2
+    assert list(df["PARROQUIA"]) == ["PAUTE"]
+
+def test_cambiar_la_version_invalida_la_cache(tmp_path, monkeypatch):
+    lecturas = _contar_lecturas(monkeypatch)
+    contenido = _consolidado(["GUALACEO"])
+    cache_excel.cargar_cobertura(contenido, str(tmp_path))
+    monkeypatch.setattr(cache_excel, "VERSION_CACHE", cache_excel.VERSION_CACHE + 1)
+    cache_excel.cargar_cobertura(contenido, str(tmp_path))
+    assert len(lecturas) == 2
+
+def test_una_cache_danada_se_vuelve_a_leer(tmp_path, monkeypatch):
+    lecturas = _contar_lecturas(monkeypatch)
+    contenido = _consolidado(["GUALACEO"])
+    cache_excel.cargar_cobertura(contenido, str(tmp_path))
+    for archivo in os.listdir(tmp_path):
+        (tmp_path / archivo).write_bytes(b"no es parquet")
+    df = cache_excel.cargar_cobertura(contenido, str(tmp_path))
+    assert len(lecturas) == 2
+    assert list(df["PARROQUIA"]) == ["GUALACEO"]
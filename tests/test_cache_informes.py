@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+import cache_informes
+
+PLACEHOLDERS = {"«PARROQUIA»": "GUALACEO", "«NÚMERO__DE_INFORME»": "INF-001"}
+
+def _componentes(plantilla, placeholders=PLACEHOLDERS, recursos=None, supervisor="ANA", recomendaciones=""):
+    return cache_informes.componentes(str(plantilla), placeholders, recursos or {"grafico": b"png"},
+                                      supervisor, recomendaciones)
+
+def test_misma_entrada_misma_clave(tmp_path):
+    plantilla = tmp_path / "modelo.docx"
+    plantilla.write_bytes(b"modelo")
+    assert cache_informes.clave(_componentes(plantilla)) == cache_informes.clave(_componentes(plantilla))
+
+@pytest.mark.parametrize("cambio, componente", [
+    ({"placeholders": dict(PLACEHOLDERS, **{"«PARROQUIA»": "PAUTE"})}, "marcadores"),
+    ({"recursos": {"grafico": b"otro png"}}, "grafico"),
+    ({"recursos": {"grafico": b"png", "correccion": b"mapa"}}, "correccion"),
+    ({"supervisor": "LUIS"}, "supervisor"),
+    ({"recomendaciones": "Revisar la zona norte."}, "recomendaciones"),
+])
+def test_cada_entrada_cambia_la_clave(tmp_path, cambio, componente):
+    plantilla = tmp_path / "modelo.docx"
+    plantilla.write_bytes(b"modelo")
+    antes = _componentes(plantilla)
+    despues = _componentes(plantilla, **cambio)
+    assert cache_informes.clave(antes) != cache_informes.clave(despues)
+    assert cache_informes.motivo({"componentes": antes}, despues) == f"cambió: {componente}"
+
+def test_editar_el_modelo_en_su_sitio_cambia_la_clave(tmp_path):
+    plantilla = tmp_path / "modelo.docx"
+    plantilla.write_bytes(b"modelo")
+    antes = _componentes(plantilla)
+    plantilla.write_bytes(b"modelo corregido")
+    os.utime(plantilla, ns=(0, os.stat(plantilla).st_mtime_ns + 1_000_000))
+    despues = _componentes(plantilla)
+    assert cache_informes.clave(antes) != cache_informes.clave(despues)
+    assert cache_informes.motivo({"componentes": antes}, despues) == "cambió: plantilla"
+
+def test_la_imagen_en_disco_se_compara_por_contenido(tmp_path):
+    plantilla = tmp_path / "modelo.docx"
+    plantilla.write_bytes(b"modelo")
+    imagen = tmp_path / "mapa.png"
+    imagen.write_bytes(b"png")
+    # La misma imagen leída de disco o ya en memoria da la misma clave
+    assert _componentes(plantilla, recursos={"grafico": str(imagen)}) == _componentes(plantilla)
+
+def test_motivo_sin_cambios_y_sin_anterior(tmp_path):
+    plantilla = tmp_path / "modelo.docx"
+    plantilla.write_bytes(b"modelo")
+    huellas = _componentes(plantilla)
+    assert cache_informes.motivo(None, huellas) == "sin informe anterior"
+    assert cache_informes.motivo({"componentes": huellas}, huellas) == "sin cambios, pero no está en la caché"
+
+def test_copiar_no_deja_temporales_si_falla(tmp_path):
+    origen = tmp_path / "informe.docx"
+    origen.write_bytes(b"docx")
+    destino = tmp_path / "salida.docx"
+    destino.mkdir()  # No se puede reemplazar una carpeta con un archivo
+    with pytest.raises(OSError):
+        cache_informes.copiar(str(origen), str(destino))
+    assert sorted(os.listdir(tmp_path)) == ["informe.docx", "salida.docx"]
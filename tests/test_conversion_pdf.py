@@ -0,0 +1,31 @@
+import queue
+
+import pytest
+
+import conversion_pdf
+
+@pytest.fixture
+def cola(monkeypatch):
+    """Cola propia y sin trabajadores: los trabajos quedan en ella para mirar su orden."""
+    monkeypatch.setattr(conversion_pdf, "_cola", queue.PriorityQueue())
+    monkeypatch.setattr(conversion_pdf, "_trabajadores", [{}])
+    return conversion_pdf._cola
+
+def _orden(cola):
+    salidas = []
+    while not cola.empty():
+        _, _, trabajo = cola.get_nowait()
+        salidas.append(trabajo["salida"])
+    return salidas
+
+def test_el_informe_suelto_pasa_delante_del_lote(cola):
+    for numero in range(3):
+        conversion_pdf.enviar(f"lote{numero}.docx", f"lote{numero}.pdf", prioridad=conversion_pdf.PRIORIDAD_LOTE)
+    conversion_pdf.enviar("informe.docx", "informe.pdf")
+    conversion_pdf.enviar("lote3.docx", "lote3.pdf", prioridad=conversion_pdf.PRIORIDAD_LOTE)
+    assert _orden(cola) == ["informe.pdf", "lote0.pdf", "lote1.pdf", "lote2.pdf", "lote3.pdf"]
+
+def test_dentro_de_una_prioridad_se_respeta_la_llegada(cola):
+    for numero in range(3):
+        conversion_pdf.enviar(f"informe{numero}.docx", f"informe{numero}.pdf")
+    assert _orden(cola) == ["informe0.pdf", "informe1.pdf", "informe2.pdf"]
@@ -0,0 +1,67 @@
+import csv
+import io
+import os
+import zipfile
+
+import empaquetado
+
+def _resultado(tmp_path, nombre, estado="OK", **valores):
+    salida = tmp_path / nombre
+    salida.write_bytes(nombre.encode())
+    resultado = {"numero": "INF-001", "parroquia": "GUALACEO", "provincia": "AZUAY", "operadora": "CONECEL",
+                 "tecnologia": "3G", "estado": estado, "accion": "generado", "error": "", "salida": str(salida),
+                 "pdf": ""}
+    resultado.update(valores)
+    return resultado
+
+def test_cerrar_deja_el_zip_con_el_manifiesto(tmp_path):
+    ruta_zip = str(tmp_path / "lote" / empaquetado.NOMBRE_ZIP)
+    paquete = empaquetado.abrir(ruta_zip)
+    empaquetado.agregar(paquete, _resultado(tmp_path, "INF-001_GUALACEO.docx"))
+    empaquetado.agregar(paquete, _resultado(tmp_path, "INF-002_PAUTE.docx", estado="ERROR", error="sin modelo"))
+    assert empaquetado.cerrar(paquete) == ruta_zip
+    assert os.listdir(tmp_path / "lote") == [empaquetado.NOMBRE_ZIP]
+    with zipfile.ZipFile(ruta_zip) as archivo_zip:
+        assert archivo_zip.namelist() == ["CONECEL/3G/AZUAY/INF-001_GUALACEO.docx", empaquetado.NOMBRE_MANIFIESTO_CSV]
+        filas = list(csv.DictReader(io.StringIO(archivo_zip.read(empaquetado.NOMBRE_MANIFIESTO_CSV)
+                                                .decode("utf-8-sig"))))
+    assert [(fila["estado"], fila["docx"]) for fila in filas] == [
+        ("OK", "CONECEL/3G/AZUAY/INF-001_GUALACEO.docx"), ("ERROR", "")]
+    assert paquete["informes"] == 1
+
+def test_no_repite_nombres_dentro_del_zip(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    ruta_zip = str(tmp_path / empaquetado.NOMBRE_ZIP)
+    paquete = empaquetado.abrir(ruta_zip)
+    empaquetado.agregar(paquete, _resultado(tmp_path, "a/INF-001_GUALACEO.docx"))
+    empaquetado.agregar(paquete, _resultado(tmp_path, "b/INF-001_GUALACEO.docx"))
+    empaquetado.agregar(paquete, _resultado(tmp_path, "INF-001_GUALACEO.docx"))
+    empaquetado.cerrar(paquete)
+    with zipfile.ZipFile(ruta_zip) as archivo_zip:
+        assert archivo_zip.namelist()[:3] == ["CONECEL/3G/AZUAY/INF-001_GUALACEO.docx",
+                                              "CONECEL/3G/AZUAY/INF-001_GUALACEO (2).docx",
+                                              "CONECEL/3G/AZUAY/INF-001_GUALACEO (3).docx"]
+        assert archivo_zip.read("CONECEL/3G/AZUAY/INF-001_GUALACEO (2).docx") == b"b/INF-001_GUALACEO.docx"
+
+def test_descartar_elimina_los_temporales(tmp_path):
+    ruta_zip = str(tmp_path / "lote" / empaquetado.NOMBRE_ZIP)
+    paquete = empaquetado.abrir(ruta_zip)
+    empaquetado.agregar(paquete, _resultado(tmp_path, "INF-001_GUALACEO.docx"))
+    empaquetado.descartar(paquete)
+    assert os.listdir(tmp_path / "lote") == []
+
+def test_el_mismo_archivo_no_se_agrega_dos_veces(tmp_path):
+    ruta_zip = str(tmp_path / empaquetado.NOMBRE_ZIP)
+    paquete = empaquetado.abrir(ruta_zip)
+    empaquetado.agregar(paquete, _resultado(tmp_path, "INF-001_GUALACEO.docx"))
+    empaquetado.agregar(paquete, _resultado(tmp_path, "INF-001_GUALACEO.docx", numero="INF-002"))
+    empaquetado.cerrar(paquete)
+    with zipfile.ZipFile(ruta_zip) as archivo_zip:
+        assert archivo_zip.namelist() == ["CONECEL/3G/AZUAY/INF-001_GUALACEO.docx", empaquetado.NOMBRE_MANIFIESTO_CSV]
+        filas = list(csv.DictReader(io.StringIO(archivo_zip.read(empaquetado.NOMBRE_MANIFIESTO_CSV)
+                                                .decode("utf-8-sig"))))
+    assert [(fila["numero"], fila["estado"], fila["docx"]) for fila in filas] == [
+        ("INF-001", "OK", "CONECEL/3G/AZUAY/INF-001_GUALACEO.docx"), ("INF-002", "ERROR", "")]
+    assert "mismo archivo" in filas[1]["error"]
+    assert paquete["informes"] == 1
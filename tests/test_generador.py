@@ -0,0 +1,42 @@
+from io import BytesIO
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+from generador import generar
+from plantillas import INICIO_RECOMENDACIONES, FIN_RECOMENDACIONES, ANCLAS
+
+def _png():
+    from PIL import Image
+    salida = BytesIO()
+    Image.new("RGB", (4, 4), "red").save(salida, "PNG")
+    return salida.getvalue()
+
+def _modelo():
+    doc = Document()
+    doc.add_paragraph("Parroquia «PARROQUIA»")
+    doc.add_paragraph(ANCLAS["imagen_3"][0])
+    doc.add_paragraph(INICIO_RECOMENDACIONES)
+    doc.add_paragraph("Recomendación del modelo")
+    doc.add_paragraph(FIN_RECOMENDACIONES)
+    salida = BytesIO()
+    doc.save(salida)
+    return salida.getvalue()
+
+def test_la_correccion_lleva_su_titulo_centrado_y_las_recomendaciones_siguen_en_su_sitio():
+    placeholders = {"«PARROQUIA»": "RICAURTE"}
+    contenido = generar(placeholders, _modelo(), {"correccion": _png()}, recomendaciones="Nuevas")
+    parrafos = Document(BytesIO(contenido)).paragraphs
+    textos = [p.text for p in parrafos]
+    assert textos[0] == "Parroquia RICAURTE"
+    # El título va justo después del párrafo de la imagen, no al final del documento
+    assert parrafos[1]._p.xpath(".//w:drawing")
+    assert textos[2] == "Imagen 4.- Corrección mapa de cobertura."
+    assert parrafos[2].alignment == WD_ALIGN_PARAGRAPH.CENTER
+    assert parrafos[2].runs[0].bold
+    assert textos[3:6] == [INICIO_RECOMENDACIONES, "Nuevas", FIN_RECOMENDACIONES]
+    assert len(textos) == 6
+
+def test_sin_correccion_no_hay_titulo():
+    contenido = generar({"«PARROQUIA»": "RICAURTE"}, _modelo())
+    assert "Imagen 4.-" not in "\n".join(p.text for p in Document(BytesIO(contenido)).paragraphs)
@@ -0,0 +1,53 @@
+import os
+import time
+
+from indice_carpetas import buscar_archivo, buscar_por_nombre
+
+PARROQUIAS = ("SAN JUAN", "SAN JUAN BOSCO", "GUALACEO")
+
+def _crear(carpeta, *nombres):
+    for nombre in nombres:
+        (carpeta / nombre).write_bytes(b"")
+    return str(carpeta)
+
+def test_encuentra_la_parroquia_con_separadores_y_tildes(tmp_path):
+    carpeta = _crear(tmp_path, "MEDICION_SAN_JUAN_2024.xlsx", "Medición Gualaceo.xlsx")
+    ruta, candidatos = buscar_archivo(carpeta, "libros", "Gualaceo", PARROQUIAS)
+    assert os.path.basename(ruta) == "Medición Gualaceo.xlsx"
+    assert candidatos == [ruta]
+
+def test_prefiere_el_archivo_propio_al_de_una_parroquia_mas_larga(tmp_path):
+    carpeta = _crear(tmp_path, "MEDICION SAN JUAN BOSCO 2024.xlsx", "MEDICION SAN JUAN 2024.xlsx")
+    ruta, _ = buscar_archivo(carpeta, "libros", "SAN JUAN", PARROQUIAS)
+    assert os.path.basename(ruta) == "MEDICION SAN JUAN 2024.xlsx"
+    ruta, _ = buscar_archivo(carpeta, "libros", "SAN JUAN BOSCO", PARROQUIAS)
+    assert os.path.basename(ruta) == "MEDICION SAN JUAN BOSCO 2024.xlsx"
+
+def test_no_toma_el_unico_archivo_si_es_de_otra_parroquia(tmp_path, caplog):
+    carpeta = _crear(tmp_path, "MEDICION SAN JUAN BOSCO 2024.xlsx")
+    assert buscar_archivo(carpeta, "libros", "SAN JUAN", PARROQUIAS) == (None, [])
+    assert "otra parroquia" in caplog.text
+
+def test_sin_lista_de_parroquias_acepta_cualquier_coincidencia(tmp_path):
+    carpeta = _crear(tmp_path, "MEDICION SAN JUAN BOSCO 2024.xlsx")
+    ruta, _ = buscar_archivo(carpeta, "libros", "SAN JUAN")
+    assert os.path.basename(ruta) == "MEDICION SAN JUAN BOSCO 2024.xlsx"
+
+def test_no_confunde_libros_con_imagenes(tmp_path):
+    carpeta = _crear(tmp_path, "CORRECCION SAN JUAN.png", "~$MEDICION SAN JUAN.xlsx")
+    assert buscar_archivo(carpeta, "libros", "SAN JUAN", PARROQUIAS) == (None, [])
+    ruta, _ = buscar_archivo(carpeta, "imagenes", "SAN JUAN", PARROQUIAS)
+    assert os.path.basename(ruta) == "CORRECCION SAN JUAN.png"
+
+def test_el_indice_se_rehace_al_cambiar_la_carpeta(tmp_path):
+    carpeta = _crear(tmp_path, "otro.xlsx")
+    assert buscar_archivo(carpeta, "libros", "GUALACEO", PARROQUIAS) == (None, [])
+    time.sleep(0.01)
+    _crear(tmp_path, "GUALACEO.xlsx")
+    os.utime(carpeta, ns=(time.time_ns(), time.time_ns() + 10_000_000))
+    assert buscar_archivo(carpeta, "libros", "GUALACEO", PARROQUIAS)[0] is not None
+
+def test_buscar_por_nombre_sin_distinguir_mayusculas(tmp_path):
+    carpeta = _crear(tmp_path, "Encabezado.PNG")
+    assert os.path.basename(buscar_por_nombre(carpeta, "encabezado.png")) == "Encabezado.PNG"
+    assert buscar_por_nombre(carpeta, "pie de pagina.png") is None
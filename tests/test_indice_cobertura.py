@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from indice_cobertura import construir_indice, buscar_fila, estandarizar_operadora
+
+def _hoja(filas, columnas=("PARROQUIA", "OPERADORA", "TECNOLOGÍA")):
+    return pd.DataFrame(filas, columns=list(columnas))
+
+def test_busca_sin_tildes_ni_diferencias_de_operadora():
+    indice, duplicados = construir_indice(_hoja([["San Juán", "Conecel", "3G"], ["GUALACEO", "OTECEL S.A.", "4G"]]))
+    assert buscar_fila(indice, "SAN JUAN", "CONECEL S.A.", "3G")["PARROQUIA"] == "San Juán"
+    assert buscar_fila(indice, "GUALACEO", "OTECEL", None)["TECNOLOGÍA"] == "4G"
+    assert buscar_fila(indice, "GUALACEO", "OTECEL", "3G") is None
+    assert duplicados == {}
+
+def test_filas_repetidas_y_vacias():
+    indice, duplicados = construir_indice(_hoja([["RICAURTE", "CONECEL", "3G"], [None, None, None],
+                                                 ["RICAURTE", "CONECEL S.A.", "3G"]]))
+    assert duplicados == {("RICAURTE", "CONECEL S.A.", "3G"): [2, 4]}
+    assert len(indice) == 2
+
+def test_falta_una_columna_requerida():
+    with pytest.raises(ValueError, match="OPERADORA"):
+        construir_indice(_hoja([["RICAURTE", "3G"]], ("PARROQUIA", "TECNOLOGÍA")))
+
+def test_estandarizar_operadora():
+    assert estandarizar_operadora("conecel s.a") == "CONECEL S.A."
+    assert estandarizar_operadora("Otecel") == "OTECEL S.A."
+
+def test_el_error_del_consolidado_solo_lista_las_columnas_de_la_hoja(monkeypatch):
+    import cache_excel
+    import generador
+    hoja = _hoja([["RICAURTE", "3G"]], ("PARROQUIA", "TECNOLOGÍA"))
+    monkeypatch.setattr(cache_excel, "cargar_cobertura", lambda contenido: hoja)
+    with pytest.raises(ValueError) as error:
+        generador.leer_consolidado(b"")
+    assert "OPERADORA" in str(error.value) and "PARROQUIA, TECNOLOGÍA" in str(error.value)
+    assert "«" not in str(error.value)
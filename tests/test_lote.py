@@ -0,0 +1,17 @@
+import pandas as pd
+from docx import Document
+
+import lote
+
+NUMERO = "«NÚMERO__DE_INFORME»"
+
+def test_una_fila_repetida_da_un_solo_trabajo(tmp_path):
+    Document().save(str(tmp_path / "MODELO_3G_CONECEL_COBERTURA.docx"))
+    df = pd.DataFrame({"PROVINCIA": ["AZUAY"] * 3, "PARROQUIA": ["GUALACEO", "Gualaceo ", "PAUTE"],
+                       "OPERADORA": ["CONECEL"] * 3, "TECNOLOGIA": ["3G"] * 3})
+    tabla = pd.DataFrame({NUMERO: ["INF-001", "INF-002", "INF-003"]})
+    trabajos, sin_plantilla = lote.emparejar_plantillas(df, tabla, str(tmp_path), str(tmp_path / "salida"))
+    assert sin_plantilla == []
+    assert [(trabajo["parroquia"], trabajo["placeholders"][NUMERO]) for trabajo in trabajos] == [
+        ("GUALACEO", "INF-001"), ("PAUTE", "INF-003")]
+    assert len({trabajo["salida"] for trabajo in trabajos}) == 2
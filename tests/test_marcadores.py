@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from cache_excel import COLUMNAS_COBERTURA
+from marcadores import formatear_fechas, construir_tabla_marcadores
+
+def test_fechas_validas_y_texto():
+    mes, dd_mm_yyyy, largo = formatear_fechas(pd.Series(["2025-01-31", "pendiente"]))
+    assert list(mes) == ["enero", "pendiente"]
+    assert list(dd_mm_yyyy) == ["31/01/2025", "pendiente"]
+    assert list(largo) == ["31 de enero de 2025", "pendiente"]
+
+def test_una_columna_sin_ninguna_fecha():
+    for columna in (pd.Series([np.nan, np.nan]), pd.Series([pd.NaT, pd.NaT]), pd.Series(["sin fecha", None])):
+        resultados = formatear_fechas(columna)
+        # Como format_date: lo que no es fecha queda como su texto
+        assert [list(resultado) for resultado in resultados] == [list(columna.map(str))] * 3
+
+def test_la_tabla_admite_la_fecha_de_informe_vacia():
+    fila = {columna: "x" for columna in COLUMNAS_COBERTURA}
+    fila["FECHA CRONOGRAMA DE MEDICION 2024"] = "2025-01-31"
+    df = pd.DataFrame([fila, fila])
+    df["FECHA DE INFORME"] = np.nan
+    tabla = construir_tabla_marcadores(df)
+    assert list(tabla["«FECHA_DE_INFORME»"]) == ["nan", "nan"]
+    assert list(tabla["fecha_conclusiones"]) == ["31 de enero de 2025"] * 2
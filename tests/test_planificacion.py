@@ -0,0 +1,133 @@
+from io import BytesIO
+
+import pandas as pd
+from docx import Document
+from openpyxl import Workbook
+from openpyxl.drawing.image import Image as ImagenExcel
+
+import planificacion
+from generador import HOJA_GRAFICO
+
+NUMERO = "«NÚMERO__DE_INFORME»"
+CORRECCION = "«REQUIERE_MODIFICAR_MAPA_DE_COBERTURA_OPE»"
+
+def _png():
+    from PIL import Image
+    salida = BytesIO()
+    Image.new("RGB", (4, 4), "red").save(salida, "PNG")
+    return salida
+
+def _modelo(ruta):
+    Document().save(str(ruta))
+
+def _libro(ruta, imagenes, hoja=HOJA_GRAFICO):
+    libro = Workbook()
+    libro.active.title = hoja
+    for numero in range(imagenes):
+        libro.active.add_image(ImagenExcel(_png()), f"A{1 + numero * 10}")
+    libro.save(str(ruta))
+
+def _carpetas(tmp_path):
+    carpetas = {nombre: tmp_path / nombre for nombre in ("plantillas", "graficos", "salida")}
+    for carpeta in carpetas.values():
+        carpeta.mkdir()
+    return carpetas
+
+def _planificar(carpetas, filas):
+    """`filas` son (parroquia, requiere corrección)."""
+    df = pd.DataFrame({"PROVINCIA": ["AZUAY"] * len(filas),
+                       "PARROQUIA": [parroquia for parroquia, _ in filas],
+                       "OPERADORA": ["CONECEL"] * len(filas),
+                       "TECNOLOGIA": ["3G"] * len(filas)})
+    tabla = pd.DataFrame({NUMERO: [f"INF-{numero:03d}" for numero in range(len(filas))],
+                          CORRECCION: [correccion for _, correccion in filas]})
+    return planificacion.planificar(df, tabla, str(carpetas["plantillas"]), str(carpetas["salida"]),
+                                    str(carpetas["graficos"]), "",
+                                    parroquias=[parroquia for parroquia, _ in filas])
+
+def _problemas(resumen, nivel):
+    return sorted((problema["elemento"], problema["problema"]) for problema in resumen["problemas"]
+                  if problema["nivel"] == nivel)
+
+def test_un_lote_completo_queda_listo(tmp_path):
+    carpetas = _carpetas(tmp_path)
+    _modelo(carpetas["plantillas"] / "GUALACEO_3G_CONECEL_COBERTURA.docx")
+    _libro(carpetas["graficos"] / "MEDICION GUALACEO.xlsx", 2)
+    (carpetas["graficos"] / "GUALACEO.png").write_bytes(_png().getvalue())
+    resumen = _planificar(carpetas, [("GUALACEO", "SI")])
+    assert resumen["errores"] == 0
+    assert [fila["estado"] for fila in resumen["plan"]] == ["listo"]
+    assert resumen["plan"][0]["excel_grafico"].endswith("MEDICION GUALACEO.xlsx")
+    assert resumen["plan"][0]["correccion"].endswith("GUALACEO.png")
+    assert resumen["avisos"] == 0
+
+def test_revisa_los_modelos_word(tmp_path):
+    carpetas = _carpetas(tmp_path)
+    _modelo(carpetas["plantillas"] / "GUALACEO_3G_CONECEL_COBERTURA.docx")
+    _modelo(carpetas["plantillas"] / "informe sin formato.docx")
+    _modelo(carpetas["plantillas"] / "SIGSIG_3G_CONECEL_COBERTURA.docx")
+    (carpetas["plantillas"] / "PAUTE_3G_CONECEL_COBERTURA.docx").write_bytes(b"no es un docx")
+    _libro(carpetas["graficos"] / "MEDICION GUALACEO.xlsx", 2)
+    _libro(carpetas["graficos"] / "MEDICION PAUTE.xlsx", 2)
+    resumen = _planificar(carpetas, [("GUALACEO", "NO"), ("PAUTE", "NO"), ("CHORDELEG", "NO")])
+    errores = _problemas(resumen, planificacion.ERROR)
+    assert [elemento for elemento, _ in errores] == ["PAUTE_3G_CONECEL_COBERTURA.docx",
+                                                     "SIGSIG_3G_CONECEL_COBERTURA.docx"]
+    assert "No es un documento Word" in errores[0][1]
+    assert "No hay fila en COBERTURA" in errores[1][1]
+    avisos = _problemas(resumen, planificacion.AVISO)
+    assert [elemento for elemento, _ in avisos] == ["CHORDELEG / 3G / CONECEL S.A.", "informe sin formato.docx"]
+    assert "No hay modelo Word" in avisos[0][1]
+    assert "no sigue el formato" in avisos[1][1]
+
+def test_revisa_los_graficos_y_la_correccion_de_cada_informe(tmp_path):
+    carpetas = _carpetas(tmp_path)
+    for parroquia in ("GUALACEO", "PAUTE", "SIGSIG", "CHORDELEG"):
+        _modelo(carpetas["plantillas"] / f"{parroquia}_3G_CONECEL_COBERTURA.docx")
+    _libro(carpetas["graficos"] / "MEDICION GUALACEO.xlsx", 1)
+    _libro(carpetas["graficos"] / "MEDICION PAUTE.xlsx", 2, hoja="OTRA HOJA")
+    _libro(carpetas["graficos"] / "MEDICION CHORDELEG.xlsx", 2)
+    resumen = _planificar(carpetas, [("GUALACEO", "NO"), ("PAUTE", "NO"), ("SIGSIG", "NO"), ("CHORDELEG", "SI")])
+    problemas = {fila["parroquia"]: (fila["estado"], fila["problemas"]) for fila in resumen["plan"]}
+    assert problemas["GUALACEO"][0] == "con errores"
+    assert "tiene 1 imágenes" in problemas["GUALACEO"][1]
+    assert f"no tiene la hoja {HOJA_GRAFICO}" in problemas["PAUTE"][1]
+    assert "No hay Excel de gráficos para SIGSIG" in problemas["SIGSIG"][1]
+    assert "no hay imagen de CHORDELEG" in problemas["CHORDELEG"][1]
+    assert resumen["errores"] == 4
+
+def test_sin_carpeta_de_modelos(tmp_path):
+    carpetas = _carpetas(tmp_path)
+    carpetas["plantillas"] = tmp_path / "no existe"
+    resumen = _planificar(carpetas, [("GUALACEO", "NO")])
+    assert resumen["errores"] == 1 and resumen["plan"] == []
+    assert planificacion.a_csv(resumen["problemas"], planificacion.COLUMNAS_PROBLEMAS).splitlines()[0] == \
+        "nivel,elemento,problema"
+
+def test_dos_informes_en_el_mismo_archivo_son_un_error(tmp_path):
+    carpetas = _carpetas(tmp_path)
+    _modelo(carpetas["plantillas"] / "GUALACEO_3G_CONECEL_COBERTURA.docx")
+    _libro(carpetas["graficos"] / "MEDICION GUALACEO.xlsx", 2)
+    # La misma parroquia con y sin tecnología y el mismo número de informe dan la misma salida
+    df = pd.DataFrame({"PROVINCIA": ["AZUAY"] * 2, "PARROQUIA": ["GUALACEO"] * 2,
+                       "OPERADORA": ["CONECEL"] * 2, "TECNOLOGIA": ["3G", None]})
+    tabla = pd.DataFrame({NUMERO: ["INF-001"] * 2, CORRECCION: ["NO"] * 2})
+    resumen = planificacion.planificar(df, tabla, str(carpetas["plantillas"]), str(carpetas["salida"]),
+                                       str(carpetas["graficos"]), "", parroquias=["GUALACEO"])
+    assert resumen["errores"] == 2
+    assert [fila["estado"] for fila in resumen["plan"]] == ["con errores"] * 2
+    assert "INF-001_GUALACEO_3G_CONECEL_COBERTURA.docx" in resumen["plan"][0]["problemas"]
+
+def test_una_fila_repetida_es_un_aviso_y_un_solo_informe(tmp_path):
+    carpetas = _carpetas(tmp_path)
+    _modelo(carpetas["plantillas"] / "GUALACEO_3G_CONECEL_COBERTURA.docx")
+    _libro(carpetas["graficos"] / "MEDICION GUALACEO.xlsx", 2)
+    df = pd.DataFrame({"PROVINCIA": ["AZUAY"] * 2, "PARROQUIA": ["GUALACEO"] * 2,
+                       "OPERADORA": ["CONECEL"] * 2, "TECNOLOGIA": ["3G"] * 2})
+    tabla = pd.DataFrame({NUMERO: ["INF-001", "INF-002"], CORRECCION: ["NO"] * 2})
+    duplicados = {("GUALACEO", "CONECEL S.A.", "3G"): [2, 3]}
+    resumen = planificacion.planificar(df, tabla, str(carpetas["plantillas"]), str(carpetas["salida"]),
+                                       str(carpetas["graficos"]), "", parroquias=["GUALACEO"],
+                                       duplicados=duplicados)
+    assert (resumen["errores"], resumen["avisos"]) == (0, 1)
+    assert [fila["numero"] for fila in resumen["plan"]] == ["INF-001"]
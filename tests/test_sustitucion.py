@@ -0,0 +1,46 @@
+from collections import Counter
+
+from docx import Document
+
+from sustitucion import sustituir_parrafo, MARCADOR_FECHA
+from generador import requiere_correccion, _busquedas, _recursos_correccion
+
+def _parrafo(*partes):
+    parrafo = Document().add_paragraph()
+    for parte in partes:
+        parrafo.add_run(parte)
+    return parrafo
+
+def test_reemplaza_un_marcador_partido_en_varios_runs_conservando_el_primero():
+    parrafo = _parrafo("Parroquia «PARR", "OQUIA» de ", "«PROVINCIA»")
+    sustituir_parrafo(parrafo, {"«PARROQUIA»": "RICAURTE", "«PROVINCIA»": "AZUAY"}, [0])
+    assert parrafo.text == "Parroquia RICAURTE de AZUAY"
+    assert [run.text for run in parrafo.runs] == ["Parroquia RICAURTE", " de ", "AZUAY"]
+
+def test_las_fechas_siguen_el_orden_de_aparicion():
+    valores = {"fecha_antecedentes": "1", "fecha_pruebas_realizadas": "2", "fecha_conclusiones": "3"}
+    contador = [0]
+    textos = []
+    for _ in range(3):
+        parrafo = _parrafo(MARCADOR_FECHA)
+        sustituir_parrafo(parrafo, valores, contador)
+        textos.append(parrafo.text)
+    assert textos == ["1", "2", "3"]
+
+def test_sin_valor_el_marcador_queda_y_se_cuenta(caplog):
+    sin_reemplazo = Counter()
+    parrafo = _parrafo("«PARROQUIA» ", MARCADOR_FECHA)
+    sustituir_parrafo(parrafo, {}, [0], sin_reemplazo=sin_reemplazo)
+    assert parrafo.text == "«PARROQUIA» " + MARCADOR_FECHA
+    assert sin_reemplazo == Counter({"«PARROQUIA»": 1, MARCADOR_FECHA: 1})
+    assert "fecha_antecedentes" in caplog.text
+
+def test_requiere_correccion_sin_la_clave():
+    assert not requiere_correccion({})
+    assert requiere_correccion({"«REQUIERE_MODIFICAR_MAPA_DE_COBERTURA_OPE»": "si"})
+
+def test_sin_carpeta_de_graficos_no_se_busca_la_correccion():
+    placeholders = {"«REQUIERE_MODIFICAR_MAPA_DE_COBERTURA_OPE»": "SI"}
+    assert _busquedas("RICAURTE", placeholders, "", "", ()) == []
+    busquedas = [funcion for funcion, _ in _busquedas("RICAURTE", placeholders, "graficos", "", ())]
+    assert _recursos_correccion in busquedas